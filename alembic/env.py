@@ -13,6 +13,7 @@ from app.core.database import Base
 # ВАЖНО: Импортируйте сюда ВСЕ ваши модели, иначе Alembic их не увидит!
 from app.models.user import User  # noqa
 from app.models.email import Email
+from app.models.outbox import WebhookOutbox  # noqa
 
 # this is the Alembic Config object, which provides
 # access to the values within the .ini file in use.
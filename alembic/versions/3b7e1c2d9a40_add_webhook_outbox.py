@@ -0,0 +1,47 @@
+"""add webhook outbox
+
+Revision ID: 3b7e1c2d9a40
+Revises: 881ca1f7f02b
+Create Date: 2026-10-18 12:10:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '3b7e1c2d9a40'
+down_revision: Union[str, Sequence[str], None] = '881ca1f7f02b'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.create_table('webhook_outbox',
+    sa.Column('id', sa.Integer(), nullable=False),
+    sa.Column('email_id', sa.Integer(), nullable=True),
+    sa.Column('payload', sa.JSON(), nullable=False),
+    sa.Column('status', sa.Enum('PENDING', 'DELIVERED', 'DEAD', name='outboxstatus'), nullable=False),
+    sa.Column('attempts', sa.Integer(), nullable=False),
+    sa.Column('next_attempt_at', sa.DateTime(timezone=True), server_default=sa.text('now()'), nullable=False),
+    sa.Column('last_error', sa.Text(), nullable=True),
+    sa.Column('created_at', sa.DateTime(timezone=True), server_default=sa.text('now()'), nullable=True),
+    sa.Column('delivered_at', sa.DateTime(timezone=True), nullable=True),
+    sa.PrimaryKeyConstraint('id')
+    )
+    op.create_index(op.f('ix_webhook_outbox_id'), 'webhook_outbox', ['id'], unique=False)
+    op.create_index(op.f('ix_webhook_outbox_email_id'), 'webhook_outbox', ['email_id'], unique=False)
+    op.create_index('ix_webhook_outbox_due', 'webhook_outbox', ['next_attempt_at'], unique=False,
+                    postgresql_where=sa.text("status = 'PENDING'"))
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index('ix_webhook_outbox_due', table_name='webhook_outbox')
+    op.drop_index(op.f('ix_webhook_outbox_email_id'), table_name='webhook_outbox')
+    op.drop_index(op.f('ix_webhook_outbox_id'), table_name='webhook_outbox')
+    op.drop_table('webhook_outbox')
+    sa.Enum(name='outboxstatus').drop(op.get_bind(), checkfirst=True)
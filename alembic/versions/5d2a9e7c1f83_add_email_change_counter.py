@@ -0,0 +1,97 @@
+"""add email change counter
+
+Revision ID: 5d2a9e7c1f83
+Revises: c41f8d2e6b17
+Create Date: 2026-10-18 15:20:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '5d2a9e7c1f83'
+down_revision: Union[str, Sequence[str], None] = 'c41f8d2e6b17'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    # Версия данных таблицы emails для ETag - сумма счетчиков, которые триггер
+    # увеличивает в транзакции записи: новое значение видно только вместе с
+    # закоммиченными строками (в отличие от nextval()). Счетчик разбит на 16 строк,
+    # транзакция правит строку txid % 16, поэтому параллельные записи почти не ждут
+    # друг друга на ее блокировке. Сумма растет с каждым коммитом, так что разные
+    # снимки данных получают разные версии.
+    # app.email_changes = 'off' (SET LOCAL) - запись не меняет ответы API (фоновая
+    # перепаковка писем), версия остается прежней и ETag клиентов не сбрасываются.
+    op.execute("""
+        CREATE TABLE email_change_counter (
+            shard smallint PRIMARY KEY,
+            version bigint NOT NULL DEFAULT 0
+        )
+    """)
+    op.execute("INSERT INTO email_change_counter (shard) SELECT generate_series(0, 15)")
+    op.execute("""
+        CREATE FUNCTION bump_email_version() RETURNS trigger AS $$
+        BEGIN
+            IF current_setting('app.email_changes', true) = 'off' THEN
+                RETURN NULL;
+            END IF;
+
+            -- Оператор без строк (UPDATE/DELETE по несуществующему id) данные не меняет
+            IF TG_OP IN ('INSERT', 'UPDATE') THEN
+                PERFORM 1 FROM new_rows LIMIT 1;
+                IF NOT FOUND THEN
+                    RETURN NULL;
+                END IF;
+            ELSIF TG_OP = 'DELETE' THEN
+                PERFORM 1 FROM old_rows LIMIT 1;
+                IF NOT FOUND THEN
+                    RETURN NULL;
+                END IF;
+            END IF;
+
+            -- Одно увеличение на транзакцию: отметка локальна и сбрасывается при коммите/откате
+            IF current_setting('app.email_version_bumped', true) = 'on' THEN
+                RETURN NULL;
+            END IF;
+            PERFORM set_config('app.email_version_bumped', 'on', true);
+            UPDATE email_change_counter SET version = version + 1 WHERE shard = txid_current() % 16;
+            RETURN NULL;
+        END;
+        $$ LANGUAGE plpgsql
+    """)
+    # Transition tables допускают только одно событие на триггер
+    op.execute("""
+        CREATE TRIGGER emails_bump_version_insert AFTER INSERT ON emails
+        REFERENCING NEW TABLE AS new_rows
+        FOR EACH STATEMENT EXECUTE FUNCTION bump_email_version()
+    """)
+    op.execute("""
+        CREATE TRIGGER emails_bump_version_update AFTER UPDATE ON emails
+        REFERENCING NEW TABLE AS new_rows
+        FOR EACH STATEMENT EXECUTE FUNCTION bump_email_version()
+    """)
+    op.execute("""
+        CREATE TRIGGER emails_bump_version_delete AFTER DELETE ON emails
+        REFERENCING OLD TABLE AS old_rows
+        FOR EACH STATEMENT EXECUTE FUNCTION bump_email_version()
+    """)
+    op.execute("""
+        CREATE TRIGGER emails_bump_version_truncate AFTER TRUNCATE ON emails
+        FOR EACH STATEMENT EXECUTE FUNCTION bump_email_version()
+    """)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.execute("DROP TRIGGER emails_bump_version_truncate ON emails")
+    op.execute("DROP TRIGGER emails_bump_version_delete ON emails")
+    op.execute("DROP TRIGGER emails_bump_version_update ON emails")
+    op.execute("DROP TRIGGER emails_bump_version_insert ON emails")
+    op.execute("DROP FUNCTION bump_email_version()")
+    op.execute("DROP TABLE email_change_counter")
@@ -0,0 +1,39 @@
+"""add email idempotency
+
+Revision ID: 8e6f0b4a2c95
+Revises: 5d2a9e7c1f83
+Create Date: 2026-10-18 16:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '8e6f0b4a2c95'
+down_revision: Union[str, Sequence[str], None] = '5d2a9e7c1f83'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    # Существующие письма остаются с NULL: среди них могут быть дубликаты
+    op.add_column('emails', sa.Column('content_hash', sa.String(length=64), nullable=True))
+    op.add_column('emails', sa.Column('idempotency_key', sa.String(length=255), nullable=True))
+    # Хэш содержимого уникален только среди писем на модерации: повторная отправка
+    # уже одобренного или отклоненного письма снова попадает на модерацию
+    op.create_index('ix_emails_content_hash_on_approval', 'emails', ['content_hash'], unique=True,
+                    postgresql_where=sa.text("status = 'ON_APPROVAL'"),
+                    sqlite_where=sa.text("status = 'ON_APPROVAL'"))
+    op.create_index(op.f('ix_emails_idempotency_key'), 'emails', ['idempotency_key'], unique=True)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index(op.f('ix_emails_idempotency_key'), table_name='emails')
+    op.drop_index('ix_emails_content_hash_on_approval', table_name='emails')
+    op.drop_column('emails', 'idempotency_key')
+    op.drop_column('emails', 'content_hash')
@@ -0,0 +1,56 @@
+"""compress email html_content
+
+Revision ID: a7c3e5f1b0d2
+Revises: 8e6f0b4a2c95
+Create Date: 2026-10-18 17:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'a7c3e5f1b0d2'
+down_revision: Union[str, Sequence[str], None] = '8e6f0b4a2c95'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    # Без перезаписи таблицы: только новые nullable-столбцы (изменение метаданных).
+    # Новые письма пишутся в html_content_packed, старые читаются из html_content,
+    # переносит их и заполняет html_size фоновая задача content_backfill.
+    # Когда перенос закончен, отдельная миграция удаляет html_content и
+    # переименовывает html_content_packed в html_content.
+    op.add_column('emails', sa.Column('html_size', sa.Integer(), nullable=True))
+    op.add_column('emails', sa.Column('html_content_packed', sa.LargeBinary(), nullable=True))
+    op.alter_column('emails', 'html_content', existing_type=sa.Text(), nullable=True)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    # Сжатые строки в text не преобразовать средствами SQL
+    op.execute(
+        """
+        DO $$
+        BEGIN
+            IF EXISTS (
+                SELECT 1 FROM emails
+                WHERE substr(html_content_packed, 1, 2) = '\\x1f8b'::bytea
+                   OR substr(html_content_packed, 1, 4) = '\\x28b52ffd'::bytea
+            ) THEN
+                RAISE EXCEPTION 'emails.html_content_packed содержит сжатые строки: распакуйте их перед откатом';
+            END IF;
+        END $$;
+        """
+    )
+    op.execute(
+        "UPDATE emails SET html_content = convert_from(html_content_packed, 'UTF8') "
+        "WHERE html_content_packed IS NOT NULL"
+    )
+    op.alter_column('emails', 'html_content', existing_type=sa.Text(), nullable=False)
+    op.drop_column('emails', 'html_content_packed')
+    op.drop_column('emails', 'html_size')
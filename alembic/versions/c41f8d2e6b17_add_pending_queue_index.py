@@ -0,0 +1,29 @@
+"""add pending queue index
+
+Revision ID: c41f8d2e6b17
+Revises: 3b7e1c2d9a40
+Create Date: 2026-10-18 13:05:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'c41f8d2e6b17'
+down_revision: Union[str, Sequence[str], None] = '3b7e1c2d9a40'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.create_index('ix_emails_on_approval_created_at_id', 'emails', ['created_at', 'id'], unique=False,
+                    postgresql_where=sa.text("status = 'ON_APPROVAL'"))
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index('ix_emails_on_approval_created_at_id', table_name='emails')
@@ -0,0 +1,90 @@
+"""notify email events from trigger
+
+Revision ID: c9e1f3a5b7d2
+Revises: b2d4f6a8c0e1
+Create Date: 2026-10-18 20:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'c9e1f3a5b7d2'
+down_revision: Union[str, Sequence[str], None] = 'b2d4f6a8c0e1'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    # NOTIFY для SSE (канал email_events) отправляется триггером в транзакции записи,
+    # без отдельного запроса pg_notify из приложения. Доставляется только после коммита.
+    # app.email_changes = 'off' (SET LOCAL) отключает события, как и смену версии (см. 5d2a9e7c1f83).
+    op.execute("""
+        CREATE FUNCTION notify_email_events() RETURNS trigger AS $$
+        DECLARE
+            v_event text;
+            v_status text;
+            v_ids integer[];
+            i integer := 1;
+        BEGIN
+            IF current_setting('app.email_changes', true) = 'off' THEN
+                RETURN NULL;
+            END IF;
+
+            IF TG_OP = 'INSERT' THEN
+                v_event := 'created';
+                SELECT array_agg(id ORDER BY id), lower(min(status::text)) INTO v_ids, v_status FROM new_rows;
+            ELSIF TG_OP = 'DELETE' THEN
+                v_event := 'deleted';
+                SELECT array_agg(id ORDER BY id) INTO v_ids FROM old_rows;
+            ELSE
+                IF EXISTS (
+                    SELECT 1 FROM new_rows n JOIN old_rows o USING (id)
+                    WHERE n.status IS DISTINCT FROM o.status
+                ) THEN
+                    v_event := 'status_changed';
+                ELSE
+                    v_event := 'edited';
+                END IF;
+                SELECT array_agg(id ORDER BY id), lower(min(status::text)) INTO v_ids, v_status FROM new_rows;
+            END IF;
+
+            -- Лимит payload у NOTIFY - 8000 байт, длинные списки id режем на части
+            WHILE i <= coalesce(array_length(v_ids, 1), 0) LOOP
+                PERFORM pg_notify('email_events', json_build_object(
+                    'event', v_event, 'ids', v_ids[i:i + 499], 'status', v_status
+                )::text);
+                i := i + 500;
+            END LOOP;
+            RETURN NULL;
+        END;
+        $$ LANGUAGE plpgsql
+    """)
+    # Transition tables допускают только одно событие на триггер
+    op.execute("""
+        CREATE TRIGGER emails_notify_insert AFTER INSERT ON emails
+        REFERENCING NEW TABLE AS new_rows
+        FOR EACH STATEMENT EXECUTE FUNCTION notify_email_events()
+    """)
+    op.execute("""
+        CREATE TRIGGER emails_notify_update AFTER UPDATE ON emails
+        REFERENCING OLD TABLE AS old_rows NEW TABLE AS new_rows
+        FOR EACH STATEMENT EXECUTE FUNCTION notify_email_events()
+    """)
+    op.execute("""
+        CREATE TRIGGER emails_notify_delete AFTER DELETE ON emails
+        REFERENCING OLD TABLE AS old_rows
+        FOR EACH STATEMENT EXECUTE FUNCTION notify_email_events()
+    """)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.execute("DROP TRIGGER emails_notify_delete ON emails")
+    op.execute("DROP TRIGGER emails_notify_update ON emails")
+    op.execute("DROP TRIGGER emails_notify_insert ON emails")
+    op.execute("DROP FUNCTION notify_email_events()")
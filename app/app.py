@@ -1,20 +1,58 @@
-import logging
+from contextlib import asynccontextmanager
 from fastapi import FastAPI
 
 from app.core.config import settings
-from app.routers import users, auth, admin, email
+from app.routers import users, auth, admin, email, metrics
+from app.services.webhook_dispatcher import webhook_dispatcher
+from app.services.n8n_wh_emails import start_n8n_client, close_n8n_client
+from app.services.email_events import email_events
+from app.services.content_backfill import content_backfill
+from app.services.loop_monitor import loop_monitor
+from app.core.database import async_engine, read_replicas
+from app.core.metrics import mark_process_dead
+from app.core.logging_config import configure_logging
+from app.middleware.webhook_guard import WebhookGuardMiddleware
+from app.middleware.metrics import MetricsMiddleware
+from app.middleware.profiling import ProfilingMiddleware
+from app.middleware.request_id import RequestIdMiddleware, REQUEST_ID_HEADER
+from app.utils.pagination import NEXT_CURSOR_HEADER
+from app.utils.etag import ETAG_HEADER
 
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.middleware.gzip import GZipMiddleware
+from fastapi.responses import ORJSONResponse
+from brotli_asgi import BrotliMiddleware
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    """Запуск и остановка фоновых сервисов приложения"""
+    loop_monitor.start()
+    await start_n8n_client()
+    webhook_dispatcher.start()
+    await email_events.start(async_engine)
+    content_backfill.start()
+    read_replicas.start()
+    yield
+    await read_replicas.stop()
+    await content_backfill.stop()
+    await email_events.stop()
+    await webhook_dispatcher.stop()
+    await close_n8n_client()
+    await loop_monitor.stop()
+    mark_process_dead()
 
 
 def create_app() -> FastAPI:
     """Создание FastAPI приложения"""
-    logging.basicConfig(level=settings.LOG_LEVEL)
+    configure_logging()
     app = FastAPI(
         title=settings.APP_NAME,
         version=settings.APP_VERSION,
         docs_url="/api/docs",
         redoc_url="/api/redoc",
+        lifespan=lifespan,
+        default_response_class=ORJSONResponse,
     )
 
     origins = [
@@ -28,12 +66,41 @@ def create_app() -> FastAPI:
         allow_credentials=True,
         allow_methods=["*"],
         allow_headers=["*"],
+        expose_headers=[NEXT_CURSOR_HEADER, ETAG_HEADER, REQUEST_ID_HEADER],
     )
+
+    if settings.RESPONSE_COMPRESSION == "brotli":
+        app.add_middleware(
+            BrotliMiddleware,
+            quality=settings.BROTLI_QUALITY,
+            minimum_size=settings.COMPRESSION_MIN_SIZE,
+            gzip_fallback=True,
+            # SSE нельзя буферизовать в компрессоре
+            excluded_handlers=["/api/emails/events"],
+        )
+    elif settings.RESPONSE_COMPRESSION == "gzip":
+        app.add_middleware(
+            GZipMiddleware,
+            minimum_size=settings.COMPRESSION_MIN_SIZE,
+            compresslevel=settings.GZIP_LEVEL,
+        )
+
+    if settings.PROFILING_ENABLED:
+        app.add_middleware(ProfilingMiddleware)
+    # Снаружи сжатия и CORS: лишние запросы отбрасываются до остальной обработки
+    app.add_middleware(WebhookGuardMiddleware)
+    if settings.METRICS_ENABLED:
+        # Снаружи всех остальных: в задержку входят и сжатие, и отказы по лимитам
+        app.add_middleware(MetricsMiddleware)
+    # Самый внешний: id есть у всего, что логируется при обработке запроса
+    app.add_middleware(RequestIdMiddleware)
     
     app.include_router(auth.router, prefix="/api", tags=["Auth"])
     app.include_router(users.router, prefix="/api", tags=["Users"])
     app.include_router(admin.router, prefix="/api", tags=["Admin"])
     app.include_router(email.router, prefix="/api", tags=["Emails"])
+    if settings.METRICS_ENABLED:
+        app.include_router(metrics.router)
 
     return app
 
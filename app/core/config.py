@@ -1,3 +1,5 @@
+from typing import Literal
+from pydantic import model_validator
 from pydantic_settings import BaseSettings
 import os
 
@@ -9,14 +11,153 @@ class Settings(BaseSettings):
     ALGORITHM: str
     ACCESS_TOKEN_EXPIRE_MINUTES: int
     DATABASE_URL: str
+    # Реплики только для чтения (через запятую). Тяжелые GET-запросы идут на здоровую реплику,
+    # при недоступности или отставании больше REPLICA_MAX_LAG_SECONDS - на основную БД
+    DATABASE_REPLICA_URLS: str = ""
+    REPLICA_HEALTH_CHECK_INTERVAL: float = 5.0
+    REPLICA_HEALTH_CHECK_TIMEOUT: float = 2.0
+    REPLICA_MAX_LAG_SECONDS: float = 30.0
+    # Пул соединений одного воркера (включая LISTEN-соединение событий SSE)
+    DB_POOL_SIZE: int = 5
+    DB_MAX_OVERFLOW: int = 10
+    # Бюджет соединений к одной БД на все воркеры, держите ниже max_connections Postgres.
+    # Пул воркера урезается до DB_MAX_CONNECTIONS / WEB_WORKERS, автоматическое число
+    # воркеров ограничивается так, чтобы каждому досталось хотя бы 4 соединения (0 - без бюджета)
+    DB_MAX_CONNECTIONS: int = 80
+    DB_POOL_TIMEOUT: float = 30.0
+    DB_POOL_RECYCLE: int = 1800
+    DB_POOL_PRE_PING: bool = False
+    # Кэш подготовленных выражений asyncpg (0 - выключить, нужно для pgbouncer в transaction mode)
+    DB_STATEMENT_CACHE_SIZE: int = 100
     APP_HOST: str
     APP_PORT: int
     LOG_LEVEL: str = "INFO"
+    # text - человекочитаемые строки, json - одна JSON-запись на строку (для сборщиков логов)
+    LOG_FORMAT: Literal["text", "json"] = "text"
+    # Запись логов в отдельном потоке (QueueHandler), event loop не ждет stderr
+    LOG_QUEUE: bool = True
+    # Доля логов об успешных доставках, которые пишутся (1.0 - все, 0 - ни одного)
+    LOG_SUCCESS_SAMPLE_RATE: float = 1.0
+    # Сервер (run.py). WEB_WORKERS=0 - по числу доступных процессору ядер
+    WEB_WORKERS: int = 0
+    WEB_BACKLOG: int = 2048
+    WEB_KEEPALIVE_TIMEOUT: int = 5
+    # Сверх этого числа одновременных соединений/запросов на воркер отвечать 503 (None - без лимита)
+    WEB_LIMIT_CONCURRENCY: int | None = None
+    # Сколько ждать завершения текущих запросов при остановке, потом lifespan
+    # дожидается доставок outbox еще OUTBOX_SHUTDOWN_TIMEOUT
+    WEB_GRACEFUL_SHUTDOWN_TIMEOUT: int = 20
+    WEB_PROXY_HEADERS: bool = True
+    WEB_FORWARDED_ALLOW_IPS: str = "127.0.0.1"
     APP_NAME: str = "n8nback"
     APP_VERSION: str = "0.1.0"
 
+    # Метрики Prometheus на /metrics, только с заголовком Authorization: Bearer <METRICS_TOKEN>
+    METRICS_ENABLED: bool = False
+    METRICS_TOKEN: str | None = None
+
+    # Диагностика. Профилирование запроса администратором: заголовок X-Profile или ?profile=
+    PROFILING_ENABLED: bool = False
+    PROFILING_INTERVAL: float = 0.001
+    # Куда сохранять HTML-профили (None - только в лог)
+    PROFILING_DIR: str | None = None
+    # Логировать SQL-запросы дольше порога (0 - выключено)
+    SLOW_QUERY_THRESHOLD_MS: float = 500.0
+    # Монитор задержки event loop: при блокировке дольше порога в лог пишется стек блокирующего кода
+    LOOP_LAG_MONITOR: bool = True
+    LOOP_LAG_THRESHOLD_MS: float = 200.0
+    LOOP_LAG_INTERVAL: float = 0.1
+    # asyncio debug mode (дорого): дополнительно логирует каждый callback дольше LOOP_LAG_THRESHOLD_MS
+    LOOP_DEBUG: bool = False
+
+    # Сжатие ответов: off | gzip | brotli (brotli с откатом на gzip для старых клиентов)
+    RESPONSE_COMPRESSION: Literal["off", "gzip", "brotli"] = "gzip"
+    COMPRESSION_MIN_SIZE: int = 1024
+    GZIP_LEVEL: int = 6
+    BROTLI_QUALITY: int = 4
+
+    # bcrypt: стоимость хэширования и отдельный пул потоков
+    BCRYPT_ROUNDS: int = 12
+    BCRYPT_MAX_WORKERS: int = 4
+    BCRYPT_MAX_QUEUE: int = 64
+    # Перехэшировать пароль при входе, если его стоимость отличается от BCRYPT_ROUNDS
+    BCRYPT_REHASH_ON_LOGIN: bool = True
+
+    # Кэш авторизованных пользователей (по claim sub)
+    USER_CACHE_TTL_SECONDS: int = 60
+    USER_CACHE_MAX_SIZE: int = 1024
+    # Доверять claims uid/role из токена и не обращаться к БД вообще
+    AUTH_TRUST_TOKEN_CLAIMS: bool = False
+
     N8N_WEBHOOK_URL: str
 
+    # HTTP-клиент для n8n (один на процесс, с пулом соединений)
+    N8N_HTTP_TIMEOUT: float = 10.0
+    N8N_HTTP_CONNECT_TIMEOUT: float = 5.0
+    N8N_HTTP_MAX_CONNECTIONS: int = 20
+    N8N_HTTP_MAX_KEEPALIVE: int = 10
+    N8N_HTTP_KEEPALIVE_EXPIRY: float = 30.0
+    N8N_HTTP2: bool = False
+
+    # Пакетная отправка: одобренные письма уходят в n8n одним JSON-массивом
+    N8N_BATCH_ENABLED: bool = False
+    N8N_BATCH_MAX_SIZE: int = 100
+    N8N_BATCH_MAX_WAIT_MS: int = 200
+
+    # Дедупликация повторных доставок вебхуков: Idempotency-Key всегда, хэш содержимого -
+    # по флагу и только среди писем на модерации
+    WEBHOOK_DEDUP_BY_CONTENT: bool = False
+    IDEMPOTENCY_CACHE_SIZE: int = 10000
+
+    # Пакетный прием писем от n8n
+    WEBHOOK_BATCH_MAX_ITEMS: int = 5000
+    WEBHOOK_BATCH_CHUNK_SIZE: int = 500
+
+    # Защита приема вебхуков: предельный размер тела (байт) и лимит запросов на источник
+    WEBHOOK_MAX_BODY_SIZE: int = 5 * 1024 * 1024
+    WEBHOOK_BATCH_MAX_BODY_SIZE: int = 100 * 1024 * 1024
+    # Token bucket: запросов в секунду и размер всплеска (0 - без ограничения)
+    WEBHOOK_RATE_LIMIT_PER_SECOND: float = 0.0
+    WEBHOOK_RATE_LIMIT_BURST: int = 50
+    # Источник определяется по заголовку с секретом сценария n8n, если секрет есть в
+    # WEBHOOK_SOURCE_SECRETS (через запятую); иначе - по IP клиента
+    WEBHOOK_SOURCE_HEADER: str = "X-Webhook-Source"
+    WEBHOOK_SOURCE_SECRETS: str = ""
+    WEBHOOK_RATE_LIMIT_MAX_SOURCES: int = 10000
+
+    # Сжатие html_content при хранении: none | gzip | zstd
+    EMAIL_CONTENT_COMPRESSION: Literal["none", "gzip", "zstd"] = "none"
+    EMAIL_COMPRESSION_LEVEL: int = 3
+    EMAIL_COMPRESSION_MIN_SIZE: int = 512
+    # Фоновый перенос писем из старого столбца html_content и сжатие ранее сохраненных
+    EMAIL_COMPRESSION_BACKFILL: bool = True
+    EMAIL_COMPRESSION_BACKFILL_BATCH: int = 200
+    EMAIL_COMPRESSION_BACKFILL_PAUSE: float = 0.5
+
+    # Длина превью текста в кратком представлении списков писем
+    EMAIL_PREVIEW_LENGTH: int = 200
+
+    # Push-уведомления об изменениях писем (SSE)
+    EMAIL_EVENTS_QUEUE_SIZE: int = 1000
+    EMAIL_EVENTS_HEARTBEAT_SECONDS: float = 15.0
+
+    # Очередь исходящих вебхуков (outbox)
+    OUTBOX_POLL_INTERVAL: float = 1.0
+    OUTBOX_BATCH_SIZE: int = 50
+    OUTBOX_CONCURRENCY: int = 10
+    OUTBOX_MAX_ATTEMPTS: int = 10
+    OUTBOX_BACKOFF_BASE: float = 2.0
+    OUTBOX_BACKOFF_MAX: float = 600.0
+    OUTBOX_LEASE_SECONDS: int = 60
+    OUTBOX_SHUTDOWN_TIMEOUT: float = 10.0
+
+    @model_validator(mode="after")
+    def check_metrics_token(self):
+        # /metrics раскрывает маршруты, нагрузку и глубину очередей - без токена не публикуем
+        if self.METRICS_ENABLED and not self.METRICS_TOKEN:
+            raise ValueError("METRICS_ENABLED=true требует METRICS_TOKEN")
+        return self
+
     class Config:
         env_file = env_path
         extra = 'ignore'
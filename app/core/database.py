@@ -1,9 +1,58 @@
+from sqlalchemy.engine import make_url
+from sqlalchemy.exc import DBAPIError
 from sqlalchemy.ext.asyncio import create_async_engine, AsyncSession, async_sessionmaker
 from sqlalchemy.ext.declarative import declarative_base
 from app.core.config import settings
+from app.core.db_pool import InstrumentedQueuePool
+from app.core.metrics import instrument_engine
+from app.core.slow_query import install_slow_query_log
+from app.core.replicas import ReplicaSet, replica_urls
 
-async_engine = create_async_engine(settings.DATABASE_URL)
+
+def pool_limits() -> tuple[int, int]:
+    """
+    pool_size и max_overflow одного воркера с учетом DB_MAX_CONNECTIONS.
+
+    Число воркеров run.py передает дочерним процессам через WEB_WORKERS.
+    """
+    if settings.DB_MAX_CONNECTIONS <= 0:
+        return settings.DB_POOL_SIZE, settings.DB_MAX_OVERFLOW
+    share = max(settings.DB_MAX_CONNECTIONS // max(settings.WEB_WORKERS, 1), 1)
+    pool_size = min(settings.DB_POOL_SIZE, share)
+    return pool_size, min(settings.DB_MAX_OVERFLOW, share - pool_size)
+
+
+def create_engine_from_settings(url: str):
+    """Async-движок с настройками пула из Settings"""
+    connect_args = {}
+    if make_url(url).get_driver_name() == "asyncpg":
+        connect_args = {
+            "prepared_statement_cache_size": settings.DB_STATEMENT_CACHE_SIZE,
+            "statement_cache_size": settings.DB_STATEMENT_CACHE_SIZE,
+        }
+    pool_size, max_overflow = pool_limits()
+    return create_async_engine(
+        url,
+        poolclass=InstrumentedQueuePool,
+        pool_size=pool_size,
+        max_overflow=max_overflow,
+        pool_timeout=settings.DB_POOL_TIMEOUT,
+        pool_recycle=settings.DB_POOL_RECYCLE,
+        pool_pre_ping=settings.DB_POOL_PRE_PING,
+        connect_args=connect_args,
+    )
+
+
+def _instrumented_engine(url: str):
+    engine = create_engine_from_settings(url)
+    instrument_engine(engine)
+    install_slow_query_log(engine)
+    return engine
+
+
+async_engine = _instrumented_engine(settings.DATABASE_URL)
 AsyncSessionLocal = async_sessionmaker(bind=async_engine, class_=AsyncSession, expire_on_commit=False)
+read_replicas = ReplicaSet([_instrumented_engine(url) for url in replica_urls()])
 
 Base = declarative_base()
 
@@ -19,6 +68,26 @@ async def get_db() -> AsyncSession:
         finally:
             await session.close()
 
+async def get_read_db() -> AsyncSession:
+    """
+    Сессия только для чтения: здоровая реплика, а если их нет - основная БД.
+
+    Не коммитит. Данные реплики могут отставать; если ответ сверяется с версией
+    данных (ETag), используйте fresh_read_session.
+    """
+    replica = read_replicas.choose()
+    session_factory = replica.session_factory if replica is not None else AsyncSessionLocal
+    async with session_factory() as session:
+        session.info["replica"] = replica
+        try:
+            yield session
+        except DBAPIError as e:
+            if replica is not None and e.connection_invalidated:
+                read_replicas.mark_down(replica, repr(e.orig))
+            raise
+        finally:
+            await session.close()
+
 async def get_db_background() -> AsyncSession:
     """Сессия для фоновых задач (без автоматического закрытия через генератор)"""
     async with AsyncSessionLocal() as session:
@@ -0,0 +1,62 @@
+import time
+from dataclasses import dataclass, asdict
+
+from sqlalchemy import exc
+from sqlalchemy.pool import AsyncAdaptedQueuePool
+
+from app.core.metrics import DB_POOL_CHECKOUT_WAIT, DB_POOL_CHECKOUT_TIMEOUTS
+
+
+@dataclass
+class PoolStats:
+    """Накопительные счетчики выдачи соединений из пула"""
+    checkouts: int = 0
+    checkout_timeouts: int = 0
+    wait_seconds_total: float = 0.0
+    wait_seconds_max: float = 0.0
+
+    def record_wait(self, seconds: float):
+        self.checkouts += 1
+        self.wait_seconds_total += seconds
+        self.wait_seconds_max = max(self.wait_seconds_max, seconds)
+
+
+class InstrumentedQueuePool(AsyncAdaptedQueuePool):
+    """AsyncAdaptedQueuePool, который замеряет время ожидания свободного соединения"""
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.stats = PoolStats()
+
+    def _do_get(self):
+        start = time.perf_counter()
+        try:
+            return super()._do_get()
+        except exc.TimeoutError:
+            self.stats.checkout_timeouts += 1
+            DB_POOL_CHECKOUT_TIMEOUTS.inc()
+            raise
+        finally:
+            waited = time.perf_counter() - start
+            self.stats.record_wait(waited)
+            DB_POOL_CHECKOUT_WAIT.observe(waited)
+
+
+def pool_status(engine) -> dict:
+    """Текущее состояние пула движка и накопленные счетчики"""
+    pool = engine.pool
+    status = {"pool_class": type(pool).__name__}
+    if isinstance(pool, AsyncAdaptedQueuePool):
+        status.update({
+            "size": pool.size(),
+            "checked_in": pool.checkedin(),
+            "in_use": pool.checkedout(),
+            "overflow": max(pool.overflow(), 0),
+            "max_overflow": pool._max_overflow,
+            "timeout": pool.timeout(),
+        })
+    stats = getattr(pool, "stats", None)
+    if stats is not None:
+        status.update(asdict(stats))
+        status["wait_seconds_avg"] = stats.wait_seconds_total / stats.checkouts if stats.checkouts else 0.0
+    return status
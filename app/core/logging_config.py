@@ -0,0 +1,105 @@
+import atexit
+import copy
+import logging
+import queue
+import random
+import sys
+from contextvars import ContextVar
+from datetime import datetime, timezone
+from logging.handlers import QueueHandler, QueueListener
+
+import orjson
+
+from app.core.config import settings
+
+# id запроса; фоновая доставка outbox восстанавливает его из записи outbox
+request_id_var: ContextVar[str | None] = ContextVar("request_id", default=None)
+
+_TEXT_FORMAT = "%(asctime)s %(levelname)s %(name)s [%(request_id)s] %(message)s"
+# Логгеры uvicorn пишут через собственные обработчики; забираем их в общий конвейер
+_UVICORN_LOGGERS = ("uvicorn", "uvicorn.error", "uvicorn.access")
+
+_listener: QueueListener | None = None
+
+
+class RequestIdFilter(logging.Filter):
+    """Добавляет request_id в запись. Стоит на обработчике в потоке, который пишет лог."""
+
+    def filter(self, record: logging.LogRecord) -> bool:
+        record.request_id = request_id_var.get() or "-"
+        return True
+
+
+class DeferredQueueHandler(QueueHandler):
+    """
+    QueueHandler, который не форматирует сообщение в вызывающем потоке.
+
+    Стандартный prepare() выполняет msg % args сразу; здесь это делает поток
+    QueueListener. В вызывающем потоке остается только текст traceback: объект
+    исключения держит кадры стека, и передавать его в другой поток не стоит.
+    """
+
+    def prepare(self, record: logging.LogRecord) -> logging.LogRecord:
+        record = copy.copy(record)
+        if record.exc_info:
+            record.exc_text = logging.Formatter().formatException(record.exc_info)
+            record.exc_info = None
+        return record
+
+
+class JsonFormatter(logging.Formatter):
+    def format(self, record: logging.LogRecord) -> str:
+        entry = {
+            "ts": datetime.fromtimestamp(record.created, timezone.utc).isoformat(),
+            "level": record.levelname,
+            "logger": record.name,
+            "message": record.getMessage(),
+            "request_id": getattr(record, "request_id", None),
+        }
+        if record.exc_info:
+            entry["exc_info"] = self.formatException(record.exc_info)
+        elif record.exc_text:
+            entry["exc_info"] = record.exc_text
+        if record.stack_info:
+            entry["stack_info"] = record.stack_info
+        return orjson.dumps(entry, default=str).decode("utf-8")
+
+
+def configure_logging():
+    """
+    Настройка логирования приложения (вместо logging.basicConfig).
+
+    При LOG_QUEUE запись в stderr идет в отдельном потоке: обработчик в event
+    loop только кладет запись в очередь, а форматирование сообщения и запись
+    выполняет поток QueueListener.
+    """
+    global _listener
+    if _listener is not None:
+        return
+
+    formatter = JsonFormatter() if settings.LOG_FORMAT == "json" else logging.Formatter(_TEXT_FORMAT)
+    stream_handler = logging.StreamHandler(sys.stderr)
+    stream_handler.setFormatter(formatter)
+
+    if settings.LOG_QUEUE:
+        handler = DeferredQueueHandler(queue.SimpleQueue())
+        _listener = QueueListener(handler.queue, stream_handler, respect_handler_level=True)
+        _listener.start()
+        atexit.register(_listener.stop)
+    else:
+        handler = stream_handler
+    handler.addFilter(RequestIdFilter())
+
+    root = logging.getLogger()
+    root.handlers = [handler]
+    root.setLevel(settings.LOG_LEVEL)
+    for name in _UVICORN_LOGGERS:
+        uvicorn_logger = logging.getLogger(name)
+        uvicorn_logger.handlers = []
+        uvicorn_logger.propagate = True
+
+
+def sample_success() -> bool:
+    """Писать ли очередной лог об успехе (LOG_SUCCESS_SAMPLE_RATE); проверяется до вызова logger"""
+    rate = settings.LOG_SUCCESS_SAMPLE_RATE
+    return rate >= 1 or (rate > 0 and random.random() < rate)
@@ -0,0 +1,142 @@
+import os
+import time
+from contextvars import ContextVar
+from dataclasses import dataclass
+
+from prometheus_client import CollectorRegistry, Counter, Gauge, Histogram, REGISTRY, generate_latest, multiprocess
+from sqlalchemy import event
+from sqlalchemy.ext.asyncio import AsyncEngine
+
+# При нескольких воркерах run.py задает PROMETHEUS_MULTIPROC_DIR, и значения
+# собираются из файлов всех процессов, а не только того, что обслужил запрос
+MULTIPROCESS = "PROMETHEUS_MULTIPROC_DIR" in os.environ
+
+_LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+_DB_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 5.0)
+
+HTTP_REQUEST_DURATION = Histogram(
+    "http_request_duration_seconds", "Время обработки HTTP-запроса",
+    ["method", "route", "status"], buckets=_LATENCY_BUCKETS,
+)
+HTTP_REQUESTS_IN_PROGRESS = Gauge(
+    "http_requests_in_progress", "Запросы в обработке",
+    ["method", "route"], multiprocess_mode="livesum",
+)
+HTTP_REQUEST_DB_QUERIES = Histogram(
+    "http_request_db_queries", "Число SQL-запросов на один HTTP-запрос",
+    ["route"], buckets=(0, 1, 2, 3, 5, 8, 13, 21, 50, 100),
+)
+HTTP_REQUEST_DB_SECONDS = Histogram(
+    "http_request_db_seconds", "Суммарное время SQL-запросов на один HTTP-запрос",
+    ["route"], buckets=_DB_BUCKETS,
+)
+
+DB_QUERY_DURATION = Histogram(
+    "db_query_duration_seconds", "Время выполнения SQL-запроса",
+    ["operation"], buckets=_DB_BUCKETS,
+)
+DB_POOL_CHECKOUT_WAIT = Histogram(
+    "db_pool_checkout_wait_seconds", "Ожидание свободного соединения в пуле",
+    buckets=_DB_BUCKETS,
+)
+DB_POOL_CHECKOUT_TIMEOUTS = Counter(
+    "db_pool_checkout_timeouts", "Таймауты ожидания соединения из пула",
+)
+DB_POOL_IN_USE = Gauge(
+    "db_pool_connections_in_use", "Соединения, выданные из пула",
+    multiprocess_mode="livesum",
+)
+
+N8N_DELIVERIES = Counter(
+    "n8n_deliveries", "Запросы доставки в n8n",
+    ["mode", "result"],
+)
+N8N_DELIVERED_EMAILS = Counter(
+    "n8n_delivered_emails", "Письма, успешно доставленные в n8n",
+)
+N8N_DELIVERY_DURATION = Histogram(
+    "n8n_delivery_duration_seconds", "Время запроса доставки в n8n",
+    ["mode"], buckets=_LATENCY_BUCKETS,
+)
+
+EMAILS_ON_APPROVAL = Gauge(
+    "emails_on_approval", "Письма в очереди модерации",
+    multiprocess_mode="mostrecent",
+)
+OUTBOX_PENDING = Gauge(
+    "webhook_outbox_pending", "Записи outbox, ожидающие доставки",
+    multiprocess_mode="mostrecent",
+)
+OUTBOX_IN_FLIGHT = Gauge(
+    "webhook_outbox_in_flight", "Доставки outbox, выполняющиеся прямо сейчас",
+    multiprocess_mode="livesum",
+)
+
+EVENT_LOOP_LAG = Histogram(
+    "event_loop_lag_seconds", "Опоздание таймера event loop относительно запланированного времени",
+    buckets=(0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0),
+)
+
+_SQL_OPERATIONS = {"SELECT", "INSERT", "UPDATE", "DELETE", "WITH"}
+
+
+@dataclass
+class RequestDbStats:
+    """Счетчики SQL текущего HTTP-запроса (заполняются событиями движка)"""
+    queries: int = 0
+    seconds: float = 0.0
+
+
+request_db_stats: ContextVar[RequestDbStats | None] = ContextVar("request_db_stats", default=None)
+
+
+def _operation(statement: str) -> str:
+    head = statement.lstrip()[:16].split(None, 1)
+    word = head[0].upper() if head else ""
+    return word if word in _SQL_OPERATIONS else "OTHER"
+
+
+def instrument_engine(engine: AsyncEngine):
+    """Подписаться на события движка: длительность запросов и занятые соединения пула"""
+    sync_engine = engine.sync_engine
+
+    @event.listens_for(sync_engine, "before_cursor_execute")
+    def _before_execute(conn, cursor, statement, parameters, context, executemany):
+        conn.info.setdefault("query_start", []).append(time.perf_counter())
+
+    @event.listens_for(sync_engine, "after_cursor_execute")
+    def _after_execute(conn, cursor, statement, parameters, context, executemany):
+        elapsed = time.perf_counter() - conn.info["query_start"].pop()
+        DB_QUERY_DURATION.labels(_operation(statement)).observe(elapsed)
+        stats = request_db_stats.get()
+        if stats is not None:
+            stats.queries += 1
+            stats.seconds += elapsed
+
+    @event.listens_for(sync_engine, "handle_error")
+    def _on_error(exception_context):
+        conn = exception_context.connection
+        if conn is not None and conn.info.get("query_start"):
+            conn.info["query_start"].pop()
+
+    @event.listens_for(sync_engine.pool, "checkout")
+    def _on_checkout(dbapi_connection, connection_record, connection_proxy):
+        DB_POOL_IN_USE.inc()
+
+    @event.listens_for(sync_engine.pool, "checkin")
+    def _on_checkin(dbapi_connection, connection_record):
+        DB_POOL_IN_USE.dec()
+
+
+def render_metrics() -> bytes:
+    if MULTIPROCESS:
+        registry = CollectorRegistry()
+        multiprocess.MultiProcessCollector(registry)
+        return generate_latest(registry)
+    return generate_latest(REGISTRY)
+
+
+def mark_process_dead():
+    """Убрать live-метрики завершающегося воркера"""
+    if MULTIPROCESS:
+        multiprocess.mark_process_dead(os.getpid())
@@ -0,0 +1,145 @@
+import asyncio
+import itertools
+import logging
+from dataclasses import dataclass, field
+
+from sqlalchemy import text
+from sqlalchemy.ext.asyncio import AsyncEngine, AsyncSession, async_sessionmaker
+
+from app.core.config import settings
+from app.core.db_pool import pool_status
+
+logger = logging.getLogger("uvicorn.error")
+
+# Отставание реплики в секундах; 0, если все полученные изменения уже применены
+_LAG_QUERY = text(
+    "SELECT CASE WHEN NOT pg_is_in_recovery() OR pg_last_wal_receive_lsn() = pg_last_wal_replay_lsn() "
+    "THEN 0 ELSE COALESCE(EXTRACT(EPOCH FROM now() - pg_last_xact_replay_timestamp()), 0) END"
+)
+
+
+def replica_urls() -> list[str]:
+    return [url.strip() for url in settings.DATABASE_REPLICA_URLS.split(",") if url.strip()]
+
+
+@dataclass
+class Replica:
+    name: str
+    engine: AsyncEngine
+    session_factory: async_sessionmaker
+    # До первой успешной проверки реплика не используется
+    healthy: bool = False
+    lag_seconds: float | None = None
+    last_error: str | None = field(default=None, repr=False)
+
+
+class ReplicaSet:
+    """
+    Набор реплик для чтения с проверкой здоровья.
+
+    Фоновая задача раз в REPLICA_HEALTH_CHECK_INTERVAL проверяет каждую
+    реплику (доступность и отставание). choose() по кругу выдает здоровые
+    реплики или None - тогда читать нужно с основной БД.
+    """
+
+    def __init__(self, engines: list[AsyncEngine]):
+        self.replicas = [
+            Replica(
+                name=engine.url.render_as_string(hide_password=True),
+                engine=engine,
+                session_factory=async_sessionmaker(bind=engine, class_=AsyncSession, expire_on_commit=False),
+            )
+            for engine in engines
+        ]
+        self._counter = itertools.count()
+        self._task: asyncio.Task | None = None
+
+    def choose(self) -> Replica | None:
+        healthy = [replica for replica in self.replicas if replica.healthy]
+        if not healthy:
+            return None
+        return healthy[next(self._counter) % len(healthy)]
+
+    def mark_down(self, replica: Replica, error: str):
+        """Вывести реплику из ротации до следующей успешной проверки"""
+        if replica.healthy:
+            logger.warning("Реплика %s выведена из ротации: %s", replica.name, error)
+        replica.healthy = False
+        replica.last_error = error
+
+    def start(self):
+        if self.replicas and self._task is None:
+            self._task = asyncio.create_task(self._run(), name="replica-health")
+
+    async def stop(self):
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+        for replica in self.replicas:
+            await replica.engine.dispose()
+
+    async def _run(self):
+        while True:
+            await asyncio.gather(*(self._check(replica) for replica in self.replicas))
+            await asyncio.sleep(settings.REPLICA_HEALTH_CHECK_INTERVAL)
+
+    async def _check(self, replica: Replica):
+        try:
+            lag = await asyncio.wait_for(self._lag(replica), timeout=settings.REPLICA_HEALTH_CHECK_TIMEOUT)
+        except Exception as e:
+            self.mark_down(replica, repr(e))
+            return
+
+        replica.lag_seconds = lag
+        if lag > settings.REPLICA_MAX_LAG_SECONDS:
+            self.mark_down(replica, f"отставание {lag:.1f} с")
+            return
+        if not replica.healthy:
+            logger.info("Реплика %s в ротации (отставание %.1f с)", replica.name, lag)
+        replica.healthy = True
+        replica.last_error = None
+
+    async def _lag(self, replica: Replica) -> float:
+        async with replica.engine.connect() as conn:
+            if conn.dialect.name != "postgresql":
+                await conn.execute(text("SELECT 1"))
+                return 0.0
+            return float(await conn.scalar(_LAG_QUERY))
+
+    def status(self) -> list[dict]:
+        return [
+            {
+                "name": replica.name,
+                "healthy": replica.healthy,
+                "lag_seconds": replica.lag_seconds,
+                "last_error": replica.last_error,
+                "pool": pool_status(replica.engine),
+            }
+            for replica in self.replicas
+        ]
+
+
+def read_session(read_db: AsyncSession, db: AsyncSession) -> AsyncSession:
+    """Реплика, если она выбрана; иначе уже открытая сессия основной БД, чтобы не брать второе соединение"""
+    return read_db if read_db.info.get("replica") is not None else db
+
+
+async def fresh_read_session(read_db: AsyncSession, db: AsyncSession) -> AsyncSession:
+    """
+    Сессия для чтения, согласованная с версией данных, уже прочитанной из db.
+
+    Версия для ETag читается с основной БД. Если реплика еще не применила
+    WAL до текущей позиции основной БД, ее данные могут быть старше версии,
+    и клиент закэшировал бы их под новым ETag - тогда читаем с основной.
+    """
+    if read_db.info.get("replica") is None:
+        return db
+    lsn = await db.scalar(text("SELECT pg_current_wal_lsn()::text"))
+    caught_up = await read_db.scalar(
+        text("SELECT pg_last_wal_replay_lsn() >= CAST(:lsn AS pg_lsn)"), {"lsn": lsn}
+    )
+    return read_db if caught_up else db
@@ -0,0 +1,51 @@
+import logging
+import time
+
+from sqlalchemy import event
+from sqlalchemy.ext.asyncio import AsyncEngine
+
+from app.core.config import settings
+
+logger = logging.getLogger("uvicorn.error")
+
+_MAX_STATEMENT_LENGTH = 2000
+
+
+def params_shape(parameters, executemany: bool) -> str:
+    """Форма параметров без самих значений (в них бывают письма и пароли): 'dict[3]', '500 x tuple[4]'"""
+    if executemany and isinstance(parameters, (list, tuple)):
+        first = parameters[0] if parameters else None
+        return f"{len(parameters)} x {params_shape(first, False)}"
+    if parameters is None:
+        return "none"
+    if isinstance(parameters, (dict, list, tuple)):
+        return f"{type(parameters).__name__}[{len(parameters)}]"
+    return type(parameters).__name__
+
+
+def install_slow_query_log(engine: AsyncEngine):
+    """Логировать запросы дольше SLOW_QUERY_THRESHOLD_MS: текст, форма параметров и длительность"""
+    if settings.SLOW_QUERY_THRESHOLD_MS <= 0:
+        return
+    threshold = settings.SLOW_QUERY_THRESHOLD_MS / 1000
+    sync_engine = engine.sync_engine
+
+    @event.listens_for(sync_engine, "before_cursor_execute")
+    def _before_execute(conn, cursor, statement, parameters, context, executemany):
+        conn.info.setdefault("slow_query_start", []).append(time.perf_counter())
+
+    @event.listens_for(sync_engine, "after_cursor_execute")
+    def _after_execute(conn, cursor, statement, parameters, context, executemany):
+        elapsed = time.perf_counter() - conn.info["slow_query_start"].pop()
+        if elapsed < threshold:
+            return
+        logger.warning(
+            "Медленный SQL-запрос %.1f мс, параметры %s: %s",
+            elapsed * 1000, params_shape(parameters, executemany), statement[:_MAX_STATEMENT_LENGTH],
+        )
+
+    @event.listens_for(sync_engine, "handle_error")
+    def _on_error(exception_context):
+        conn = exception_context.connection
+        if conn is not None and conn.info.get("slow_query_start"):
+            conn.info["slow_query_start"].pop()
@@ -1,76 +1,414 @@
-from sqlalchemy import select
+from datetime import datetime
+
+from sqlalchemy import select, insert, update, delete, tuple_, func, text, literal, type_coerce, and_, or_, case, LargeBinary
+from sqlalchemy.dialects.postgresql import insert as pg_insert
+from sqlalchemy.dialects.sqlite import insert as sqlite_insert
+from sqlalchemy.exc import IntegrityError
 from sqlalchemy.ext.asyncio import AsyncSession
 from app.models.email import Email, EmailStatus
-from app.schemas.email import EmailCreate, EmailUpdate
+from app.models.types import octet_length, sortable_datetime
+from app.schemas.email import EmailCreate, EmailResponse, EmailUpdate
+from app.crud.outbox import enqueue_email_webhook, enqueue_email_webhooks
+from app.services.email_events import email_events
+from app.core.config import settings
+from app.utils.idempotency import content_hash, idempotency_cache
+from app.utils.compression import GZIP_MAGIC, ZSTD_MAGIC
+
+async def _insert_ignoring_conflicts(db: AsyncSession, rows: list[dict], *returning) -> list:
+    """
+    INSERT ... RETURNING, пропускающий строки с уже занятым ключом идемпотентности
+    (Idempotency-Key или хэш содержимого письма на модерации).
+
+    Postgres и SQLite - одним запросом с ON CONFLICT DO NOTHING, другие БД -
+    построчно в SAVEPOINT с перехватом IntegrityError.
+    """
+    dialect = db.bind.dialect.name
+    if dialect in ("postgresql", "sqlite"):
+        insert_ = pg_insert if dialect == "postgresql" else sqlite_insert
+        query = insert_(Email).on_conflict_do_nothing().returning(*returning)
+        if len(rows) == 1:
+            return (await db.execute(query.values(**rows[0]))).all()
+        return (await db.execute(query, rows)).all()
+
+    inserted = []
+    for row in rows:
+        try:
+            async with db.begin_nested():
+                inserted.append((await db.execute(insert(Email).values(**row).returning(*returning))).one())
+        except IntegrityError:
+            pass
+    return inserted
+
+
+async def _find_duplicate(db: AsyncSession, idempotency_key: str | None, digest: str | None) -> Email | None:
+    if idempotency_key is not None:
+        email = await db.scalar(select(Email).where(Email.idempotency_key == idempotency_key))
+        if email:
+            return email
+    if digest is not None:
+        return await db.scalar(
+            select(Email).where(Email.content_hash == digest, Email.status == EmailStatus.ON_APPROVAL)
+        )
+    return None
+
+
+async def create_email(
+        db: AsyncSession,
+        email_in: EmailCreate,
+        idempotency_key: str | None = None,
+) -> tuple[Email | EmailResponse, bool]:
+    """
+    Сохранить письмо из вебхука. Повторная доставка с тем же Idempotency-Key
+    возвращает исходное письмо (из кэша - без запроса к БД). При
+    WEBHOOK_DEDUP_BY_CONTENT дубликатом считается и то же содержимое, пока
+    исходное письмо на модерации.
+
+    Возвращает (письмо, создано ли новое).
+    """
+    cached = idempotency_cache.get(idempotency_key)
+    if cached is not None:
+        return cached, False
+
+    digest = content_hash(email_in.text_content, email_in.html_content) if settings.WEBHOOK_DEDUP_BY_CONTENT else None
+    values = {
+        "text_content": email_in.text_content,
+        "html_content": email_in.html_content,
+        "status": EmailStatus.ON_APPROVAL,
+        "content_hash": digest,
+        "idempotency_key": idempotency_key,
+    }
+
+    if idempotency_key is None and digest is None:
+        db_email = await db.scalar(insert(Email).values(**values).returning(Email))
+        email_events.publish(db, "created", [db_email.id], db_email.status)
+        await db.commit()
+        return db_email, True
+
+    while True:
+        inserted = await _insert_ignoring_conflicts(db, [values], Email)
+        if inserted:
+            db_email, created = inserted[0][0], True
+            email_events.publish(db, "created", [db_email.id], db_email.status)
+            await db.commit()
+            break
+        db_email, created = await _find_duplicate(db, idempotency_key, digest), False
+        if db_email is not None:
+            break
+        # Дубликат успели одобрить или удалить между INSERT и SELECT - вставляем заново
+
+    if idempotency_key is not None:
+        idempotency_cache.set(idempotency_key, EmailResponse.model_validate(db_email))
+    return db_email, created
+
+
+async def insert_emails(db: AsyncSession, emails_in: list[EmailCreate]) -> list[int]:
+    """
+    Вставка пачки писем одним INSERT ... RETURNING (без коммита).
 
-async def create_email(db: AsyncSession, email_in: EmailCreate) -> Email:
-    db_email = Email(
-        text_content=email_in.text_content,
-        html_content=email_in.html_content,
-        status=EmailStatus.ON_APPROVAL
+    При WEBHOOK_DEDUP_BY_CONTENT письма, совпадающие с письмом на модерации,
+    не дублируются: для них возвращаются id существующих записей.
+    """
+    if not emails_in:
+        return []
+
+    if not settings.WEBHOOK_DEDUP_BY_CONTENT:
+        query = insert(Email).returning(Email.id, sort_by_parameter_order=True)
+        result = await db.execute(query, [
+            {
+                "text_content": email_in.text_content,
+                "html_content": email_in.html_content,
+                "status": EmailStatus.ON_APPROVAL,
+            }
+            for email_in in emails_in
+        ])
+        ids = list(result.scalars().all())
+        email_events.publish(db, "created", ids, EmailStatus.ON_APPROVAL)
+        return ids
+
+    digests = [content_hash(email_in.text_content, email_in.html_content) for email_in in emails_in]
+    inserted = await _insert_ignoring_conflicts(db, [
+        {
+            "text_content": email_in.text_content,
+            "html_content": email_in.html_content,
+            "status": EmailStatus.ON_APPROVAL,
+            "content_hash": digest,
+        }
+        for email_in, digest in zip(emails_in, digests)
+    ], Email.id, Email.content_hash)
+    id_by_digest = {digest: email_id for email_id, digest in inserted}
+    email_events.publish(db, "created", list(id_by_digest.values()), EmailStatus.ON_APPROVAL)
+
+    missing = {digest for digest in digests if digest not in id_by_digest}
+    if missing:
+        existing = await db.execute(
+            select(Email.content_hash, Email.id)
+            .where(Email.content_hash.in_(missing), Email.status == EmailStatus.ON_APPROVAL)
+        )
+        id_by_digest.update(existing.tuples().all())
+
+    # Дубликат успели одобрить или удалить между INSERT и SELECT - вставляем заново
+    retry = [(email_in, digest) for email_in, digest in zip(emails_in, digests) if digest not in id_by_digest]
+    if retry:
+        retry_ids = await insert_emails(db, [email_in for email_in, _ in retry])
+        id_by_digest.update(zip((digest for _, digest in retry), retry_ids))
+    return [id_by_digest[digest] for digest in digests]
+
+
+def _list_query(summary: bool):
+    """
+    Полные письма или краткая проекция без html_content.
+
+    octet_length у Postgres берет размер из заголовка TOAST и не распаковывает
+    само значение; размер HTML хранится отдельно (html_size), так как сам
+    html_content может быть сжат. HTML при кратком представлении не читается.
+    У еще не перенесенных писем html_size пуст - размер берется из старого столбца.
+    """
+    if not summary:
+        return select(Email)
+    return select(
+        Email.id,
+        Email.status,
+        Email.created_at,
+        func.substr(Email.text_content, 1, settings.EMAIL_PREVIEW_LENGTH).label("text_preview"),
+        func.coalesce(octet_length(Email.text_content), 0).label("text_size"),
+        func.coalesce(Email.html_size, octet_length(Email.legacy_html_content), 0).label("html_size"),
     )
-    db.add(db_email)
-    await db.commit()
-    await db.refresh(db_email)
-    return db_email
 
-async def get_emails_on_approval(db: AsyncSession, skip: int = 0, limit: int = 100):
-    query = select(Email).filter(Email.status == EmailStatus.ON_APPROVAL).offset(skip).limit(limit)
+
+async def get_emails_on_approval(
+        db: AsyncSession,
+        limit: int = 100,
+        after: tuple[datetime, int] | None = None,
+        skip: int = 0,
+        summary: bool = False,
+):
+    """
+    Письма на модерации в порядке поступления (created_at, id).
+
+    after - ключ последней строки предыдущей страницы (keyset-пагинация,
+    использует частичный индекс ix_emails_on_approval_created_at_id).
+    skip оставлен для обратной совместимости и применяется только без after.
+    """
+    query = (
+        _list_query(summary)
+        .filter(Email.status == EmailStatus.ON_APPROVAL)
+        .order_by(Email.created_at, Email.id)
+        .limit(limit)
+    )
+    if after is not None:
+        created_at, email_id = after
+        query = query.filter(
+            tuple_(sortable_datetime(Email.created_at), Email.id)
+            > tuple_(sortable_datetime(literal(created_at, Email.created_at.type)), email_id)
+        )
+    elif skip:
+        query = query.offset(skip)
     result = await db.execute(query)
-    return result.scalars().all()
+    return result.all() if summary else result.scalars().all()
+
+
+async def count_emails_on_approval(db: AsyncSession) -> int:
+    """Глубина очереди модерации (по частичному индексу ix_emails_on_approval_created_at_id)"""
+    return await db.scalar(select(func.count()).select_from(Email).where(Email.status == EmailStatus.ON_APPROVAL))
+
+
+async def get_emails_version(db: AsyncSession) -> int | None:
+    """
+    Версия данных таблицы emails для ETag.
+
+    Сумма счетчиков email_change_counter, которые триггер увеличивает в транзакции
+    каждой записи в emails (см. миграцию 5d2a9e7c1f83), поэтому версия видна только
+    вместе с закоммиченными строками. Данные читаются после версии и не старше
+    ее - под версией никогда не кэшируется более старое тело.
+    Для других БД версии нет - None.
+    """
+    if db.bind.dialect.name != "postgresql":
+        return None
+    return await db.scalar(text("SELECT sum(version) FROM email_change_counter"))
+
 
 async def get_email_by_id(db: AsyncSession, email_id: int):
     query = select(Email).filter(Email.id == email_id)
     result = await db.execute(query)
     return result.scalars().first()
 
-async def update_email_status(db: AsyncSession, email: Email, status: str):
-    email.status = status
-    db.add(email)
+async def update_email_status(db: AsyncSession, email_id: int, status: EmailStatus) -> Email | None:
+    """UPDATE ... RETURNING; при одобрении в той же транзакции пишет запись в outbox"""
+    query = update(Email).where(Email.id == email_id).values(status=status).returning(Email)
+    email = await db.scalar(query)
+
+    if not email:
+        return None
+
+    if status == EmailStatus.APPROVED:
+        # Запись в outbox коммитится вместе со сменой статуса: одобрение не потеряется
+        enqueue_email_webhook(db, email)
+    email_events.publish(db, "status_changed", [email.id], status)
     await db.commit()
-    await db.refresh(email)
     return email
 
 
-async def get_all_emails(db: AsyncSession):
-    query = select(Email).order_by(Email.id)
-    result = await db.execute(query)
-    return result.scalars().all()
+def _bulk_conditions(ids: list[int] | None, pending_older_than: datetime | None) -> list:
+    conditions = []
+    if ids is not None:
+        conditions.append(Email.id.in_(ids))
+    if pending_older_than is not None:
+        conditions.append(Email.status == EmailStatus.ON_APPROVAL)
+        conditions.append(Email.created_at < pending_older_than)
+    return conditions
 
 
-async def remove_email(db: AsyncSession, email_id: int):
-    result = await db.execute(
-        select(Email).where(Email.id == email_id)
+async def bulk_update_email_status(
+        db: AsyncSession,
+        status: EmailStatus,
+        ids: list[int] | None = None,
+        pending_older_than: datetime | None = None,
+) -> list[Email]:
+    """Одним UPDATE ... RETURNING меняет статус всех подходящих писем; одобренные ставятся в outbox"""
+    query = (
+        update(Email)
+        .where(*_bulk_conditions(ids, pending_older_than))
+        .values(status=status)
+        .returning(Email)
+        .execution_options(synchronize_session=False)
     )
-    email = result.scalar_one_or_none()
+    emails = list((await db.scalars(query)).all())
+
+    if emails and status == EmailStatus.APPROVED:
+        await enqueue_email_webhooks(db, emails)
+    email_events.publish(db, "status_changed", [email.id for email in emails], status)
+    await db.commit()
+    return emails
+
+
+async def bulk_remove_emails(
+        db: AsyncSession,
+        ids: list[int] | None = None,
+        pending_older_than: datetime | None = None,
+) -> list[int]:
+    query = (
+        delete(Email)
+        .where(*_bulk_conditions(ids, pending_older_than))
+        .returning(Email.id)
+        .execution_options(synchronize_session=False)
+    )
+    email_ids = list((await db.scalars(query)).all())
+    email_events.publish(db, "deleted", email_ids)
+    await db.commit()
+    return email_ids
+
+
+async def get_all_emails(db: AsyncSession, limit: int = 1000, after_id: int | None = None, summary: bool = False):
+    query = _list_query(summary).order_by(Email.id).limit(limit)
+    if after_id is not None:
+        query = query.filter(Email.id > after_id)
+    result = await db.execute(query)
+    return result.all() if summary else result.scalars().all()
+
+
+async def stream_all_emails(db: AsyncSession, after_id: int | None = None, chunk_size: int = 500):
+    """Все письма по порядку id через серверный курсор, без загрузки архива в память"""
+    query = select(Email).order_by(Email.id).execution_options(yield_per=chunk_size)
+    if after_id is not None:
+        query = query.filter(Email.id > after_id)
+    result = await db.stream_scalars(query)
+    async for email in result:
+        yield email
+
+
+async def remove_email(db: AsyncSession, email_id: int) -> Email | None:
+    query = delete(Email).where(Email.id == email_id).returning(Email)
+    email = await db.scalar(query)
 
     if not email:
         return None
 
-    await db.delete(email)
+    email_events.publish(db, "deleted", [email.id])
     await db.commit()
     return email
 
 
+async def edit_email(db: AsyncSession, email_id: int, update_data: EmailUpdate) -> Email | None:
+    values = update_data.model_dump(exclude_none=True)
+    if not values:
+        return await get_email_by_id(db, email_id)
+    if "html_content" in values:
+        values["html_size"] = len(values["html_content"].encode("utf-8"))
+        values["legacy_html_content"] = None
+    content_changed = "text_content" in values or "html_content" in values
+    if content_changed:
+        # Старый хэш больше не соответствует содержимому
+        values["content_hash"] = None
 
-async def edit_email(db: AsyncSession, email_id: int, update_data: EmailUpdate):
-    result = await db.execute(
-        select(Email).where(Email.id == email_id)
-    )
-    email = result.scalar_one_or_none()
+    query = update(Email).where(Email.id == email_id).values(**values).returning(Email)
+    email = await db.scalar(query)
 
     if not email:
         return None
 
+    if content_changed and settings.WEBHOOK_DEDUP_BY_CONTENT:
+        # Хэш считается по итоговому содержимому, поэтому уже после UPDATE (строка заблокирована).
+        # Если такое же письмо уже ждет модерации, хэш не ставим: правка не должна падать
+        # на уникальном индексе, а дубликатом по-прежнему считается более раннее письмо
+        digest = content_hash(email.text_content, email.html_content)
+        taken = (
+            select(Email.id)
+            .where(Email.content_hash == digest, Email.status == EmailStatus.ON_APPROVAL, Email.id != email.id)
+            .exists()
+        )
+        await db.execute(
+            update(Email)
+            .where(Email.id == email.id)
+            .values(content_hash=case((taken, None), else_=digest))
+        )
 
-    if update_data.text_content is not None:
-        email.text_content = update_data.text_content
-
-    if update_data.html_content is not None:
-        email.html_content = update_data.html_content
-
+    email_events.publish(db, "edited", [email.id], email.status)
     await db.commit()
-    await db.refresh(email)
     return email
 
 
+async def compress_stored_emails(db: AsyncSession, after_id: int, limit: int) -> int | None:
+    """
+    Пересохраняет следующую пачку писем с id > after_id: переносит письма из
+    старого текстового столбца (с заполнением html_size) и сжимает несжатые
+    в текущем режиме. Возвращает id последнего просмотренного письма или None,
+    если обрабатывать больше нечего.
+    """
+    pending = Email.legacy_html_content.is_not(None)
+    if settings.EMAIL_CONTENT_COMPRESSION != "none":
+        raw = type_coerce(Email.html_content, LargeBinary)
+        pending = or_(pending, and_(
+            octet_length(raw) >= settings.EMAIL_COMPRESSION_MIN_SIZE,
+            func.substr(raw, 1, len(GZIP_MAGIC)) != literal(GZIP_MAGIC, LargeBinary),
+            func.substr(raw, 1, len(ZSTD_MAGIC)) != literal(ZSTD_MAGIC, LargeBinary),
+        ))
+    query = (
+        select(Email.id, Email.html_content, Email.legacy_html_content)
+        .where(Email.id > after_id, pending)
+        .order_by(Email.id)
+        .limit(limit)
+        # Строки, которые сейчас правятся, пропускаем, а не ждем
+        .with_for_update(skip_locked=True)
+    )
+    rows = (await db.execute(query)).all()
+    if not rows:
+        return None
+
+    if db.bind.dialect.name == "postgresql":
+        # Ответы API не меняются (тело то же, html_size совпадает с вычисленным):
+        # без событий SSE и без смены версии для ETag, иначе каждая пачка сбрасывала бы
+        # кэши клиентов (см. bump_email_version и notify_email_events)
+        await db.execute(text("SET LOCAL app.email_changes = 'off'"))
+    # ORM bulk UPDATE по первичному ключу: значение проходит через CompressedText и сжимается
+    values = []
+    for row in rows:
+        html_content = row.legacy_html_content if row.legacy_html_content is not None else row.html_content
+        values.append({
+            "id": row.id,
+            "html_content": html_content,
+            "legacy_html_content": None,
+            "html_size": len(html_content.encode("utf-8")),
+        })
+    await db.execute(update(Email), values)
+    await db.commit()
+    return rows[-1].id
@@ -0,0 +1,129 @@
+import random
+from datetime import datetime, timedelta, timezone
+
+from sqlalchemy import select, update, insert, func
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.core.config import settings
+from app.core.logging_config import request_id_var
+from app.models.email import Email
+from app.models.outbox import WebhookOutbox, OutboxStatus
+from app.schemas.email import EmailResponse
+from app.services.n8n_wh_emails import build_n8n_payload
+
+
+def _utcnow() -> datetime:
+    return datetime.now(timezone.utc)
+
+
+def backoff_delay(attempts: int) -> float:
+    """Экспоненциальная задержка с джиттером (equal jitter) после attempts неудачных попыток"""
+    delay = min(settings.OUTBOX_BACKOFF_MAX, settings.OUTBOX_BACKOFF_BASE * 2 ** max(attempts - 1, 0))
+    return delay / 2 + random.uniform(0, delay / 2)
+
+
+def enqueue_email_webhook(db: AsyncSession, email: Email) -> WebhookOutbox:
+    """Добавляет письмо в outbox в текущей транзакции (коммит делает вызывающий код)"""
+    entry = WebhookOutbox(
+        email_id=email.id,
+        payload=build_n8n_payload(EmailResponse.model_validate(email)),
+        status=OutboxStatus.PENDING,
+        attempts=0,
+        next_attempt_at=_utcnow(),
+        request_id=request_id_var.get(),
+    )
+    db.add(entry)
+    return entry
+
+
+async def enqueue_email_webhooks(db: AsyncSession, emails: list[Email]):
+    """
+    Пакетный вариант enqueue_email_webhook: один INSERT executemany без RETURNING.
+
+    ORM-flush с server_default и RETURNING на SQLite разбивается на INSERT на каждую строку.
+    """
+    request_id = request_id_var.get()
+    now = _utcnow()
+    await db.execute(
+        insert(WebhookOutbox),
+        [
+            {
+                "email_id": email.id,
+                "payload": build_n8n_payload(EmailResponse.model_validate(email)),
+                "status": OutboxStatus.PENDING,
+                "attempts": 0,
+                "next_attempt_at": now,
+                "request_id": request_id,
+            }
+            for email in emails
+        ],
+    )
+
+
+async def claim_due_webhooks(db: AsyncSession, limit: int) -> list[WebhookOutbox]:
+    """
+    Забирает до limit готовых к отправке записей.
+
+    Записи не меняют статус, а получают аренду: next_attempt_at сдвигается на
+    OUTBOX_LEASE_SECONDS. Если процесс упадет посреди доставки, запись снова
+    станет доступной после истечения аренды.
+    """
+    now = _utcnow()
+    due_ids = (
+        select(WebhookOutbox.id)
+        .where(
+            WebhookOutbox.status == OutboxStatus.PENDING,
+            WebhookOutbox.next_attempt_at <= now,
+        )
+        .order_by(WebhookOutbox.next_attempt_at, WebhookOutbox.id)
+        .limit(limit)
+        .with_for_update(skip_locked=True)
+    )
+    query = (
+        update(WebhookOutbox)
+        .where(WebhookOutbox.id.in_(due_ids.scalar_subquery()))
+        .values(
+            attempts=WebhookOutbox.attempts + 1,
+            next_attempt_at=now + timedelta(seconds=settings.OUTBOX_LEASE_SECONDS),
+        )
+        .returning(WebhookOutbox)
+        .execution_options(synchronize_session=False)
+    )
+    result = await db.execute(query)
+    entries = list(result.scalars().all())
+    await db.commit()
+    return entries
+
+
+async def mark_webhooks_delivered(db: AsyncSession, entry_ids: list[int]):
+    await db.execute(
+        update(WebhookOutbox)
+        .where(WebhookOutbox.id.in_(entry_ids))
+        .values(status=OutboxStatus.DELIVERED, delivered_at=_utcnow(), last_error=None)
+    )
+    await db.commit()
+
+
+async def mark_webhooks_failed(db: AsyncSession, entries: list[WebhookOutbox], error: str) -> list[WebhookOutbox]:
+    """Планирует повтор с backoff либо переводит записи в dead-letter. Возвращает записи, ушедшие в dead-letter."""
+    dead = []
+    for entry in entries:
+        if entry.attempts >= settings.OUTBOX_MAX_ATTEMPTS:
+            values = {"status": OutboxStatus.DEAD}
+            dead.append(entry)
+        else:
+            values = {"next_attempt_at": _utcnow() + timedelta(seconds=backoff_delay(entry.attempts))}
+
+        await db.execute(
+            update(WebhookOutbox)
+            .where(WebhookOutbox.id == entry.id)
+            .values(last_error=error[:2000], **values)
+        )
+    await db.commit()
+    return dead
+
+
+async def count_pending_webhooks(db: AsyncSession) -> int:
+    return await db.scalar(
+        select(func.count()).select_from(WebhookOutbox).where(WebhookOutbox.status == OutboxStatus.PENDING)
+    )
@@ -2,7 +2,7 @@ from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.future import select
 from app.models.user import User
 from app.schemas.user import UserCreate
-from app.utils.security import get_password_hash
+from app.utils.security import get_password_hash_async
 from app.utils.default_values import DEFAULT_ROLE
 
 
@@ -15,7 +15,7 @@ async def create_user(user_data: UserCreate, db: AsyncSession) -> User | None:
     if existing_user:
         return None
 
-    hashed_password = get_password_hash(user_data.password)
+    hashed_password = await get_password_hash_async(user_data.password)
 
     db_user = User(
         username=user_data.username,
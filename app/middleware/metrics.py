@@ -0,0 +1,66 @@
+import time
+
+from starlette.routing import Match
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+from app.core.metrics import (
+    HTTP_REQUEST_DURATION, HTTP_REQUESTS_IN_PROGRESS, HTTP_REQUEST_DB_QUERIES, HTTP_REQUEST_DB_SECONDS,
+    RequestDbStats, request_db_stats,
+)
+
+UNMATCHED_ROUTE = "unmatched"
+
+
+def _route_template(scope: Scope) -> str:
+    """
+    Шаблон пути (/api/emails/{email_id}), а не сам путь: иначе число серий
+    растет с каждым id. Определяется до роутинга тем же сопоставлением, что
+    делает роутер, чтобы метка была известна и для запросов в обработке.
+    """
+    app = scope.get("app")
+    for route in getattr(getattr(app, "router", None), "routes", []):
+        match, _ = route.matches(scope)
+        if match == Match.FULL:
+            return route.path
+    return UNMATCHED_ROUTE
+
+
+class MetricsMiddleware:
+    """
+    Метрики HTTP-запросов: гистограмма задержки по шаблону маршрута, запросы
+    в обработке и число/время SQL-запросов, выполненных в рамках запроса.
+    """
+
+    def __init__(self, app: ASGIApp):
+        self.app = app
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        method = scope["method"]
+        route = _route_template(scope)
+        in_progress = HTTP_REQUESTS_IN_PROGRESS.labels(method, route)
+        status_code = 500
+        stats = RequestDbStats()
+        token = request_db_stats.set(stats)
+
+        async def send_wrapper(message: Message):
+            nonlocal status_code
+            if message["type"] == "http.response.start":
+                status_code = message["status"]
+            await send(message)
+
+        in_progress.inc()
+        start = time.perf_counter()
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            elapsed = time.perf_counter() - start
+            in_progress.dec()
+            request_db_stats.reset(token)
+
+            HTTP_REQUEST_DURATION.labels(method, route, str(status_code)).observe(elapsed)
+            HTTP_REQUEST_DB_QUERIES.labels(route).observe(stats.queries)
+            HTTP_REQUEST_DB_SECONDS.labels(route).observe(stats.seconds)
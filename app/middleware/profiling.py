@@ -0,0 +1,99 @@
+import asyncio
+import logging
+import os
+import uuid
+from urllib.parse import parse_qs
+
+from fastapi import HTTPException
+from fastapi.responses import HTMLResponse, ORJSONResponse
+from pyinstrument import Profiler
+from starlette.requests import Request
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+from app.core.config import settings
+from app.core.database import AsyncSessionLocal
+from app.utils.dependencies import get_current_user, get_current_admin_user
+
+logger = logging.getLogger("uvicorn.error")
+
+PROFILE_HEADER = "X-Profile"
+PROFILE_ID_HEADER = "X-Profile-Id"
+PROFILE_QUERY_PARAM = "profile"
+
+
+class ProfilingMiddleware:
+    """
+    Семплирующий профиль (pyinstrument) отдельного запроса по запросу администратора.
+
+    Включается заголовком `X-Profile` или параметром `?profile=`:
+    - `html` - вместо ответа эндпоинта вернуть HTML-профиль;
+    - любое другое значение - обычный ответ с заголовком `X-Profile-Id`, а профиль
+      сохраняется в PROFILING_DIR (или пишется в лог текстом).
+
+    Профиль снимается с async_mode: в него попадает только код этого запроса,
+    включая ожидание БД, сериализацию и время, пока loop был занят чужим кодом.
+    """
+
+    def __init__(self, app: ASGIApp):
+        self.app = app
+        self._header = PROFILE_HEADER.lower().encode("latin-1")
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send):
+        mode = self._requested_mode(scope) if scope["type"] == "http" else None
+        if mode is None:
+            await self.app(scope, receive, send)
+            return
+
+        try:
+            async with AsyncSessionLocal() as db:
+                await get_current_admin_user(await get_current_user(Request(scope), db))
+        except HTTPException as e:
+            response = ORJSONResponse({"detail": e.detail}, status_code=e.status_code, headers=e.headers)
+            await response(scope, receive, send)
+            return
+
+        profile_id = uuid.uuid4().hex
+        profiler = Profiler(interval=settings.PROFILING_INTERVAL, async_mode="enabled")
+
+        async def send_wrapper(message: Message):
+            if mode == "html":
+                # Ответ эндпоинта заменяется профилем
+                return
+            if message["type"] == "http.response.start":
+                message.setdefault("headers", []).append(
+                    (PROFILE_ID_HEADER.lower().encode("latin-1"), profile_id.encode("latin-1"))
+                )
+            await send(message)
+
+        profiler.start()
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            profiler.stop()
+
+        if mode == "html":
+            await HTMLResponse(profiler.output_html())(scope, receive, send)
+        else:
+            await self._store(profiler, profile_id, scope)
+
+    def _requested_mode(self, scope: Scope) -> str | None:
+        for name, value in scope["headers"]:
+            if name == self._header and value:
+                return value.decode("latin-1").strip().lower()
+        values = parse_qs(scope.get("query_string", b"").decode("latin-1")).get(PROFILE_QUERY_PARAM)
+        return values[0].strip().lower() if values and values[0] else None
+
+    async def _store(self, profiler: Profiler, profile_id: str, scope: Scope):
+        if settings.PROFILING_DIR:
+            path = os.path.join(settings.PROFILING_DIR, f"{profile_id}.html")
+            await asyncio.to_thread(_write_file, path, profiler.output_html())
+            logger.info("Профиль %s %s сохранен в %s", scope["method"], scope["path"], path)
+        else:
+            logger.info("Профиль %s %s (%s):\n%s", scope["method"], scope["path"], profile_id,
+                        profiler.output_text(unicode=True, color=False))
+
+
+def _write_file(path: str, content: str):
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    with open(path, "w", encoding="utf-8") as f:
+        f.write(content)
@@ -0,0 +1,110 @@
+import hashlib
+
+from fastapi import HTTPException, status
+from fastapi.responses import ORJSONResponse
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+from app.core.config import settings
+from app.utils.rate_limit import TokenBucketLimiter, retry_after_header
+
+
+class WebhookGuardMiddleware:
+    """
+    Защита публичных эндпоинтов приема писем (/emails/webhook*).
+
+    - Размер тела ограничивается до разбора: запрос с большим Content-Length
+      сразу получает 413, а тело без Content-Length (chunked) считается по мере
+      чтения и обрывается 413, как только превысит лимит. В память попадает
+      не больше лимита.
+    - Лимит частоты запросов - token bucket на источник. Источник - заголовок
+      WEBHOOK_SOURCE_HEADER (секрет сценария n8n), если секрет известен
+      (WEBHOOK_SOURCE_SECRETS), иначе - IP клиента. Произвольным значением
+      заголовка нельзя ни обойти лимит, ни вытеснить чужие бакеты из LRU.
+
+    Чистый ASGI, а не BaseHTTPMiddleware: тело не буферизуется и потоковое
+    чтение в обработчике (NDJSON) продолжает работать.
+    """
+
+    def __init__(self, app: ASGIApp, path_prefix: str = "/api/emails/webhook"):
+        self.app = app
+        self.path_prefix = path_prefix
+        self.limiter = None
+        if settings.WEBHOOK_RATE_LIMIT_PER_SECOND > 0:
+            self.limiter = TokenBucketLimiter(
+                rate=settings.WEBHOOK_RATE_LIMIT_PER_SECOND,
+                burst=settings.WEBHOOK_RATE_LIMIT_BURST,
+                max_sources=settings.WEBHOOK_RATE_LIMIT_MAX_SOURCES,
+            )
+        self._source_header = settings.WEBHOOK_SOURCE_HEADER.lower().encode("latin-1")
+        # Сами секреты в памяти не держим, только их хэши
+        self._source_digests = {
+            _digest(secret.strip().encode("latin-1"))
+            for secret in settings.WEBHOOK_SOURCE_SECRETS.split(",") if secret.strip()
+        }
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send):
+        if scope["type"] != "http" or not scope["path"].startswith(self.path_prefix):
+            await self.app(scope, receive, send)
+            return
+
+        headers = dict(scope["headers"])
+
+        if self.limiter is not None:
+            retry_after = self.limiter.acquire(self._source_key(scope, headers))
+            if retry_after:
+                response = ORJSONResponse(
+                    {"detail": "Слишком много запросов от источника, повторите позже"},
+                    status_code=status.HTTP_429_TOO_MANY_REQUESTS,
+                    headers={"Retry-After": retry_after_header(retry_after)},
+                )
+                await response(scope, receive, send)
+                return
+
+        max_size = settings.WEBHOOK_BATCH_MAX_BODY_SIZE if scope["path"].startswith(
+            f"{self.path_prefix}/batch") else settings.WEBHOOK_MAX_BODY_SIZE
+
+        content_length = headers.get(b"content-length")
+        if content_length is not None and content_length.isdigit() and int(content_length) > max_size:
+            await _too_large(max_size)(scope, receive, send)
+            return
+
+        await self.app(scope, _limited_receive(receive, max_size), send)
+
+    def _source_key(self, scope: Scope, headers: dict[bytes, bytes]) -> str:
+        secret = headers.get(self._source_header)
+        if secret:
+            digest = _digest(secret)
+            if digest in self._source_digests:
+                return "src:" + digest
+        client = scope.get("client")
+        return "ip:" + (client[0] if client else "unknown")
+
+
+def _digest(secret: bytes) -> str:
+    return hashlib.sha256(secret).hexdigest()
+
+
+def _too_large(max_size: int) -> ORJSONResponse:
+    return ORJSONResponse(
+        {"detail": f"Тело запроса больше {max_size} байт"},
+        status_code=status.HTTP_413_REQUEST_ENTITY_TOO_LARGE,
+    )
+
+
+def _limited_receive(receive: Receive, max_size: int) -> Receive:
+    received = 0
+
+    async def wrapped() -> Message:
+        nonlocal received
+        message = await receive()
+        if message["type"] == "http.request":
+            received += len(message.get("body", b""))
+            if received > max_size:
+                # Обработчик еще читает тело, поэтому ответ еще не начат: FastAPI превратит это в 413
+                raise HTTPException(
+                    status_code=status.HTTP_413_REQUEST_ENTITY_TOO_LARGE,
+                    detail=f"Тело запроса больше {max_size} байт",
+                )
+        return message
+
+    return wrapped
@@ -1,6 +1,8 @@
-from sqlalchemy import Column, Integer, String, Text, DateTime, Enum
+from sqlalchemy import Column, Integer, String, Text, DateTime, Enum, Index, event, text
+from sqlalchemy.orm.attributes import set_committed_value
 from sqlalchemy.sql import func
 from app.core.database import Base
+from app.models.types import CompressedText
 import enum
 
 
@@ -11,10 +13,53 @@ class EmailStatus(enum.Enum):
     REJECTED = "rejected"
 
 
+def _html_size(context) -> int | None:
+    # Параметры INSERT приходят по именам столбцов, а не атрибутов
+    html_content = context.get_current_parameters().get("html_content_packed")
+    return len(html_content.encode("utf-8")) if html_content is not None else None
+
+
 class Email(Base):
     __tablename__ = "emails"
     id = Column(Integer, primary_key=True, index=True)
     text_content = Column(Text, nullable=False)
-    html_content = Column(Text, nullable=False)
+    # Переходный период (миграция a7c3e5f1b0d2): новые письма пишутся в столбец
+    # html_content_packed, старые лежат текстом в html_content, пока их не перенесет
+    # content_backfill. Для кода приложения письмо всегда выглядит как html_content.
+    html_content = Column("html_content_packed", CompressedText, nullable=True)
+    legacy_html_content = Column("html_content", Text, nullable=True)
+    # Размер html_content в байтах UTF-8 до сжатия (для краткого представления списков)
+    html_size = Column(Integer, nullable=True, default=_html_size)
     status = Column(Enum(EmailStatus), default=EmailStatus.ON_APPROVAL)
-    created_at = Column(DateTime(timezone=True), server_default=func.now())
\ No newline at end of file
+    created_at = Column(DateTime(timezone=True), server_default=func.now())
+    # Дедупликация входящих вебхуков: хэш исходного содержимого и Idempotency-Key.
+    # Хэш уникален только среди писем на модерации (ix_emails_content_hash_on_approval)
+    content_hash = Column(String(64), nullable=True)
+    idempotency_key = Column(String(255), nullable=True, unique=True, index=True)
+
+    __table_args__ = (
+        # Очередь модерации: WHERE status = 'ON_APPROVAL' ORDER BY created_at, id
+        Index(
+            "ix_emails_on_approval_created_at_id",
+            "created_at",
+            "id",
+            postgresql_where=text("status = 'ON_APPROVAL'"),
+        ),
+        # Повтор письма после одобрения/отклонения - новое письмо, а не дубликат
+        Index(
+            "ix_emails_content_hash_on_approval",
+            "content_hash",
+            unique=True,
+            postgresql_where=text("status = 'ON_APPROVAL'"),
+            sqlite_where=text("status = 'ON_APPROVAL'"),
+        ),
+    )
+
+
+@event.listens_for(Email, "load")
+@event.listens_for(Email, "refresh")
+def _read_legacy_html_content(email: Email, context, attrs=None):
+    """Еще не перенесенное письмо читается из старого текстового столбца"""
+    state = email.__dict__
+    if state.get("html_content") is None and state.get("legacy_html_content") is not None:
+        set_committed_value(email, "html_content", state["legacy_html_content"])
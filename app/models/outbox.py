@@ -0,0 +1,35 @@
+from sqlalchemy import Column, Integer, String, Text, DateTime, Enum, JSON, Index, text
+from sqlalchemy.sql import func
+from app.core.database import Base
+import enum
+
+
+class OutboxStatus(enum.Enum):
+    PENDING = "pending"
+    DELIVERED = "delivered"
+    DEAD = "dead"
+
+
+class WebhookOutbox(Base):
+    """Исходящий вебхук в n8n, ожидающий доставки"""
+    __tablename__ = "webhook_outbox"
+    id = Column(Integer, primary_key=True, index=True)
+    # Без внешнего ключа: письмо могут удалить, а снимок payload всё равно нужно доставить
+    email_id = Column(Integer, nullable=True, index=True)
+    payload = Column(JSON, nullable=False)
+    status = Column(Enum(OutboxStatus), default=OutboxStatus.PENDING, nullable=False)
+    attempts = Column(Integer, default=0, nullable=False)
+    next_attempt_at = Column(DateTime(timezone=True), server_default=func.now(), nullable=False)
+    last_error = Column(Text, nullable=True)
+    created_at = Column(DateTime(timezone=True), server_default=func.now())
+    delivered_at = Column(DateTime(timezone=True), nullable=True)
+    # id HTTP-запроса, поставившего запись в очередь (для сквозной корреляции логов)
+    request_id = Column(String(64), nullable=True)
+
+    __table_args__ = (
+        Index(
+            "ix_webhook_outbox_due",
+            "next_attempt_at",
+            postgresql_where=text("status = 'PENDING'"),
+        ),
+    )
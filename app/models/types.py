@@ -0,0 +1,79 @@
+from sqlalchemy import LargeBinary, Integer, cast
+from sqlalchemy.ext.compiler import compiles
+from sqlalchemy.sql.functions import FunctionElement
+from sqlalchemy.types import TypeDecorator
+
+from app.utils.compression import compress_text, decompress_text
+
+
+class CompressedText(TypeDecorator):
+    """
+    Текст, хранящийся в bytea/BLOB со сжатием (gzip или zstd).
+
+    Для кода приложения выглядит как обычная строка: сжатие при записи,
+    распаковка при чтении.
+    """
+    impl = LargeBinary
+    cache_ok = True
+
+    def process_bind_param(self, value, dialect):
+        if value is None:
+            return None
+        return compress_text(value)
+
+    def process_result_value(self, value, dialect):
+        if value is None:
+            return None
+        if isinstance(value, str):
+            return value
+        return decompress_text(value)
+
+
+class octet_length(FunctionElement):
+    """
+    Размер значения в байтах.
+
+    В Postgres - octet_length(): для text он берется из заголовка TOAST без
+    распаковки. В SQLite octet_length() есть только с 3.43, поэтому там
+    length(CAST(x AS BLOB)) - длина UTF-8 представления.
+    """
+    type = Integer()
+    inherit_cache = True
+    name = "octet_length"
+
+
+@compiles(octet_length)
+def _compile_octet_length(element, compiler, **kw):
+    return "octet_length(%s)" % compiler.process(element.clauses, **kw)
+
+
+@compiles(octet_length, "sqlite")
+def _compile_octet_length_sqlite(element, compiler, **kw):
+    return "length(%s)" % compiler.process(cast(element.clauses.clauses[0], LargeBinary), **kw)
+
+
+class sortable_datetime(FunctionElement):
+    """
+    Метка времени в виде, сравнимом между хранимым значением и параметром.
+
+    В Postgres это само значение. SQLite хранит DateTime строкой, и формат
+    server_default (CURRENT_TIMESTAMP, без долей секунды) не совпадает с
+    форматом параметра SQLAlchemy - сравнение строк дает неверный порядок,
+    поэтому там обе стороны приводятся к julianday().
+    """
+    inherit_cache = True
+    name = "sortable_datetime"
+
+    @property
+    def type(self):
+        return self.clauses.clauses[0].type
+
+
+@compiles(sortable_datetime)
+def _compile_sortable_datetime(element, compiler, **kw):
+    return compiler.process(element.clauses.clauses[0], **kw)
+
+
+@compiles(sortable_datetime, "sqlite")
+def _compile_sortable_datetime_sqlite(element, compiler, **kw):
+    return "julianday(%s)" % compiler.process(element.clauses.clauses[0], **kw)
@@ -1,7 +1,8 @@
 from fastapi import APIRouter, Depends, HTTPException, status, Path
 from sqlalchemy.ext.asyncio import AsyncSession
 from app.models.user import User
-from app.core.database import get_db
+from app.core.database import get_db, async_engine, read_replicas
+from app.core.db_pool import pool_status
 from app.services.admin import manage_role
 from app.utils.dependencies import get_current_admin_user
 
@@ -31,4 +32,21 @@ async def change_user_role(
             status_code=status.HTTP_404_NOT_FOUND,
             detail="Пользователь не найден"
         )
-    return {"message": f"Пользователь {user_id} допущен к системе"}
\ No newline at end of file
+    return {"message": f"Пользователь {user_id} допущен к системе"}
+
+
+@router.get(
+    "/db/pool",
+    response_model=dict,
+    summary="Состояние пула соединений БД",
+    description="Размер пула, занятые соединения, overflow и накопленная статистика ожидания соединения "
+                "в текущем воркере, а также состояние реплик для чтения. Доступно только **администраторам**.",
+    responses={
+        200: {"description": "Статистика пула получена"},
+        403: {"description": "Недостаточно прав"}
+    }
+)
+async def get_db_pool_status(
+    current_user: User = Depends(get_current_admin_user),
+):
+    return {**pool_status(async_engine), "replicas": read_replicas.status()}
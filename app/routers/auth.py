@@ -19,7 +19,8 @@ router = APIRouter(prefix="/auth", tags=["Auth"])
     description="Создает нового пользователя в системе. **Username** должен быть уникальным.",
     responses={
         201: {"description": "Пользователь успешно создан"},
-        400: {"description": "Пользователь с таким именем уже существует"}
+        400: {"description": "Пользователь с таким именем уже существует"},
+        503: {"description": "Слишком много одновременных регистраций, повторите позже"}
     }
 )
 async def register(
@@ -43,7 +44,8 @@ async def register(
     description="Проверяет логин/пароль и устанавливает безопасную **HttpOnly cookie** с токеном доступа.",
     responses={
         200: {"description": "Успешный вход"},
-        401: {"description": "Неверное имя пользователя или пароль"}
+        401: {"description": "Неверное имя пользователя или пароль"},
+        503: {"description": "Слишком много одновременных входов, повторите позже"}
     }
 )
 async def login(
@@ -60,7 +62,7 @@ async def login(
             detail="Incorrect username or password",
         )
 
-    access_token = create_access_token(data={"sub": user.username})
+    access_token = create_access_token(data={"sub": user.username, "uid": user.id, "role": user.role})
 
     response.set_cookie(
         key="access_token",
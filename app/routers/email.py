@@ -1,19 +1,38 @@
-from typing import Annotated, List
-from fastapi import APIRouter, Depends, HTTPException, status, BackgroundTasks, Body, Path
+import asyncio
+from typing import Annotated, List, Literal, Optional, Union
+from fastapi import APIRouter, Depends, HTTPException, status, Body, Path, Request, Query, Response, Header
+from fastapi.responses import StreamingResponse
 from sqlalchemy.ext.asyncio import AsyncSession
 
-from app.core.database import get_db
-from app.schemas.email import EmailCreate, EmailResponse, EmailUpdateStatus, EmailUpdate
+from app.core.database import get_db, get_read_db
+from app.core.replicas import read_session, fresh_read_session
+from app.schemas.email import EmailCreate, EmailResponse, EmailUpdateStatus, EmailUpdate, EmailBatchResponse, \
+    EmailBulkFilter, EmailBulkStatusUpdate, EmailBulkResult, EmailSummary, EmailView
 from app.models.email import EmailStatus
-from app.crud.email import create_email, get_emails_on_approval, get_email_by_id, update_email_status, remove_email
-from app.services.n8n_wh_emails import send_email_to_n8n
+from app.crud.email import create_email, get_emails_on_approval, update_email_status, remove_email, \
+    get_email_by_id, get_emails_version
+from app.services.webhook_dispatcher import webhook_dispatcher
+from app.services.email_ingest import ingest_json_batch, ingest_ndjson_stream
+from app.services.email_events import email_events
+from app.core.config import settings
 from app.utils.dependencies import get_current_user
 from app.schemas.user import UserPublic
-from app.crud.email import get_all_emails, edit_email
+from app.crud.email import get_all_emails, stream_all_emails, edit_email, bulk_update_email_status, bulk_remove_emails
+from app.utils.pagination import NEXT_CURSOR_HEADER, encode_cursor, decode_id_cursor, decode_datetime_id_cursor
+from app.utils.export import EXPORT_MEDIA_TYPES, emails_to_ndjson, emails_to_csv
+from app.utils.etag import not_modified_response
+from app.utils.idempotency import IDEMPOTENCY_KEY_HEADER, IDEMPOTENT_REPLAY_HEADER
 
 
 router = APIRouter(prefix="/emails", tags=["Emails"])
 
+VIEW_DESCRIPTION = "summary - id, статус, дата, превью текста и размеры; full - письма целиком"
+
+
+def _serialize_list(emails, view: EmailView) -> list:
+    model = EmailSummary if view == "summary" else EmailResponse
+    return [model.model_validate(email) for email in emails]
+
 
 @router.post(
     "/webhook",
@@ -25,6 +44,13 @@ router = APIRouter(prefix="/emails", tags=["Emails"])
 
     - Создает запись в БД со статусом on_approval.
     - Не требует авторизации пользователя (публичный API для роботов).
+    - Идемпотентен: повтор с тем же заголовком `Idempotency-Key` (или, при
+      WEBHOOK_DEDUP_BY_CONTENT, с тем же содержимым, пока письмо на модерации) не
+      создает дубль, а возвращает исходное письмо с кодом 200 и заголовком
+      `Idempotent-Replayed: true`.
+    - Размер тела и частота запросов от одного источника ограничены
+      (источник - заголовок `X-Webhook-Source` с секретом из WEBHOOK_SOURCE_SECRETS,
+      иначе - IP клиента).
     """,
     responses={
         201: {
@@ -40,33 +66,222 @@ router = APIRouter(prefix="/emails", tags=["Emails"])
                     }
                 }
             }
-        }
+        },
+        200: {"description": "Повторная доставка: возвращено ранее сохраненное письмо"},
+        413: {"description": "Тело запроса больше WEBHOOK_MAX_BODY_SIZE"},
+        429: {"description": "Превышен лимит запросов для источника (см. Retry-After)"}
     }
 )
 async def receive_email_webhook(
+        response: Response,
         email_data: EmailCreate = Body(..., description="Данные письма (текст или HTML)"),
-        db: Annotated[AsyncSession, Depends(get_db)] = None
+        db: Annotated[AsyncSession, Depends(get_db)] = None,
+        idempotency_key: Optional[str] = Header(
+            None, alias=IDEMPOTENCY_KEY_HEADER, max_length=255, description="Ключ идемпотентности доставки"
+        ),
+):
+    email, created = await create_email(db=db, email_in=email_data, idempotency_key=idempotency_key)
+    if not created:
+        response.status_code = status.HTTP_200_OK
+        response.headers[IDEMPOTENT_REPLAY_HEADER] = "true"
+    return email
+
+
+@router.post(
+    "/webhook/batch",
+    status_code=status.HTTP_201_CREATED,
+    response_model=EmailBatchResponse,
+    summary="Принять пачку писем (Webhook)",
+    description="""
+    Пакетный вариант /webhook для n8n-сценариев, которые генерируют сразу много писем.
+
+    - Тело: JSON-массив писем (`application/json`) или NDJSON-поток, одно письмо
+      на строку (`application/x-ndjson`).
+    - Все письма сохраняются в одной транзакции многострочным INSERT ... RETURNING.
+    - Возвращает id писем в порядке следования во входных данных; при
+      WEBHOOK_DEDUP_BY_CONTENT для писем, совпадающих с письмом на модерации, -
+      id существующих записей.
+    """,
+    responses={
+        201: {"description": "Письма успешно сохранены"},
+        413: {"description": "Превышен лимит писем в пакете или WEBHOOK_BATCH_MAX_BODY_SIZE"},
+        422: {"description": "Некорректные данные письма"},
+        429: {"description": "Превышен лимит запросов для источника (см. Retry-After)"}
+    },
+    openapi_extra={
+        "requestBody": {
+            "required": True,
+            "content": {
+                "application/json": {
+                    "schema": {"type": "array", "items": EmailCreate.model_json_schema()}
+                },
+                "application/x-ndjson": {
+                    "schema": {"type": "string", "example": '{"text_content": "Привет"}\n{"text_content": "Мир"}'}
+                },
+            },
+        }
+    },
+)
+async def receive_email_webhook_batch(
+        request: Request,
+        db: Annotated[AsyncSession, Depends(get_db)],
 ):
-    return await create_email(db=db, email_in=email_data)
+    content_type = request.headers.get("content-type", "")
+    if "ndjson" in content_type or "jsonlines" in content_type:
+        ids = await ingest_ndjson_stream(db, request.stream())
+    else:
+        ids = await ingest_json_batch(db, await request.body())
+    return EmailBatchResponse(count=len(ids), ids=ids)
 
 
 @router.get(
     "/pending",
-    response_model=List[EmailResponse],
+    response_model=Union[List[EmailSummary], List[EmailResponse]],
     summary="Получить список писем на модерации",
-    description="Возвращает список всех писем, у которых статус on_approval. Требует токен авторизации.",
+    description="""
+    Возвращает письма со статусом on_approval в порядке поступления. Требует токен авторизации.
+
+    Пагинация курсорная: если есть следующая страница, ее курсор приходит в заголовке
+    `X-Next-Cursor`; передайте его в параметр `cursor`, чтобы получить продолжение.
+
+    По умолчанию возвращается краткое представление (`view=summary`) без тел писем;
+    `view=full` возвращает письма целиком.
+
+    Поддерживает условные запросы: при совпадении `If-None-Match` с текущим `ETag` - 304.
+    """,
     responses={
         200: {"description": "Список писем получен"},
+        304: {"description": "Список не изменился"},
+        400: {"description": "Некорректный курсор"},
         401: {"description": "Пользователь не авторизован"}
     }
 )
 async def get_pending_emails(
+        request: Request,
+        response: Response,
+        db: Annotated[AsyncSession, Depends(get_db)],
+        read_db: Annotated[AsyncSession, Depends(get_read_db)],
+        current_user: Annotated[UserPublic, Depends(get_current_user)],
+        cursor: Optional[str] = Query(None, description="Курсор из заголовка X-Next-Cursor предыдущей страницы"),
+        limit: int = Query(100, ge=1, le=1000),
+        skip: int = Query(0, ge=0, deprecated=True, description="Смещение (устарело, используйте cursor)"),
+        view: EmailView = Query("summary", description=VIEW_DESCRIPTION),
+):
+    after = decode_datetime_id_cursor(cursor) if cursor else None
+    not_modified = not_modified_response(request, response, await get_emails_version(db))
+    if not_modified:
+        return not_modified
+
+    emails = await get_emails_on_approval(
+        await fresh_read_session(read_db, db), limit=limit + 1, after=after, skip=skip, summary=view == "summary"
+    )
+
+    if len(emails) > limit:
+        emails = emails[:limit]
+        last = emails[-1]
+        response.headers[NEXT_CURSOR_HEADER] = encode_cursor(last.created_at, last.id)
+    return _serialize_list(emails, view)
+
+
+@router.get(
+    "/events",
+    summary="Поток событий по письмам (SSE)",
+    description="""
+    Server-Sent Events вместо опроса /pending. Каждое событие - JSON вида
+    `{"event": "created" | "status_changed" | "edited" | "deleted", "ids": [...], "status": ...}`.
+
+    Полные тела писем не передаются: клиент дозапрашивает нужные письма сам.
+    Событие `resync` означает, что клиент не успевал читать поток и должен
+    перечитать список и переподключиться. Требует авторизации пользователя.
+    """,
+    responses={
+        200: {"description": "Поток событий", "content": {"text/event-stream": {}}},
+        401: {"description": "Пользователь не авторизован"}
+    }
+)
+async def stream_email_events(
+        request: Request,
         db: Annotated[AsyncSession, Depends(get_db)],
         current_user: Annotated[UserPublic, Depends(get_current_user)],
-        skip: int = 0,
-        limit: int = 1000,
 ):
-    return await get_emails_on_approval(db, skip=skip, limit=limit)
+    # Не держим соединение из пула все время жизни потока
+    await db.close()
+
+    async def event_stream():
+        async with email_events.subscribe() as subscriber:
+            yield "retry: 3000\n\n"
+            while not await request.is_disconnected():
+                if subscriber.overflowed:
+                    yield "event: resync\ndata: {}\n\n"
+                    return
+                try:
+                    data = await asyncio.wait_for(
+                        subscriber.queue.get(), timeout=settings.EMAIL_EVENTS_HEARTBEAT_SECONDS
+                    )
+                except asyncio.TimeoutError:
+                    yield ": ping\n\n"
+                    continue
+                yield f"data: {data}\n\n"
+
+    return StreamingResponse(
+        event_stream(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
+
+
+# Маршруты /bulk/* объявлены раньше /{email_id}/*, иначе "bulk" попадет в email_id
+@router.patch(
+    "/bulk/status",
+    response_model=EmailBulkResult,
+    summary="Изменить статус многих писем",
+    description="""
+    Меняет статус всех писем из списка `ids` и/или всех писем на модерации,
+    созданных раньше `pending_older_than`, одним запросом к БД.
+
+    Одобренные письма одним пакетом ставятся в очередь на отправку в n8n.
+    Возвращает id измененных писем.
+    """,
+    responses={
+        200: {"description": "Статусы обновлены"},
+        401: {"description": "Необходима авторизация"},
+        422: {"description": "Не указан ни один фильтр"}
+    }
+)
+async def update_status_bulk(
+        db: Annotated[AsyncSession, Depends(get_db)],
+        current_user: Annotated[UserPublic, Depends(get_current_user)],
+        bulk_data: EmailBulkStatusUpdate = Body(...),
+):
+    emails = await bulk_update_email_status(
+        db, bulk_data.status, ids=bulk_data.ids, pending_older_than=bulk_data.pending_older_than
+    )
+
+    if emails and bulk_data.status == EmailStatus.APPROVED:
+        webhook_dispatcher.notify()
+
+    return EmailBulkResult(count=len(emails), ids=[email.id for email in emails])
+
+
+@router.post(
+    "/bulk/delete",
+    response_model=EmailBulkResult,
+    summary="Удалить много писем",
+    description="Удаляет все письма из списка `ids` и/или все письма на модерации, "
+                "созданные раньше `pending_older_than`. Возвращает id удаленных писем.",
+    responses={
+        200: {"description": "Письма удалены"},
+        401: {"description": "Необходима авторизация"},
+        422: {"description": "Не указан ни один фильтр"}
+    }
+)
+async def delete_emails_bulk(
+        db: Annotated[AsyncSession, Depends(get_db)],
+        current_user: Annotated[UserPublic, Depends(get_current_user)],
+        bulk_filter: EmailBulkFilter = Body(...),
+):
+    ids = await bulk_remove_emails(db, ids=bulk_filter.ids, pending_older_than=bulk_filter.pending_older_than)
+    return EmailBulkResult(count=len(ids), ids=ids)
 
 
 @router.patch(
@@ -77,7 +292,8 @@ async def get_pending_emails(
     Меняет статус указанного письма.
 
     Логика работы:
-    - Если статус изменен на approved -> запускается фоновая задача отправки вебхука обратно в n8n.
+    - Если статус изменен на approved -> письмо в той же транзакции ставится в очередь (outbox)
+      на отправку вебхука в n8n; доставка идет с повторами и не теряется при сбоях n8n.
     - Если статус rejected или edited -> просто обновляется запись в БД.
     """,
     responses={
@@ -87,59 +303,108 @@ async def get_pending_emails(
     }
 )
 async def update_status(
-        background_tasks: BackgroundTasks,
         db: Annotated[AsyncSession, Depends(get_db)],
         current_user: Annotated[UserPublic, Depends(get_current_user)],
         email_id: int = Path(..., description="ID письма в базе данных", ge=1),
         status_data: EmailUpdateStatus = Body(..., description="Новый статус для установки"),
 ):
-    email = await get_email_by_id(db, email_id)
-    if not email:
+    updated_email = await update_email_status(db, email_id, status_data.status)
+    if not updated_email:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
             detail="Email not found"
         )
 
-    updated_email = await update_email_status(db, email, status_data.status)
-
     if updated_email.status == EmailStatus.APPROVED:
-        email_schema = EmailResponse.model_validate(updated_email)
-        background_tasks.add_task(send_email_to_n8n, email_schema)
+        webhook_dispatcher.notify()
 
     return updated_email
 
 
 @router.get(
     "/all",
-    response_model=List[EmailResponse],
+    response_model=Union[List[EmailSummary], List[EmailResponse]],
     summary="Получить все письма (Архив)",
     description="""
-    Возвращает список всех писем, хранящихся в базе данных, с любыми статусами.
+    Возвращает письма, хранящиеся в базе данных, с любыми статусами, в порядке id.
 
+    - `format=json` (по умолчанию) - страница из `limit` писем; курсор следующей
+      страницы приходит в заголовке `X-Next-Cursor`. По умолчанию в кратком
+      представлении (`view=summary`), `view=full` - письма целиком.
+    - `format=ndjson` / `format=csv` - потоковая выгрузка всего архива (начиная
+      с `cursor`, если он передан) без ограничения по количеству, всегда целиком.
+
+    JSON-страницы поддерживают условные запросы (`ETag` / `If-None-Match` -> 304).
     Требует авторизации пользователя.
     """,
     responses={
-        200: {"description": "Список всех писем получен"},
+        200: {"description": "Список писем получен"},
+        304: {"description": "Список не изменился"},
+        400: {"description": "Некорректный курсор"},
         401: {"description": "Пользователь не авторизован"}
     }
 )
 async def get_emails_all(
+        request: Request,
+        response: Response,
         db: Annotated[AsyncSession, Depends(get_db)],
+        read_db: Annotated[AsyncSession, Depends(get_read_db)],
         current_user: Annotated[UserPublic, Depends(get_current_user)],
+        cursor: Optional[str] = Query(None, description="Курсор из заголовка X-Next-Cursor предыдущей страницы"),
+        limit: int = Query(1000, ge=1, le=5000),
+        export_format: Literal["json", "ndjson", "csv"] = Query("json", alias="format"),
+        view: EmailView = Query("summary", description=VIEW_DESCRIPTION),
 ):
-    return await get_all_emails(db)
+    after_id = decode_id_cursor(cursor) if cursor else None
+
+    if export_format != "json":
+        # Выгрузка без ETag: допустимо небольшое отставание реплики
+        emails = stream_all_emails(read_session(read_db, db), after_id=after_id)
+        body = emails_to_ndjson(emails) if export_format == "ndjson" else emails_to_csv(emails)
+        return StreamingResponse(
+            body,
+            media_type=EXPORT_MEDIA_TYPES[export_format],
+            headers={"Content-Disposition": f'attachment; filename="emails.{export_format}"'},
+        )
+
+    not_modified = not_modified_response(request, response, await get_emails_version(db))
+    if not_modified:
+        return not_modified
+
+    emails = await get_all_emails(
+        await fresh_read_session(read_db, db), limit=limit + 1, after_id=after_id, summary=view == "summary"
+    )
+    if len(emails) > limit:
+        emails = emails[:limit]
+        response.headers[NEXT_CURSOR_HEADER] = encode_cursor(emails[-1].id)
+    return _serialize_list(emails, view)
 
 
 @router.delete(
     "/{email_id}/delete",
     response_model=EmailResponse,
+    summary="Удалить письмо",
+    description="Удаляет письмо и возвращает его последнее состояние.",
+    responses={
+        200: {"description": "Письмо удалено"},
+        404: {"description": "Письмо с таким ID не найдено"},
+        401: {"description": "Необходима авторизация"}
+    }
 )
 async def delete_email(
         db: Annotated[AsyncSession, Depends(get_db)],
         current_user: Annotated[UserPublic, Depends(get_current_user)],
         email_id: int = Path(..., description="ID письма в базе данных", ge=1),
 ):
-    return await remove_email(db, email_id)
+    email = await remove_email(db, email_id)
+
+    if not email:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Email not found"
+        )
+
+    return email
 
 
 @router.patch(
@@ -162,4 +427,40 @@ async def update_email_text(
             detail="Email not found"
         )
 
-    return email
\ No newline at end of file
+    return email
+
+
+@router.get(
+    "/{email_id}",
+    response_model=EmailResponse,
+    summary="Получить письмо целиком",
+    description="Возвращает письмо со всем содержимым. Поддерживает условные запросы "
+                "(`ETag` / `If-None-Match` -> 304). Требует авторизации пользователя.",
+    responses={
+        200: {"description": "Письмо получено"},
+        304: {"description": "Письмо не изменилось"},
+        404: {"description": "Письмо с таким ID не найдено"},
+        401: {"description": "Пользователь не авторизован"}
+    }
+)
+async def get_email(
+        request: Request,
+        response: Response,
+        db: Annotated[AsyncSession, Depends(get_db)],
+        read_db: Annotated[AsyncSession, Depends(get_read_db)],
+        current_user: Annotated[UserPublic, Depends(get_current_user)],
+        email_id: int = Path(..., description="ID письма в базе данных", ge=1),
+):
+    not_modified = not_modified_response(request, response, await get_emails_version(db))
+    if not_modified:
+        return not_modified
+
+    email = await get_email_by_id(await fresh_read_session(read_db, db), email_id)
+
+    if not email:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Email not found"
+        )
+
+    return email
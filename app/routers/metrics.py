@@ -0,0 +1,39 @@
+import logging
+import secrets
+from typing import Annotated, Optional
+
+from fastapi import APIRouter, Depends, Header, HTTPException, Response, status
+from prometheus_client import CONTENT_TYPE_LATEST
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.core.config import settings
+from app.core.database import get_db
+from app.core.metrics import EMAILS_ON_APPROVAL, OUTBOX_PENDING, render_metrics
+from app.crud.email import count_emails_on_approval
+from app.crud.outbox import count_pending_webhooks
+
+logger = logging.getLogger("uvicorn.error")
+
+router = APIRouter(tags=["Metrics"])
+
+
+def _check_token(authorization: Optional[str] = Header(None)):
+    expected = f"Bearer {settings.METRICS_TOKEN}"
+    # compare_digest над str допускает только ASCII, поэтому сравниваются байты
+    if authorization is None or not secrets.compare_digest(authorization.encode(), expected.encode()):
+        raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail="Неверный токен метрик")
+
+
+@router.get(
+    "/metrics",
+    include_in_schema=False,
+    dependencies=[Depends(_check_token)],
+)
+async def get_metrics(db: Annotated[AsyncSession, Depends(get_db)]):
+    # Глубина очередей - состояние БД, а не процесса, поэтому снимается в момент опроса
+    try:
+        EMAILS_ON_APPROVAL.set(await count_emails_on_approval(db))
+        OUTBOX_PENDING.set(await count_pending_webhooks(db))
+    except Exception:
+        logger.exception("Metrics: не удалось получить глубину очередей")
+    return Response(content=render_metrics(), media_type=CONTENT_TYPE_LATEST)
@@ -1,5 +1,5 @@
-from pydantic import BaseModel
-from typing import Optional
+from pydantic import BaseModel, ConfigDict, Field, model_validator
+from typing import List, Literal, Optional
 from app.models.email import EmailStatus
 from datetime import datetime
 
@@ -15,6 +15,21 @@ class EmailResponse(EmailCreate):
     class Config:
         from_attributes = True
 
+class EmailSummary(BaseModel):
+    """Краткое представление письма для списков: без полного текста и HTML"""
+    id: int
+    status: EmailStatus
+    created_at: datetime
+    text_preview: Optional[str]
+    text_size: int
+    html_size: int
+
+    model_config = ConfigDict(from_attributes=True)
+
+
+EmailView = Literal["summary", "full"]
+
+
 class EmailUpdateStatus(BaseModel):
     status: EmailStatus
 
@@ -22,3 +37,30 @@ class EmailUpdateStatus(BaseModel):
 class EmailUpdate(BaseModel):
     text_content: Optional[str] = None
     html_content: Optional[str] = None
+
+
+class EmailBatchResponse(BaseModel):
+    count: int
+    ids: List[int]
+
+
+class EmailBulkFilter(BaseModel):
+    ids: Optional[List[int]] = Field(None, max_length=10000, description="ID писем")
+    pending_older_than: Optional[datetime] = Field(
+        None, description="Все письма на модерации, созданные раньше этого момента"
+    )
+
+    @model_validator(mode="after")
+    def check_filter(self):
+        if self.ids is None and self.pending_older_than is None:
+            raise ValueError("Укажите ids и/или pending_older_than")
+        return self
+
+
+class EmailBulkStatusUpdate(EmailBulkFilter):
+    status: EmailStatus
+
+
+class EmailBulkResult(BaseModel):
+    count: int
+    ids: List[int]
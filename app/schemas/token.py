@@ -1,4 +1,6 @@
 from pydantic import BaseModel
 
 class TokenData(BaseModel):
-    username: str | None = None
\ No newline at end of file
+    username: str | None = None
+    user_id: int | None = None
+    role: str | None = None
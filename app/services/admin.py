@@ -1,6 +1,7 @@
 from app.models.user import User
 from sqlalchemy.future import select
 from sqlalchemy.ext.asyncio import AsyncSession
+from app.utils.user_cache import user_cache
 
 
 async def manage_role(user_id: int, db: AsyncSession) -> User | None:
@@ -17,5 +18,6 @@ async def manage_role(user_id: int, db: AsyncSession) -> User | None:
     db.add(user)
     await db.commit()
     await db.refresh(user)
+    user_cache.invalidate(user.username)
 
     return user
\ No newline at end of file
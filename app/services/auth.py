@@ -4,8 +4,10 @@ from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.future import select
 from app.models.user import User
 from app.schemas.user import UserLogin
-from app.utils.security import verify_password
+from app.utils.security import verify_password_async, get_password_hash_async, password_needs_rehash
 from app.utils.default_values import DEFAULT_ROLE
+from app.core.config import settings
+from app.utils.user_cache import CachedUser, user_cache
 
 
 async def authenticate_user(user_data: UserLogin, db: AsyncSession) -> User | None:
@@ -14,13 +16,28 @@ async def authenticate_user(user_data: UserLogin, db: AsyncSession) -> User | No
     user = result.scalar_one_or_none()
 
 
-    if not user or not verify_password(user_data.password, user.hashed_password):
+    if not user or not await verify_password_async(user_data.password, user.hashed_password):
         return None
 
+    if settings.BCRYPT_REHASH_ON_LOGIN and password_needs_rehash(user.hashed_password):
+        await _upgrade_password_hash(user, user_data.password, db)
+
     if user.role == DEFAULT_ROLE:
         raise HTTPException(
             status_code=status.HTTP_403_FORBIDDEN,
             detail="Ваша заявка в обработке. Доступ ограничен."
         )
 
+    # Пользователь уже прочитан - первый запрос с новым токеном обойдется без SELECT
+    user_cache.set(CachedUser(id=user.id, username=user.username, role=user.role))
     return user
+
+
+async def _upgrade_password_hash(user: User, password: str, db: AsyncSession):
+    """Пересчитать хэш с текущей стоимостью BCRYPT_ROUNDS; пароль только что успешно проверен"""
+    try:
+        user.hashed_password = await get_password_hash_async(password)
+    except HTTPException:
+        # Пул bcrypt перегружен - не мешаем входу, обновим хэш при следующем логине
+        return
+    await db.commit()
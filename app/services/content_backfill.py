@@ -0,0 +1,65 @@
+import asyncio
+import logging
+
+from app.core.config import settings
+from app.core.database import AsyncSessionLocal
+from app.crud.email import compress_stored_emails
+
+logger = logging.getLogger("uvicorn.error")
+
+
+class ContentBackfill:
+    """
+    Фоновый перенос писем из старого текстового столбца html_content
+    (см. миграцию a7c3e5f1b0d2) и сжатие писем, сохраненных до включения
+    EMAIL_CONTENT_COMPRESSION.
+
+    Проходит таблицу по id пачками по EMAIL_COMPRESSION_BACKFILL_BATCH с паузой
+    между ними, чтобы не мешать основной нагрузке. Каждая пачка коммитится
+    отдельно, поэтому прерванный проход просто продолжится при следующем
+    запуске. Несколько воркеров не мешают друг другу: занятые строки пропускаются.
+    """
+
+    def __init__(self, session_factory=AsyncSessionLocal):
+        self._session_factory = session_factory
+        self._task: asyncio.Task | None = None
+
+    def start(self):
+        if not settings.EMAIL_COMPRESSION_BACKFILL:
+            return
+        if self._task is None:
+            self._task = asyncio.create_task(self._run(), name="content-backfill")
+
+    async def stop(self):
+        if self._task is None:
+            return
+        self._task.cancel()
+        try:
+            await self._task
+        except asyncio.CancelledError:
+            pass
+        self._task = None
+
+    async def _run(self):
+        last_id = 0
+        batches = 0
+        try:
+            while True:
+                async with self._session_factory() as db:
+                    next_id = await compress_stored_emails(db, last_id, settings.EMAIL_COMPRESSION_BACKFILL_BATCH)
+                if next_id is None:
+                    break
+                last_id = next_id
+                batches += 1
+                await asyncio.sleep(settings.EMAIL_COMPRESSION_BACKFILL_PAUSE)
+        except asyncio.CancelledError:
+            raise
+        except Exception:
+            logger.exception("Перенос/сжатие писем: ошибка на письмах после id=%s, продолжится при следующем запуске", last_id)
+            return
+
+        if batches:
+            logger.info("Перенос/сжатие писем: обработано %d пачек, последний id=%s", batches, last_id)
+
+
+content_backfill = ContentBackfill()
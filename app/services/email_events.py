@@ -0,0 +1,145 @@
+import asyncio
+import json
+import logging
+from contextlib import asynccontextmanager
+
+from sqlalchemy import event
+from sqlalchemy.ext.asyncio import AsyncEngine, AsyncConnection, AsyncSession
+from sqlalchemy.orm import Session
+
+from app.core.config import settings
+
+logger = logging.getLogger("uvicorn.error")
+
+CHANNEL = "email_events"
+_MAX_IDS_PER_EVENT = 500
+# События, опубликованные в транзакции сессии и ждущие ее коммита
+_PENDING_KEY = "email_events_pending"
+
+
+class Subscriber:
+    """Очередь событий одного SSE-клиента"""
+
+    def __init__(self, maxsize: int):
+        self.queue: asyncio.Queue[str] = asyncio.Queue(maxsize=maxsize)
+        self.overflowed = False
+
+
+class EmailEventBroker:
+    """
+    Рассылка событий об изменении писем подписчикам (SSE).
+
+    С Postgres NOTIFY отправляет триггер таблицы emails в транзакции изменения
+    (доставляется только после коммита), а каждый воркер принимает события через
+    LISTEN на выделенном соединении, поэтому они работают при нескольких
+    процессах uvicorn. С другими БД события рассылаются внутри процесса после
+    коммита сессии.
+    """
+
+    def __init__(self):
+        self._subscribers: set[Subscriber] = set()
+        self._engine: AsyncEngine | None = None
+        self._connection: AsyncConnection | None = None
+        self._driver = None
+        self._supervisor: asyncio.Task | None = None
+        self.uses_notify = False
+
+    async def start(self, engine: AsyncEngine):
+        self._engine = engine
+        self.uses_notify = engine.dialect.name == "postgresql"
+        if self.uses_notify:
+            self._supervisor = asyncio.create_task(self._supervise(), name="email-events-listener")
+
+    async def stop(self):
+        if self._supervisor is not None:
+            self._supervisor.cancel()
+            try:
+                await self._supervisor
+            except asyncio.CancelledError:
+                pass
+            self._supervisor = None
+        await self._close_connection()
+
+    async def _supervise(self):
+        """Держит LISTEN-соединение открытым и переподключается при его потере"""
+        while True:
+            try:
+                if self._driver is None or self._driver.is_closed():
+                    await self._close_connection()
+                    await self._listen()
+            except Exception:
+                logger.exception("Email events: не удалось подписаться на канал %s", CHANNEL)
+                await self._close_connection()
+            await asyncio.sleep(5)
+
+    async def _listen(self):
+        self._connection = await self._engine.connect()
+        raw = await self._connection.get_raw_connection()
+        self._driver = raw.driver_connection
+        await self._driver.add_listener(CHANNEL, self._on_notify)
+        logger.info("Email events: LISTEN %s", CHANNEL)
+
+    async def _close_connection(self):
+        if self._connection is None:
+            return
+        try:
+            await self._connection.invalidate()
+        except Exception:
+            pass
+        self._connection = None
+        self._driver = None
+
+    def _on_notify(self, connection, pid, channel, payload):
+        self._fanout(payload)
+
+    def _fanout(self, data: str):
+        for subscriber in list(self._subscribers):
+            try:
+                subscriber.queue.put_nowait(data)
+            except asyncio.QueueFull:
+                # Медленный клиент: отключаем, он переподключится и перечитает список
+                subscriber.overflowed = True
+                self._subscribers.discard(subscriber)
+
+    @asynccontextmanager
+    async def subscribe(self):
+        subscriber = Subscriber(settings.EMAIL_EVENTS_QUEUE_SIZE)
+        self._subscribers.add(subscriber)
+        try:
+            yield subscriber
+        finally:
+            self._subscribers.discard(subscriber)
+
+    def publish(self, db: AsyncSession, event: str, ids: list[int], status=None):
+        """
+        Опубликовать событие об изменении в транзакции db.
+
+        С Postgres ничего не делает: NOTIFY отправляет триггер (миграция c9e1f3a5b7d2).
+        Иначе событие откладывается до коммита db, чтобы подписчики не увидели
+        откаченную запись.
+        """
+        if self.uses_notify:
+            return
+        pending = db.sync_session.info.setdefault(_PENDING_KEY, [])
+        for i in range(0, len(ids), _MAX_IDS_PER_EVENT):
+            pending.append(json.dumps({
+                "event": event,
+                "ids": ids[i:i + _MAX_IDS_PER_EVENT],
+                "status": status.value if status is not None else None,
+            }))
+
+
+email_events = EmailEventBroker()
+
+
+@event.listens_for(Session, "after_commit")
+def _fanout_committed(session: Session):
+    for data in session.info.pop(_PENDING_KEY, ()):
+        email_events._fanout(data)
+
+
+@event.listens_for(Session, "after_transaction_end")
+def _discard_uncommitted(session: Session, transaction):
+    # Откат или закрытие сессии без коммита: события не рассылаются
+    if transaction.parent is None:
+        session.info.pop(_PENDING_KEY, None)
@@ -0,0 +1,94 @@
+from typing import AsyncIterator, List
+
+from fastapi import HTTPException, status
+from pydantic import TypeAdapter, ValidationError
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.core.config import settings
+from app.crud.email import insert_emails
+from app.schemas.email import EmailCreate
+
+_email_list_adapter = TypeAdapter(List[EmailCreate])
+
+
+def _too_many_items():
+    return HTTPException(
+        status_code=status.HTTP_413_REQUEST_ENTITY_TOO_LARGE,
+        detail=f"Слишком много писем в пакете (максимум {settings.WEBHOOK_BATCH_MAX_ITEMS})"
+    )
+
+
+def _validation_errors(e: ValidationError) -> list[dict]:
+    # input не отдаем: для невалидного JSON там сырые bytes, которые не сериализуются в ответ
+    return e.errors(include_url=False, include_context=False, include_input=False)
+
+
+async def ingest_json_batch(db: AsyncSession, body: bytes) -> list[int]:
+    """Сохранить JSON-массив писем в одной транзакции"""
+    try:
+        emails_in = _email_list_adapter.validate_json(body)
+    except ValidationError as e:
+        raise HTTPException(
+            status_code=status.HTTP_422_UNPROCESSABLE_ENTITY,
+            detail=_validation_errors(e)
+        )
+
+    if len(emails_in) > settings.WEBHOOK_BATCH_MAX_ITEMS:
+        raise _too_many_items()
+
+    ids = []
+    chunk_size = settings.WEBHOOK_BATCH_CHUNK_SIZE
+    for i in range(0, len(emails_in), chunk_size):
+        ids += await insert_emails(db, emails_in[i:i + chunk_size])
+    await db.commit()
+    return ids
+
+
+async def ingest_ndjson_stream(db: AsyncSession, stream: AsyncIterator[bytes]) -> list[int]:
+    """
+    Сохранить письма из NDJSON-потока (одно письмо на строку).
+
+    Тело читается по мере поступления, письма вставляются кусками по
+    WEBHOOK_BATCH_CHUNK_SIZE, коммит один на весь пакет.
+    """
+    ids: list[int] = []
+    chunk: list[EmailCreate] = []
+    buffer = b""
+    line_no = 0
+
+    async def flush():
+        ids.extend(await insert_emails(db, chunk))
+        chunk.clear()
+
+    def parse(line: bytes):
+        try:
+            return EmailCreate.model_validate_json(line)
+        except ValidationError as e:
+            raise HTTPException(
+                status_code=status.HTTP_422_UNPROCESSABLE_ENTITY,
+                detail={"line": line_no, "errors": _validation_errors(e)}
+            )
+
+    async for data in stream:
+        buffer += data
+        *lines, buffer = buffer.split(b"\n")
+        for line in lines:
+            line_no += 1
+            if not line.strip():
+                continue
+            chunk.append(parse(line))
+            if len(ids) + len(chunk) > settings.WEBHOOK_BATCH_MAX_ITEMS:
+                raise _too_many_items()
+            if len(chunk) >= settings.WEBHOOK_BATCH_CHUNK_SIZE:
+                await flush()
+
+    if buffer.strip():
+        line_no += 1
+        chunk.append(parse(buffer))
+        if len(ids) + len(chunk) > settings.WEBHOOK_BATCH_MAX_ITEMS:
+            raise _too_many_items()
+    if chunk:
+        await flush()
+
+    await db.commit()
+    return ids
@@ -0,0 +1,87 @@
+import asyncio
+import logging
+import sys
+import threading
+import time
+import traceback
+
+from app.core.config import settings
+from app.core.metrics import EVENT_LOOP_LAG
+
+logger = logging.getLogger("uvicorn.error")
+
+
+class LoopLagMonitor:
+    """
+    Следит за блокировками event loop (синхронный bcrypt, тяжелая сериализация
+    и т.п.).
+
+    Задача в loop каждые LOOP_LAG_INTERVAL секунд отмечает пульс и пишет
+    опоздание таймера в метрику. Сторожевой поток проверяет пульс и, если loop
+    молчит дольше LOOP_LAG_THRESHOLD_MS, логирует текущий стек потока loop -
+    то есть код, который его блокирует, прямо во время блокировки.
+    """
+
+    def __init__(self):
+        self._task: asyncio.Task | None = None
+        self._watchdog: threading.Thread | None = None
+        self._stopped = threading.Event()
+        self._last_beat = 0.0
+        self._loop_thread_id: int | None = None
+
+    def start(self):
+        loop = asyncio.get_running_loop()
+        if settings.LOOP_DEBUG:
+            loop.set_debug(True)
+            loop.slow_callback_duration = settings.LOOP_LAG_THRESHOLD_MS / 1000
+        if not settings.LOOP_LAG_MONITOR or self._task is not None:
+            return
+
+        self._stopped.clear()
+        self._last_beat = time.monotonic()
+        self._loop_thread_id = threading.get_ident()
+        self._task = asyncio.create_task(self._heartbeat(), name="loop-lag-monitor")
+        self._watchdog = threading.Thread(target=self._watch, name="loop-lag-watchdog", daemon=True)
+        self._watchdog.start()
+
+    async def stop(self):
+        if self._task is None:
+            return
+        self._stopped.set()
+        self._task.cancel()
+        try:
+            await self._task
+        except asyncio.CancelledError:
+            pass
+        self._task = None
+        self._watchdog.join(timeout=1)
+        self._watchdog = None
+
+    async def _heartbeat(self):
+        interval = settings.LOOP_LAG_INTERVAL
+        loop = asyncio.get_running_loop()
+        while True:
+            expected = loop.time() + interval
+            await asyncio.sleep(interval)
+            EVENT_LOOP_LAG.observe(max(0.0, loop.time() - expected))
+            self._last_beat = time.monotonic()
+
+    def _watch(self):
+        threshold = settings.LOOP_LAG_THRESHOLD_MS / 1000
+        # Ожидаемый промежуток между пульсами - сам интервал, блокировкой считаем превышение сверх него
+        limit = settings.LOOP_LAG_INTERVAL + threshold
+        reported_beat = None
+        while not self._stopped.wait(settings.LOOP_LAG_INTERVAL):
+            beat = self._last_beat
+            stalled = time.monotonic() - beat
+            if stalled < limit or beat == reported_beat:
+                continue
+            # Одна блокировка - одна запись в лог
+            reported_beat = beat
+            frame = sys._current_frames().get(self._loop_thread_id)
+            stack = "".join(traceback.format_stack(frame)) if frame is not None else "стек недоступен"
+            logger.warning("Event loop заблокирован уже %.0f мс, текущий стек:\n%s",
+                           (stalled - settings.LOOP_LAG_INTERVAL) * 1000, stack)
+
+
+loop_monitor = LoopLagMonitor()
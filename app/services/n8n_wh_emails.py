@@ -1,33 +1,103 @@
+import time
+
 import httpx
 import logging
 from app.schemas.email import EmailResponse
 from app.core.config import settings
+from app.core.metrics import N8N_DELIVERIES, N8N_DELIVERED_EMAILS, N8N_DELIVERY_DURATION
+from app.core.logging_config import sample_success
 
 logger = logging.getLogger("uvicorn.error")
 
+_client: httpx.AsyncClient | None = None
+
+
+def create_n8n_client() -> httpx.AsyncClient:
+    """HTTP-клиент с пулом keep-alive соединений для отправки вебхуков в n8n"""
+    return httpx.AsyncClient(
+        http2=settings.N8N_HTTP2,
+        timeout=httpx.Timeout(settings.N8N_HTTP_TIMEOUT, connect=settings.N8N_HTTP_CONNECT_TIMEOUT),
+        limits=httpx.Limits(
+            max_connections=settings.N8N_HTTP_MAX_CONNECTIONS,
+            max_keepalive_connections=settings.N8N_HTTP_MAX_KEEPALIVE,
+            keepalive_expiry=settings.N8N_HTTP_KEEPALIVE_EXPIRY,
+        ),
+    )
+
+
+async def start_n8n_client():
+    """Создать общий клиент (вызывается при старте приложения)"""
+    global _client
+    if _client is None:
+        _client = create_n8n_client()
+
+
+async def close_n8n_client():
+    """Закрыть общий клиент и его соединения (вызывается при остановке приложения)"""
+    global _client
+    if _client is not None:
+        await _client.aclose()
+        _client = None
+
+
+def get_n8n_client() -> httpx.AsyncClient:
+    if _client is None:
+        raise RuntimeError("HTTP-клиент n8n не инициализирован: вызовите start_n8n_client()")
+    return _client
+
+
+def build_n8n_payload(email: EmailResponse) -> dict:
+    """Снимок письма в том виде, в котором он уходит в n8n"""
+    return {
+        "id": email.id,
+        "text_content": email.text_content,
+        "html_content": email.html_content,
+        "status": email.status.value,
+        "created_at": email.created_at.isoformat() if email.created_at else None
+    }
+
 
-async def send_email_to_n8n(email: EmailResponse):
+async def _post(url: str, body, mode: str, emails: int) -> httpx.Response:
+    """POST в n8n с учетом в метриках доставки"""
+    start = time.perf_counter()
+    try:
+        response = await get_n8n_client().post(url, json=body)
+        response.raise_for_status()
+    except Exception:
+        N8N_DELIVERIES.labels(mode, "failure").inc()
+        raise
+    finally:
+        N8N_DELIVERY_DURATION.labels(mode).observe(time.perf_counter() - start)
+    N8N_DELIVERIES.labels(mode, "success").inc()
+    N8N_DELIVERED_EMAILS.inc(emails)
+    return response
+
+
+async def send_email_to_n8n(payload: dict):
+    """Отправить письмо в n8n. Ошибки пробрасываются наверх, повторы делает очередь."""
+    url = settings.N8N_WEBHOOK_URL
+
+    logger.debug("Outbox: отправка письма id=%s на %s", payload.get("id"), url)
+
+    if not url:
+        raise RuntimeError("N8N_WEBHOOK_URL не задан")
+
+    response = await _post(url, payload, mode="single", emails=1)
+
+    if sample_success():
+        logger.info("Outbox: письмо id=%s доставлено, ответ %s", payload.get("id"), response.status_code)
+
+
+async def send_batch_to_n8n(payloads: list[dict]):
+    """Отправить несколько писем в n8n одним запросом (JSON-массив)"""
     url = settings.N8N_WEBHOOK_URL
 
-    logger.info(f"🔄 [Background] Начинаю отправку вебхука для email id={email.id} на {url}...")
+    logger.debug("Outbox: отправка пакета из %d писем на %s", len(payloads), url)
 
     if not url:
-        logger.warning("⚠️ [Background] N8N_WEBHOOK_URL не задан, пропускаю.")
-        return
-
-    async with httpx.AsyncClient() as client:
-        payload = {
-            "id": email.id,
-            "text_content": email.text_content,
-            "html_content": email.html_content,
-            "status": email.status.value,
-            "created_at": email.created_at.isoformat() if email.created_at else None
-        }
-        try:
-            response = await client.post(url, json=payload)
-            response.raise_for_status()
-
-            logger.info(f"✅ [Background] Вебхук успешно отправлен! Ответ сервера: {response.status_code}")
-
-        except Exception as e:
-            logger.error(f"❌ [Background] Ошибка отправки в n8n: {e}")
\ No newline at end of file
+        raise RuntimeError("N8N_WEBHOOK_URL не задан")
+
+    response = await _post(url, payloads, mode="batch", emails=len(payloads))
+
+    if sample_success():
+        logger.info("Outbox: пакет из %d писем доставлен, ответ %s", len(payloads), response.status_code)
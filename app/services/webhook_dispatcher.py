@@ -0,0 +1,181 @@
+import asyncio
+import logging
+
+from app.core.config import settings
+from app.core.database import AsyncSessionLocal
+from app.core.logging_config import request_id_var
+from app.core.metrics import OUTBOX_IN_FLIGHT
+from app.crud.outbox import claim_due_webhooks, mark_webhooks_delivered, mark_webhooks_failed
+from app.models.outbox import WebhookOutbox
+from app.services.n8n_wh_emails import send_email_to_n8n, send_batch_to_n8n
+
+logger = logging.getLogger("uvicorn.error")
+
+
+class WebhookDispatcher:
+    """
+    Фоновый доставщик вебхуков из таблицы webhook_outbox.
+
+    Работает внутри процесса приложения: периодически (или по notify())
+    забирает готовые записи и отправляет их в n8n, держа не более
+    OUTBOX_CONCURRENCY одновременных запросов. При N8N_BATCH_ENABLED записи
+    копятся и уходят в n8n одним JSON-массивом.
+    """
+
+    def __init__(self, session_factory=AsyncSessionLocal):
+        self._session_factory = session_factory
+        self._wakeup = asyncio.Event()
+        self._stopping = False
+        self._task: asyncio.Task | None = None
+        self._in_flight: set[asyncio.Task] = set()
+        self._url_warned = False
+
+    def start(self):
+        if self._task is None:
+            self._stopping = False
+            self._task = asyncio.create_task(self._run(), name="webhook-dispatcher")
+
+    def notify(self):
+        """Разбудить доставщик сразу после коммита новой записи"""
+        self._wakeup.set()
+
+    async def stop(self, timeout: float | None = None):
+        """Остановить цикл и дождаться (не дольше timeout) уже начатых доставок"""
+        if self._task is None:
+            return
+        self._stopping = True
+        self._wakeup.set()
+        await self._task
+        self._task = None
+
+        if self._in_flight:
+            timeout = settings.OUTBOX_SHUTDOWN_TIMEOUT if timeout is None else timeout
+            done, pending = await asyncio.wait(self._in_flight, timeout=timeout)
+            for task in pending:
+                task.cancel()
+            if pending:
+                logger.warning("Outbox: %d доставок прервано при остановке, они будут повторены", len(pending))
+
+    async def _run(self):
+        while not self._stopping:
+            self._wakeup.clear()
+            has_more = False
+            try:
+                has_more = await self._dispatch_due()
+            except Exception:
+                logger.exception("Outbox: ошибка при выборке записей")
+
+            if self._stopping:
+                break
+            if has_more:
+                # Забрали полную пачку - вероятно, в очереди есть еще, идем сразу
+                continue
+            try:
+                await asyncio.wait_for(self._wakeup.wait(), timeout=settings.OUTBOX_POLL_INTERVAL)
+            except asyncio.TimeoutError:
+                pass
+
+    async def _dispatch_due(self) -> bool:
+        """Запускает доставку готовых записей. Возвращает True, если стоит сразу проверить еще раз."""
+        if not settings.N8N_WEBHOOK_URL:
+            # Ошибка конфигурации: записи не забираем, они ждут в pending без траты попыток
+            if not self._url_warned:
+                logger.warning("Outbox: N8N_WEBHOOK_URL не задан, доставка приостановлена")
+                self._url_warned = True
+            return False
+        self._url_warned = False
+
+        free_slots = settings.OUTBOX_CONCURRENCY - len(self._in_flight)
+        if free_slots <= 0:
+            await asyncio.wait(self._in_flight, return_when=asyncio.FIRST_COMPLETED)
+            return True
+
+        if settings.N8N_BATCH_ENABLED:
+            # Один пакет занимает один слот конкурентности
+            batch = await self._collect_batch()
+            if batch:
+                self._spawn(batch)
+            return len(batch) >= settings.N8N_BATCH_MAX_SIZE
+
+        limit = min(free_slots, settings.OUTBOX_BATCH_SIZE)
+        async with self._session_factory() as db:
+            entries = await claim_due_webhooks(db, limit)
+
+        for entry in entries:
+            self._spawn([entry])
+        return len(entries) == limit
+
+    async def _collect_batch(self) -> list[WebhookOutbox]:
+        """
+        Копит записи до N8N_BATCH_MAX_SIZE штук, но не дольше N8N_BATCH_MAX_WAIT_MS
+        с момента, когда появилась первая готовая запись.
+        """
+        loop = asyncio.get_running_loop()
+        deadline = None
+        batch: list[WebhookOutbox] = []
+
+        while True:
+            async with self._session_factory() as db:
+                batch += await claim_due_webhooks(db, settings.N8N_BATCH_MAX_SIZE - len(batch))
+            if not batch:
+                return batch
+            if deadline is None:
+                deadline = loop.time() + settings.N8N_BATCH_MAX_WAIT_MS / 1000
+
+            remaining = deadline - loop.time()
+            if len(batch) >= settings.N8N_BATCH_MAX_SIZE or remaining <= 0 or self._stopping:
+                return batch
+
+            self._wakeup.clear()
+            try:
+                await asyncio.wait_for(self._wakeup.wait(), timeout=remaining)
+            except asyncio.TimeoutError:
+                pass
+
+    def _spawn(self, entries: list[WebhookOutbox]):
+        task = asyncio.create_task(self._deliver(entries))
+        self._in_flight.add(task)
+        OUTBOX_IN_FLIGHT.inc()
+        task.add_done_callback(self._on_done)
+
+    def _on_done(self, task: asyncio.Task):
+        self._in_flight.discard(task)
+        OUTBOX_IN_FLIGHT.dec()
+
+    async def _deliver(self, entries: list[WebhookOutbox]):
+        # Задача доставки работает в своей копии контекста: логи получают id исходного запроса
+        request_ids = {entry.request_id for entry in entries}
+        request_id_var.set(request_ids.pop() if len(request_ids) == 1 else None)
+        try:
+            if settings.N8N_BATCH_ENABLED:
+                await send_batch_to_n8n([entry.payload for entry in entries])
+            else:
+                await send_email_to_n8n(entries[0].payload)
+        except Exception as e:
+            await self._on_failure(entries, e)
+            return
+
+        try:
+            async with self._session_factory() as db:
+                await mark_webhooks_delivered(db, [entry.id for entry in entries])
+        except Exception:
+            # Записи останутся pending и будут повторно отправлены после истечения аренды
+            logger.exception("Outbox: не удалось отметить доставленными записи %s", [entry.id for entry in entries])
+
+    async def _on_failure(self, entries: list[WebhookOutbox], error: Exception):
+        try:
+            async with self._session_factory() as db:
+                dead = await mark_webhooks_failed(db, entries, repr(error))
+        except Exception:
+            logger.exception("Outbox: не удалось сохранить ошибку доставки записей %s", [entry.id for entry in entries])
+            return
+
+        for entry in dead:
+            logger.error("Outbox: запись id=%s (email id=%s) перемещена в dead-letter после %d попыток: %r",
+                         entry.id, entry.email_id, entry.attempts, error)
+        if len(dead) < len(entries):
+            logger.warning("Outbox: доставка %d записей не удалась, будет повтор: %r",
+                           len(entries) - len(dead), error)
+
+
+webhook_dispatcher = WebhookDispatcher()
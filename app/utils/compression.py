@@ -0,0 +1,35 @@
+import gzip
+
+import zstandard
+
+from app.core.config import settings
+
+GZIP_MAGIC = b"\x1f\x8b"
+ZSTD_MAGIC = b"\x28\xb5\x2f\xfd"
+
+_zstd_decompressor = zstandard.ZstdDecompressor()
+
+
+def is_compressed(data: bytes) -> bool:
+    # Обе сигнатуры невозможны в начале корректного UTF-8, поэтому несжатый текст с ними не спутать
+    return data.startswith(GZIP_MAGIC) or data.startswith(ZSTD_MAGIC)
+
+
+def compress_text(value: str) -> bytes:
+    """Текст -> байты для хранения согласно EMAIL_CONTENT_COMPRESSION"""
+    data = value.encode("utf-8")
+    if settings.EMAIL_CONTENT_COMPRESSION == "none" or len(data) < settings.EMAIL_COMPRESSION_MIN_SIZE:
+        return data
+    if settings.EMAIL_CONTENT_COMPRESSION == "zstd":
+        return zstandard.ZstdCompressor(level=settings.EMAIL_COMPRESSION_LEVEL).compress(data)
+    return gzip.compress(data, compresslevel=min(settings.EMAIL_COMPRESSION_LEVEL, 9), mtime=0)
+
+
+def decompress_text(data: bytes) -> str:
+    """Байты из БД -> текст; формат определяется по сигнатуре, так что строки в разных режимах читаются одинаково"""
+    data = bytes(data)
+    if data.startswith(ZSTD_MAGIC):
+        data = _zstd_decompressor.decompress(data)
+    elif data.startswith(GZIP_MAGIC):
+        data = gzip.decompress(data)
+    return data.decode("utf-8")
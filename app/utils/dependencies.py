@@ -8,6 +8,7 @@ from app.core.database import get_db
 from app.core.config import settings
 from app.models.user import User
 from app.schemas.token import TokenData
+from app.utils.user_cache import CachedUser, user_cache
 
 credentials_exception = HTTPException(
     status_code=status.HTTP_401_UNAUTHORIZED,
@@ -19,7 +20,7 @@ credentials_exception = HTTPException(
 async def get_current_user(
         request: Request,
         db: Annotated[AsyncSession, Depends(get_db)]
-) -> User:
+) -> CachedUser:
 
 
     token = request.cookies.get("access_token")
@@ -38,11 +39,18 @@ async def get_current_user(
         if username is None:
             raise credentials_exception
 
-        token_data = TokenData(username=username)
+        token_data = TokenData(username=username, user_id=payload.get("uid"), role=payload.get("role"))
 
     except JWTError:
         raise credentials_exception
 
+    if settings.AUTH_TRUST_TOKEN_CLAIMS and token_data.user_id is not None and token_data.role is not None:
+        return CachedUser(id=token_data.user_id, username=token_data.username, role=token_data.role)
+
+    cached = user_cache.get(token_data.username)
+    if cached is not None:
+        return cached
+
     query = select(User).where(User.username == token_data.username)
     result = await db.execute(query)
     user = result.scalar_one_or_none()
@@ -50,12 +58,14 @@ async def get_current_user(
     if user is None:
         raise credentials_exception
 
-    return user
+    cached = CachedUser(id=user.id, username=user.username, role=user.role)
+    user_cache.set(cached)
+    return cached
 
 
 async def get_current_admin_user(
-    current_user: User = Depends(get_current_user)
-) -> User:
+    current_user: CachedUser = Depends(get_current_user)
+) -> CachedUser:
     if current_user.role != "admin":
         raise HTTPException(
             status_code=status.HTTP_403_FORBIDDEN,
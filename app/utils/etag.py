@@ -0,0 +1,51 @@
+import hashlib
+
+from fastapi import Request, Response, status
+
+from app.core.config import settings
+
+ETAG_HEADER = "ETag"
+CACHE_CONTROL = "private, no-cache"
+
+
+def make_etag(version: int, *parts) -> str:
+    """
+    Слабый ETag: версия данных + всё, от чего зависит тело ответа.
+
+    Слабый, потому что одно и то же тело отдается в gzip, brotli и без сжатия -
+    байты разные, а сильный ETag обязан различаться по Content-Encoding.
+    """
+    raw = repr((settings.APP_VERSION, version) + parts).encode("utf-8")
+    return 'W/"' + hashlib.blake2b(raw, digest_size=12).hexdigest() + '"'
+
+
+def etag_matches(if_none_match: str | None, etag: str) -> bool:
+    if not if_none_match:
+        return False
+    if if_none_match.strip() == "*":
+        return True
+    # Для If-None-Match сравнение слабое: префикс W/ игнорируется
+    opaque = etag.removeprefix("W/")
+    candidates = (tag.strip().removeprefix("W/") for tag in if_none_match.split(","))
+    return opaque in candidates
+
+
+def not_modified_response(request: Request, response: Response, version: int | None) -> Response | None:
+    """
+    Проверяет If-None-Match до выполнения основного запроса.
+
+    Возвращает готовый ответ 304, если клиент уже имеет актуальную версию;
+    иначе проставляет ETag в response и возвращает None. Без версии данных
+    (БД не Postgres) условные запросы не поддерживаются.
+    """
+    if version is None:
+        return None
+    etag = make_etag(version, request.url.path, str(request.url.query))
+    if etag_matches(request.headers.get("if-none-match"), etag):
+        return Response(
+            status_code=status.HTTP_304_NOT_MODIFIED,
+            headers={ETAG_HEADER: etag, "Cache-Control": CACHE_CONTROL},
+        )
+    response.headers[ETAG_HEADER] = etag
+    response.headers["Cache-Control"] = CACHE_CONTROL
+    return None
@@ -0,0 +1,40 @@
+import csv
+import io
+from typing import AsyncIterator
+
+from app.schemas.email import EmailResponse
+
+EXPORT_MEDIA_TYPES = {
+    "ndjson": "application/x-ndjson",
+    "csv": "text/csv; charset=utf-8",
+}
+
+CSV_COLUMNS = ["id", "status", "created_at", "text_content", "html_content"]
+
+
+async def emails_to_ndjson(emails: AsyncIterator) -> AsyncIterator[str]:
+    async for email in emails:
+        yield EmailResponse.model_validate(email).model_dump_json() + "\n"
+
+
+async def emails_to_csv(emails: AsyncIterator) -> AsyncIterator[str]:
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+
+    def take() -> str:
+        value = buffer.getvalue()
+        buffer.seek(0)
+        buffer.truncate(0)
+        return value
+
+    writer.writerow(CSV_COLUMNS)
+    yield take()
+    async for email in emails:
+        writer.writerow([
+            email.id,
+            email.status.value if email.status else None,
+            email.created_at.isoformat() if email.created_at else None,
+            email.text_content,
+            email.html_content,
+        ])
+        yield take()
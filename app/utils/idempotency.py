@@ -0,0 +1,50 @@
+import hashlib
+from collections import OrderedDict
+
+from app.core.config import settings
+from app.schemas.email import EmailResponse
+
+IDEMPOTENCY_KEY_HEADER = "Idempotency-Key"
+IDEMPOTENT_REPLAY_HEADER = "Idempotent-Replayed"
+
+
+def content_hash(text_content: str | None, html_content: str | None) -> str:
+    """sha256 содержимого письма: повторная доставка того же письма дает тот же хэш"""
+    digest = hashlib.sha256()
+    digest.update((text_content or "").encode("utf-8"))
+    digest.update(b"\0")
+    digest.update((html_content or "").encode("utf-8"))
+    return digest.hexdigest()
+
+
+class IdempotencyCache:
+    """
+    Ограниченный LRU-кэш "Idempotency-Key -> исходный ответ".
+
+    Быстрый путь без запроса к БД: повторы n8n обычно приходят в тот же воркер
+    через секунды, и им возвращается тот же ответ, что и первой доставке.
+    Источник истины - уникальный индекс по idempotency_key в таблице emails.
+    Хэши содержимого не кэшируются: дубликатом по содержимому письмо остается
+    только пока исходное на модерации.
+    """
+
+    def __init__(self, max_size: int):
+        self.max_size = max_size
+        self._items: OrderedDict[str, EmailResponse] = OrderedDict()
+
+    def get(self, key: str | None) -> EmailResponse | None:
+        if key is None or key not in self._items:
+            return None
+        self._items.move_to_end(key)
+        return self._items[key]
+
+    def set(self, key: str | None, email: EmailResponse):
+        if key is None or self.max_size <= 0:
+            return
+        self._items[key] = email
+        self._items.move_to_end(key)
+        while len(self._items) > self.max_size:
+            self._items.popitem(last=False)
+
+
+idempotency_cache = IdempotencyCache(max_size=settings.IDEMPOTENCY_CACHE_SIZE)
@@ -0,0 +1,47 @@
+import base64
+import json
+from datetime import datetime
+
+from fastapi import HTTPException, status
+
+NEXT_CURSOR_HEADER = "X-Next-Cursor"
+
+invalid_cursor_exception = HTTPException(
+    status_code=status.HTTP_400_BAD_REQUEST,
+    detail="Invalid cursor",
+)
+
+
+def encode_cursor(*values) -> str:
+    """Непрозрачный курсор для keyset-пагинации: base64 от значений ключа последней строки"""
+    raw = json.dumps([v.isoformat() if isinstance(v, datetime) else v for v in values])
+    return base64.urlsafe_b64encode(raw.encode("utf-8")).decode("ascii").rstrip("=")
+
+
+def decode_cursor(cursor: str) -> list:
+    try:
+        padded = cursor + "=" * (-len(cursor) % 4)
+        values = json.loads(base64.urlsafe_b64decode(padded.encode("ascii")))
+    except (ValueError, UnicodeError):
+        raise invalid_cursor_exception
+    if not isinstance(values, list):
+        raise invalid_cursor_exception
+    return values
+
+
+def decode_datetime_id_cursor(cursor: str) -> tuple[datetime, int]:
+    """Курсор вида (created_at, id)"""
+    values = decode_cursor(cursor)
+    try:
+        created_at, email_id = values
+        return datetime.fromisoformat(created_at), int(email_id)
+    except (TypeError, ValueError):
+        raise invalid_cursor_exception
+
+
+def decode_id_cursor(cursor: str) -> int:
+    """Курсор вида (id,)"""
+    values = decode_cursor(cursor)
+    if len(values) != 1 or not isinstance(values[0], int):
+        raise invalid_cursor_exception
+    return values[0]
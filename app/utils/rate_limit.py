@@ -0,0 +1,41 @@
+import math
+import time
+from collections import OrderedDict
+
+
+class TokenBucketLimiter:
+    """
+    Token bucket на каждый источник: rate токенов в секунду, не больше burst.
+
+    Состояние локально для процесса, поэтому при нескольких воркерах
+    фактический лимит на источник - rate * workers. Хранится не больше
+    max_sources источников, самые давние вытесняются (LRU).
+    """
+
+    def __init__(self, rate: float, burst: int, max_sources: int):
+        self.rate = rate
+        self.burst = burst
+        self.max_sources = max_sources
+        self._buckets: OrderedDict[str, tuple[float, float]] = OrderedDict()
+
+    def acquire(self, key: str) -> float:
+        """Списать токен. Возвращает 0, если запрос разрешен, иначе сколько секунд ждать."""
+        now = time.monotonic()
+        tokens, updated_at = self._buckets.get(key, (float(self.burst), now))
+        tokens = min(float(self.burst), tokens + (now - updated_at) * self.rate)
+
+        retry_after = 0.0
+        if tokens >= 1:
+            tokens -= 1
+        else:
+            retry_after = (1 - tokens) / self.rate
+
+        self._buckets[key] = (tokens, now)
+        self._buckets.move_to_end(key)
+        while len(self._buckets) > self.max_sources:
+            self._buckets.popitem(last=False)
+        return retry_after
+
+
+def retry_after_header(seconds: float) -> str:
+    return str(max(1, math.ceil(seconds)))
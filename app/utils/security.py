@@ -1,8 +1,20 @@
+import asyncio
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime, timedelta, timezone
+from fastapi import HTTPException, status
 from jose import JWTError, jwt
 from app.core.config import settings
 import bcrypt
 
+# bcrypt отпускает GIL, поэтому хэширование в отдельных потоках не блокирует event loop
+_bcrypt_executor = ThreadPoolExecutor(max_workers=settings.BCRYPT_MAX_WORKERS, thread_name_prefix="bcrypt")
+_bcrypt_in_progress = 0
+
+bcrypt_overloaded_exception = HTTPException(
+    status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+    detail="Сервер перегружен, попробуйте войти позже",
+    headers={"Retry-After": "1"},
+)
 
 
 def verify_password(plain_password: str, hashed_password: str) -> bool:
@@ -18,13 +30,42 @@ def verify_password(plain_password: str, hashed_password: str) -> bool:
 def get_password_hash(password: str) -> str:
     password_bytes = password.encode('utf-8')
 
-    salt = bcrypt.gensalt()
+    salt = bcrypt.gensalt(rounds=settings.BCRYPT_ROUNDS)
 
     hashed_bytes = bcrypt.hashpw(password_bytes, salt)
 
     return hashed_bytes.decode('utf-8')
 
 
+def password_needs_rehash(hashed_password: str) -> bool:
+    """Хэш вида $2b$<cost>$... создан с другой стоимостью, чем BCRYPT_ROUNDS"""
+    try:
+        cost = int(hashed_password.split("$")[2])
+    except (IndexError, ValueError):
+        return False
+    return cost != settings.BCRYPT_ROUNDS
+
+
+async def _run_bcrypt(func, *args):
+    """Выполнить bcrypt в пуле потоков; при переполнении очереди - 503"""
+    global _bcrypt_in_progress
+    if _bcrypt_in_progress >= settings.BCRYPT_MAX_WORKERS + settings.BCRYPT_MAX_QUEUE:
+        raise bcrypt_overloaded_exception
+
+    _bcrypt_in_progress += 1
+    try:
+        return await asyncio.get_running_loop().run_in_executor(_bcrypt_executor, func, *args)
+    finally:
+        _bcrypt_in_progress -= 1
+
+
+async def verify_password_async(plain_password: str, hashed_password: str) -> bool:
+    return await _run_bcrypt(verify_password, plain_password, hashed_password)
+
+
+async def get_password_hash_async(password: str) -> str:
+    return await _run_bcrypt(get_password_hash, password)
+
 
 def create_access_token(data: dict) -> str:
     to_encode = data.copy()
@@ -0,0 +1,55 @@
+import time
+from collections import OrderedDict
+from dataclasses import dataclass
+
+from app.core.config import settings
+
+
+@dataclass(frozen=True)
+class CachedUser:
+    """Снимок пользователя, достаточный для авторизации запроса"""
+    id: int
+    username: str
+    role: str
+
+
+class UserCache:
+    """
+    LRU-кэш пользователей с TTL, ключ - username (claim sub из токена).
+
+    Кэш локален для процесса: при нескольких воркерах изменение роли
+    в другом процессе становится видно не позже чем через ttl секунд.
+    """
+
+    def __init__(self, ttl: float, max_size: int):
+        self.ttl = ttl
+        self.max_size = max_size
+        self._items: OrderedDict[str, tuple[float, CachedUser]] = OrderedDict()
+
+    def get(self, username: str) -> CachedUser | None:
+        item = self._items.get(username)
+        if item is None:
+            return None
+        expires_at, user = item
+        if expires_at < time.monotonic():
+            self._items.pop(username, None)
+            return None
+        self._items.move_to_end(username)
+        return user
+
+    def set(self, user: CachedUser):
+        if self.ttl <= 0 or self.max_size <= 0:
+            return
+        self._items[user.username] = (time.monotonic() + self.ttl, user)
+        self._items.move_to_end(user.username)
+        while len(self._items) > self.max_size:
+            self._items.popitem(last=False)
+
+    def invalidate(self, username: str):
+        self._items.pop(username, None)
+
+    def clear(self):
+        self._items.clear()
+
+
+user_cache = UserCache(ttl=settings.USER_CACHE_TTL_SECONDS, max_size=settings.USER_CACHE_MAX_SIZE)
@@ -0,0 +1,74 @@
+"""
+Байты на проводе и CPU сериализации для больших списков писем:
+без сжатия / gzip / brotli и стандартный json против orjson.
+
+Запуск из корня репозитория:
+    python -m benchmarks.bench_compression --emails 200
+"""
+import argparse
+import gzip
+import json
+import time
+
+import brotli
+import orjson
+
+from benchmarks.corpus import email_payloads
+
+
+def _time(func, repeat: int) -> tuple[float, object]:
+    result = None
+    start = time.perf_counter()
+    for _ in range(repeat):
+        result = func()
+    return (time.perf_counter() - start) / repeat, result
+
+
+def main(emails: int, repeat: int) -> dict:
+    items = [
+        {"id": i, "status": "on_approval", "created_at": "2025-11-22T20:09:35+00:00", **payload}
+        for i, payload in enumerate(email_payloads(emails), start=1)
+    ]
+
+    json_seconds, body = _time(lambda: json.dumps(items, ensure_ascii=False).encode("utf-8"), repeat)
+    orjson_seconds, _ = _time(lambda: orjson.dumps(items), repeat)
+
+    results = {
+        "emails": emails,
+        "serialization": {
+            "json_ms": json_seconds * 1000,
+            "orjson_ms": orjson_seconds * 1000,
+            "speedup": json_seconds / orjson_seconds if orjson_seconds else None,
+        },
+        "wire_bytes": {"identity": len(body)},
+        "compress_ms": {},
+    }
+    for name, compress in {
+        "gzip_1": lambda: gzip.compress(body, compresslevel=1),
+        "gzip_6": lambda: gzip.compress(body, compresslevel=6),
+        "brotli_4": lambda: brotli.compress(body, quality=4),
+        "brotli_8": lambda: brotli.compress(body, quality=8),
+    }.items():
+        seconds, compressed = _time(compress, repeat)
+        results["wire_bytes"][name] = len(compressed)
+        results["compress_ms"][name] = seconds * 1000
+    return results
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--emails", type=int, default=200)
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--json", action="store_true", help="вывести результат в JSON")
+    args = parser.parse_args()
+
+    results = main(args.emails, args.repeat)
+    if args.json:
+        print(json.dumps(results, indent=2))
+    else:
+        ser = results["serialization"]
+        print(f"serialization: json={ser['json_ms']:.2f}ms orjson={ser['orjson_ms']:.2f}ms x{ser['speedup']:.1f}")
+        identity = results["wire_bytes"]["identity"]
+        for name, size in results["wire_bytes"].items():
+            ms = results["compress_ms"].get(name, 0.0)
+            print(f"{name:<10} {size:>12,d} bytes  ratio={identity / size:6.2f}  compress={ms:8.2f}ms")
@@ -0,0 +1,80 @@
+"""
+Шторм логинов: пропускная способность проверки паролей bcrypt и задержка
+параллельно обслуживаемых запросов (прием вебхуков) при синхронном bcrypt
+в event loop (прежнее поведение) и при выносе в ограниченный пул потоков.
+
+Задержка вебхука моделируется пробой, которая каждые --probe-interval мс
+выполняет короткий обработчик в том же event loop: если loop заблокирован
+bcrypt, проба ждет его освобождения, ровно как ждал бы настоящий запрос.
+
+Запуск из корня репозитория:
+    python -m benchmarks.bench_login_storm --logins 64 --concurrency 32
+"""
+import argparse
+import asyncio
+import json
+import time
+
+from benchmarks.stats import bench_env, summarize, format_row
+
+
+async def _storm(verify, hashed: str, logins: int, concurrency: int, probe_interval: float) -> dict:
+    semaphore = asyncio.Semaphore(concurrency)
+    login_samples: list[float] = []
+    probe_samples: list[float] = []
+    done = asyncio.Event()
+
+    async def login():
+        async with semaphore:
+            start = time.perf_counter()
+            await verify("correct horse battery staple", hashed)
+            login_samples.append(time.perf_counter() - start)
+
+    async def probe():
+        while not done.is_set():
+            scheduled = time.perf_counter()
+            await asyncio.sleep(0)
+            probe_samples.append(time.perf_counter() - scheduled)
+            await asyncio.sleep(probe_interval)
+
+    probe_task = asyncio.create_task(probe())
+    started = time.perf_counter()
+    await asyncio.gather(*(login() for _ in range(logins)))
+    elapsed = time.perf_counter() - started
+    done.set()
+    await probe_task
+    return {"logins": summarize(login_samples, elapsed), "webhook_probe": summarize(probe_samples)}
+
+
+async def main(logins: int, concurrency: int, probe_interval: float) -> dict:
+    from app.utils import security
+
+    hashed = security.get_password_hash("correct horse battery staple")
+
+    async def blocking_verify(password, hashed_password):
+        return security.verify_password(password, hashed_password)
+
+    return {
+        "sync_in_event_loop": await _storm(blocking_verify, hashed, logins, concurrency, probe_interval),
+        "thread_pool": await _storm(security.verify_password_async, hashed, logins, concurrency, probe_interval),
+    }
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--logins", type=int, default=64)
+    parser.add_argument("--concurrency", type=int, default=32)
+    parser.add_argument("--probe-interval", type=float, default=5, help="мс между пробами")
+    parser.add_argument("--rounds", type=int, default=12, help="BCRYPT_ROUNDS")
+    parser.add_argument("--workers", type=int, default=4, help="BCRYPT_MAX_WORKERS")
+    parser.add_argument("--json", action="store_true", help="вывести результат в JSON")
+    args = parser.parse_args()
+
+    bench_env(BCRYPT_ROUNDS=args.rounds, BCRYPT_MAX_WORKERS=args.workers, BCRYPT_MAX_QUEUE=args.logins)
+    results = asyncio.run(main(args.logins, args.concurrency, args.probe_interval / 1000))
+    if args.json:
+        print(json.dumps(results, indent=2))
+    else:
+        for mode, parts in results.items():
+            for name, summary in parts.items():
+                print(format_row(f"{mode}/{name}", summary))
@@ -0,0 +1,77 @@
+"""
+Задержка одного вызова отправки вебхука: новый httpx.AsyncClient на каждый
+вызов (прежнее поведение) против общего клиента с пулом keep-alive соединений.
+
+Запуск из корня репозитория:
+    python -m benchmarks.bench_n8n_client --calls 500 --concurrency 10
+"""
+import argparse
+import asyncio
+import json
+import time
+
+from benchmarks.fake_n8n import FakeN8N
+from benchmarks.stats import bench_env, summarize, format_row
+
+PAYLOAD = {
+    "id": 1,
+    "text_content": "Привет, мир!",
+    "html_content": "<p>Привет, мир!</p>" * 50,
+    "status": "approved",
+    "created_at": "2025-11-22T20:09:35+00:00",
+}
+
+
+async def _run(call, calls: int, concurrency: int) -> dict:
+    semaphore = asyncio.Semaphore(concurrency)
+    samples: list[float] = []
+
+    async def one():
+        async with semaphore:
+            start = time.perf_counter()
+            await call()
+            samples.append(time.perf_counter() - start)
+
+    started = time.perf_counter()
+    await asyncio.gather(*(one() for _ in range(calls)))
+    return summarize(samples, time.perf_counter() - started)
+
+
+async def main(calls: int, concurrency: int, http2: bool) -> dict:
+    with FakeN8N() as n8n:
+        bench_env(N8N_WEBHOOK_URL=n8n.url, N8N_HTTP2=str(http2).lower())
+
+        import httpx
+        from app.services import n8n_wh_emails
+
+        async def per_call_client():
+            async with httpx.AsyncClient() as client:
+                response = await client.post(n8n.url, json=PAYLOAD)
+                response.raise_for_status()
+
+        results = {"per_call_client": await _run(per_call_client, calls, concurrency)}
+
+        await n8n_wh_emails.start_n8n_client()
+        try:
+            results["shared_client"] = await _run(
+                lambda: n8n_wh_emails.send_email_to_n8n(PAYLOAD), calls, concurrency
+            )
+        finally:
+            await n8n_wh_emails.close_n8n_client()
+    return results
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--calls", type=int, default=500)
+    parser.add_argument("--concurrency", type=int, default=10)
+    parser.add_argument("--http2", action="store_true", help="включить HTTP/2 у общего клиента (нужен TLS у n8n)")
+    parser.add_argument("--json", action="store_true", help="вывести результат в JSON")
+    args = parser.parse_args()
+
+    results = asyncio.run(main(args.calls, args.concurrency, args.http2))
+    if args.json:
+        print(json.dumps(results, indent=2))
+    else:
+        for name, summary in results.items():
+            print(format_row(name, summary))
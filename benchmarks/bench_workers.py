@@ -0,0 +1,121 @@
+"""
+Масштабирование по ядрам: пропускная способность run.py при разном WEB_WORKERS.
+
+Для каждого числа воркеров запускается настоящий сервер (python run.py) и
+нагружается несколькими клиентскими процессами, чтобы генератор нагрузки сам
+не упирался в одно ядро. По умолчанию нагружается /openapi.json - CPU-
+bound ответ без обращения к БД, поэтому результат показывает именно
+масштабирование воркеров, а не базы. Эффективность - rps(N) относительно
+N * (rps на воркер в первом прогоне), 1.0 - линейный рост.
+
+Запуск из корня репозитория:
+    python -m benchmarks.bench_workers --workers 1 2 4 --duration 10
+"""
+import argparse
+import asyncio
+import json
+import multiprocessing
+import os
+import socket
+import subprocess
+import sys
+import time
+
+import httpx
+
+from benchmarks.stats import bench_env, summarize, format_row
+
+
+def _free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+def _wait_ready(url: str, timeout: float = 30.0):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        try:
+            response = httpx.get(url, timeout=1.0)
+        except httpx.HTTPError:
+            response = None
+        if response is not None:
+            if response.is_success:
+                return
+            # Сервер поднялся, но путь неверный: сообщаем сразу, а не посреди замера
+            if response.is_client_error:
+                raise RuntimeError(f"{url}: ответ {response.status_code}, проверьте --path")
+        time.sleep(0.2)
+    raise RuntimeError(f"Сервер не поднялся за {timeout} с: {url}")
+
+
+async def _client_loop(url: str, connections: int, duration: float) -> list[float]:
+    samples: list[float] = []
+    deadline = time.perf_counter() + duration
+    limits = httpx.Limits(max_connections=connections, max_keepalive_connections=connections)
+    async with httpx.AsyncClient(limits=limits, timeout=30.0) as client:
+        async def worker():
+            while time.perf_counter() < deadline:
+                start = time.perf_counter()
+                response = await client.get(url)
+                response.raise_for_status()
+                samples.append(time.perf_counter() - start)
+
+        await asyncio.gather(*(worker() for _ in range(connections)))
+    return samples
+
+
+def _client_process(args) -> list[float]:
+    url, connections, duration = args
+    return asyncio.run(_client_loop(url, connections, duration))
+
+
+def _measure(workers: int, path: str, clients: int, connections: int, duration: float) -> dict:
+    port = _free_port()
+    env = dict(os.environ, WEB_WORKERS=str(workers), APP_HOST="127.0.0.1", APP_PORT=str(port))
+    server = subprocess.Popen([sys.executable, "run.py"], env=env)
+    url = f"http://127.0.0.1:{port}{path}"
+    try:
+        _wait_ready(url)
+        # Прогрев: каждый воркер должен принять хотя бы несколько запросов
+        _client_process((url, connections, 1.0))
+
+        with multiprocessing.Pool(clients) as pool:
+            started = time.perf_counter()
+            parts = pool.map(_client_process, [(url, connections, duration)] * clients)
+            elapsed = time.perf_counter() - started
+        return summarize([sample for part in parts for sample in part], elapsed)
+    finally:
+        server.terminate()
+        server.wait(timeout=60)
+
+
+def main(workers: list[int], path: str, clients: int, connections: int, duration: float) -> dict:
+    bench_env(DATABASE_URL="sqlite+aiosqlite:///./bench.sqlite3", RESPONSE_COMPRESSION="off")
+    results = {"path": path, "clients": clients, "connections": connections, "runs": {}}
+    base = None
+    for count in workers:
+        summary = _measure(count, path, clients, connections, duration)
+        base = base or summary["throughput_rps"] / count
+        summary["efficiency"] = summary["throughput_rps"] / (base * count)
+        results["runs"][count] = summary
+    return results
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--workers", type=int, nargs="+", default=[1, 2, 4])
+    parser.add_argument("--path", default="/openapi.json")
+    parser.add_argument("--clients", type=int, default=max(1, (os.cpu_count() or 2) // 2),
+                        help="число клиентских процессов")
+    parser.add_argument("--connections", type=int, default=16, help="соединений на клиентский процесс")
+    parser.add_argument("--duration", type=float, default=10.0)
+    parser.add_argument("--json", action="store_true", help="вывести результат в JSON")
+    args = parser.parse_args()
+
+    results = main(args.workers, args.path, args.clients, args.connections, args.duration)
+    if args.json:
+        print(json.dumps(results, indent=2))
+    else:
+        for count, summary in results["runs"].items():
+            print(format_row(f"workers={count}", summary) + f" eff={summary['efficiency']:5.2f}")
@@ -0,0 +1,54 @@
+"""Синтетический корпус писем, похожих на реальные рассылки (inline CSS, таблицы, base64-картинки)."""
+import base64
+import random
+
+_WORDS = (
+    "скидка неделя новинки подписка заказ доставка бесплатно акция только сегодня "
+    "коллекция весна лето осень зима подарок клиент бонус промокод каталог магазин "
+    "offer sale newsletter update product launch webinar event register free shipping"
+).split()
+
+_STYLE_TD = ('style="padding:16px 24px;font-family:Helvetica,Arial,sans-serif;font-size:15px;'
+             'line-height:22px;color:#333333;background-color:#ffffff;text-align:left;"')
+_STYLE_BTN = ('style="display:inline-block;padding:12px 28px;border-radius:4px;background-color:#e4572e;'
+              'color:#ffffff;font-weight:bold;text-decoration:none;font-family:Helvetica,Arial,sans-serif;"')
+
+
+def _sentence(rng: random.Random, words: int) -> str:
+    return " ".join(rng.choice(_WORDS) for _ in range(words)).capitalize() + "."
+
+
+def newsletter_html(rng: random.Random, blocks: int = 8, image_bytes: int = 0) -> str:
+    rows = []
+    for i in range(blocks):
+        rows.append(
+            f'<tr><td {_STYLE_TD}><h2 style="margin:0 0 8px 0;font-size:20px;color:#111111;">'
+            f'{_sentence(rng, 5)}</h2><p style="margin:0 0 12px 0;">{_sentence(rng, 40)}</p>'
+            f'<a href="https://example.com/p/{rng.randint(1, 10**6)}?utm_source=newsletter&amp;utm_medium=email'
+            f'&amp;utm_campaign=c{i}" {_STYLE_BTN}>Подробнее</a></td></tr>'
+        )
+    if image_bytes:
+        data = base64.b64encode(rng.randbytes(image_bytes)).decode("ascii")
+        rows.append(f'<tr><td {_STYLE_TD}><img src="data:image/png;base64,{data}" width="600" alt=""></td></tr>')
+    return (
+        '<!DOCTYPE html><html><head><meta charset="utf-8"><style>body{margin:0;padding:0;}'
+        'table{border-collapse:collapse;}img{border:0;display:block;}</style></head>'
+        '<body style="background-color:#f4f4f4;"><table width="100%" cellpadding="0" cellspacing="0" '
+        'role="presentation"><tr><td align="center"><table width="600" cellpadding="0" cellspacing="0">'
+        + "".join(rows) +
+        '</table></td></tr></table></body></html>'
+    )
+
+
+def email_payloads(count: int, seed: int = 42, image_every: int = 5, image_bytes: int = 8192) -> list[dict]:
+    """Письма в виде EmailCreate-словарей; каждое image_every-е содержит base64-картинку"""
+    rng = random.Random(seed)
+    emails = []
+    for i in range(count):
+        with_image = image_every and i % image_every == 0
+        emails.append({
+            "text_content": "\n\n".join(_sentence(rng, 30) for _ in range(6)),
+            "html_content": newsletter_html(rng, blocks=rng.randint(4, 12),
+                                            image_bytes=image_bytes if with_image else 0),
+        })
+    return emails
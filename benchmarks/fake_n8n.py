@@ -0,0 +1,70 @@
+"""Локальная заглушка n8n для бенчмарков: принимает POST и отвечает 200."""
+import asyncio
+import threading
+import time
+
+import uvicorn
+
+
+class FakeN8N:
+    """
+    Минимальный HTTP-сервер в отдельном потоке.
+
+    Считает полученные запросы и элементы (JSON-массив считается поэлементно),
+    может имитировать задержку обработки workflow.
+    """
+
+    def __init__(self, host: str = "127.0.0.1", port: int = 0, delay: float = 0.0):
+        self.host = host
+        self.port = port
+        self.delay = delay
+        self.requests = 0
+        self.items = 0
+        self._server: uvicorn.Server | None = None
+        self._thread: threading.Thread | None = None
+
+    @property
+    def url(self) -> str:
+        return f"http://{self.host}:{self.port}/webhook"
+
+    async def _app(self, scope, receive, send):
+        if scope["type"] != "http":
+            return
+        body = b""
+        more = True
+        while more:
+            message = await receive()
+            body += message.get("body", b"")
+            more = message.get("more_body", False)
+
+        self.requests += 1
+        self.items += body.count(b'"id"') or 1
+        if self.delay:
+            await asyncio.sleep(self.delay)
+
+        await send({"type": "http.response.start", "status": 200,
+                    "headers": [(b"content-type", b"application/json")]})
+        await send({"type": "http.response.body", "body": b'{"ok":true}'})
+
+    def start(self) -> "FakeN8N":
+        # interface задан явно: связанный метод с тремя аргументами uvicorn принимает за ASGI2
+        config = uvicorn.Config(self._app, host=self.host, port=self.port, log_level="warning",
+                                lifespan="off", interface="asgi3")
+        self._server = uvicorn.Server(config)
+        self._thread = threading.Thread(target=self._server.run, daemon=True)
+        self._thread.start()
+        while not self._server.started:
+            time.sleep(0.01)
+        self.port = self._server.servers[0].sockets[0].getsockname()[1]
+        return self
+
+    def stop(self):
+        if self._server is not None:
+            self._server.should_exit = True
+            self._thread.join(timeout=5)
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *exc):
+        self.stop()
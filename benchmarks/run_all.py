@@ -0,0 +1,259 @@
+"""
+Сквозной бенчмарк API: прием вебхуков, списки писем, смена статуса с
+доставкой в n8n и логин. Результат - JSON, пригодный для сравнения прогонов.
+
+Все работает в одном процессе и без внешних сервисов: приложение вызывается
+через httpx.ASGITransport (с настоящим lifespan, то есть с доставщиком outbox),
+БД - SQLite (aiosqlite) в файле bench.sqlite3, который пересоздается на каждый
+прогон, n8n - локальная заглушка FakeN8N. Абсолютные цифры на SQLite ниже, чем
+на Postgres, поэтому сравнивать имеет смысл прогоны на одной машине.
+
+Запуск из корня репозитория:
+    pip install -r requirements.txt -r benchmarks/requirements.txt
+    python -m benchmarks.run_all --emails 5000 --output bench.json
+    # после изменений: сравнить с сохраненным прогоном, код возврата 1 при регрессии
+    python -m benchmarks.run_all --emails 5000 --baseline bench.json --max-regression 0.2
+"""
+import argparse
+import asyncio
+import json
+import os
+import platform
+import subprocess
+import sys
+import time
+from collections import Counter
+
+import httpx
+
+from benchmarks.corpus import email_payloads
+from benchmarks.fake_n8n import FakeN8N
+from benchmarks.stats import bench_env, summarize, format_row
+
+DB_PATH = "bench.sqlite3"
+ADMIN_USERNAME = "bench-admin"
+PASSWORD = "bench-password"
+SEED_CHUNK = 500
+
+
+async def _load(call, requests: int, concurrency: int) -> dict:
+    """
+    requests вызовов call(i) не более concurrency одновременно.
+
+    Ошибками считаются ответы >= 400 и исключения (таймауты, сбои приложения):
+    один упавший вызов не обрывает сценарий, а попадает в errors и exceptions.
+    """
+    semaphore = asyncio.Semaphore(concurrency)
+    samples: list[float] = []
+    errors = 0
+    exceptions: Counter[str] = Counter()
+
+    async def one(i: int):
+        nonlocal errors
+        async with semaphore:
+            start = time.perf_counter()
+            try:
+                response = await call(i)
+            except Exception as exc:
+                errors += 1
+                exceptions[type(exc).__name__] += 1
+                return
+            samples.append(time.perf_counter() - start)
+            if response.status_code >= 400:
+                errors += 1
+
+    started = time.perf_counter()
+    await asyncio.gather(*(one(i) for i in range(requests)))
+    result = summarize(samples, time.perf_counter() - started)
+    result["errors"] = errors
+    if exceptions:
+        result["exceptions"] = dict(exceptions)
+    return result
+
+
+async def _prepare_db(emails: int):
+    from sqlalchemy import event
+
+    from app.core.database import Base, AsyncSessionLocal, async_engine
+    from app.crud.email import insert_emails
+    from app.models import email as _email_model, outbox as _outbox_model  # noqa: F401 - регистрация таблиц
+    from app.models.user import User
+    from app.schemas.email import EmailCreate
+    from app.utils.security import get_password_hash
+
+    @event.listens_for(async_engine.sync_engine, "connect")
+    def _sqlite_pragmas(dbapi_connection, connection_record):
+        # WAL и ожидание блокировки вместо "database is locked" при параллельной записи
+        cursor = dbapi_connection.cursor()
+        cursor.execute("PRAGMA journal_mode=WAL")
+        cursor.execute("PRAGMA busy_timeout=5000")
+        cursor.close()
+
+    async with async_engine.begin() as conn:
+        await conn.run_sync(Base.metadata.create_all)
+
+    async with AsyncSessionLocal() as db:
+        db.add(User(username=ADMIN_USERNAME, hashed_password=get_password_hash(PASSWORD), role="admin"))
+        payloads = email_payloads(emails, seed=1)
+        for i in range(0, len(payloads), SEED_CHUNK):
+            await insert_emails(db, [EmailCreate(**payload) for payload in payloads[i:i + SEED_CHUNK]])
+        await db.commit()
+
+    # Соединения пула привязаны к event loop подготовки, замеры идут в новом
+    await async_engine.dispose()
+
+
+async def _wait_delivered(fake: FakeN8N, expected: int, timeout: float) -> float | None:
+    """Секунды до доставки expected писем в n8n или None, если не успели за timeout"""
+    started = time.perf_counter()
+    while fake.items < expected:
+        if time.perf_counter() - started > timeout:
+            return None
+        await asyncio.sleep(0.01)
+    return time.perf_counter() - started
+
+
+async def _scenarios(fake: FakeN8N, args) -> dict:
+    from app.app import app
+
+    results = {}
+    transport = httpx.ASGITransport(app=app, client=("127.0.0.1", 50000))
+    # https: cookie access_token выставляется с флагом secure
+    async with app.router.lifespan_context(app), \
+            httpx.AsyncClient(transport=transport, base_url="https://bench", timeout=60.0) as client:
+        credentials = {"username": ADMIN_USERNAME, "password": PASSWORD}
+
+        results["login"] = await _load(
+            lambda i: client.post("/api/auth/login", json=credentials), args.logins, args.concurrency
+        )
+        response = await client.post("/api/auth/login", json=credentials)
+        response.raise_for_status()
+
+        new_emails = email_payloads(args.requests, seed=2)
+        results["webhook"] = await _load(
+            lambda i: client.post("/api/emails/webhook", json=new_emails[i]), args.requests, args.concurrency
+        )
+
+        batches = email_payloads(args.batch_requests * args.batch_size, seed=3)
+        results["webhook_batch"] = await _load(
+            lambda i: client.post(
+                "/api/emails/webhook/batch", json=batches[i * args.batch_size:(i + 1) * args.batch_size]
+            ),
+            args.batch_requests, args.concurrency,
+        )
+        results["webhook_batch"]["emails_per_request"] = args.batch_size
+
+        for view in ("summary", "full"):
+            params = {"limit": args.page_size, "view": view}
+            results[f"pending_{view}"] = await _load(
+                lambda i: client.get("/api/emails/pending", params=params), args.requests, args.concurrency
+            )
+            results[f"all_{view}"] = await _load(
+                lambda i: client.get("/api/emails/all", params=params), args.requests, args.concurrency
+            )
+
+        # Смена статуса на approved: ответ API и время до доставки всех писем в n8n
+        delivered_before = fake.items
+        updates = min(args.requests, args.emails)
+        started = time.perf_counter()
+        results["status_update"] = await _load(
+            lambda i: client.patch(f"/api/emails/{i + 1}/status", json={"status": "approved"}),
+            updates, args.concurrency,
+        )
+        fanout = await _wait_delivered(fake, delivered_before + updates, args.fanout_timeout)
+        results["status_update"]["fanout_seconds"] = (
+            time.perf_counter() - started if fanout is not None else None
+        )
+        results["status_update"]["delivered"] = fake.items - delivered_before
+
+    return results
+
+
+def _meta(args) -> dict:
+    try:
+        revision = subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True, check=True
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        revision = None
+    return {
+        "revision": revision,
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "cpus": os.cpu_count(),
+        "args": vars(args),
+    }
+
+
+def compare(results: dict, baseline: dict, max_regression: float) -> list[str]:
+    """Регрессии p95 и пропускной способности больше max_regression (доля) относительно baseline"""
+    problems = []
+    for name, current in results["scenarios"].items():
+        previous = baseline.get("scenarios", {}).get(name)
+        if not previous:
+            continue
+        if previous["p95_ms"] and current["p95_ms"] > previous["p95_ms"] * (1 + max_regression):
+            problems.append(f"{name}: p95 {previous['p95_ms']:.2f}ms -> {current['p95_ms']:.2f}ms")
+        if previous.get("throughput_rps") and \
+                current.get("throughput_rps", 0) < previous["throughput_rps"] * (1 - max_regression):
+            problems.append(f"{name}: rps {previous['throughput_rps']:.1f} -> {current['throughput_rps']:.1f}")
+        if current.get("errors"):
+            problems.append(f"{name}: {current['errors']} ошибочных ответов")
+    return problems
+
+
+def main(args) -> dict:
+    for path in (DB_PATH, f"{DB_PATH}-wal", f"{DB_PATH}-shm"):
+        if os.path.exists(path):
+            os.remove(path)
+
+    with FakeN8N(delay=args.n8n_delay) as fake:
+        # Окружение задается до первого импорта app: Settings читаются один раз
+        os.environ["DATABASE_URL"] = f"sqlite+aiosqlite:///./{DB_PATH}"
+        os.environ["N8N_WEBHOOK_URL"] = fake.url
+        bench_env(BCRYPT_ROUNDS=args.bcrypt_rounds)
+
+        asyncio.run(_prepare_db(args.emails))
+        scenarios = asyncio.run(_scenarios(fake, args))
+
+    return {"meta": _meta(args), "scenarios": scenarios}
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--emails", type=int, default=2000, help="писем в БД перед замерами")
+    parser.add_argument("--requests", type=int, default=500, help="запросов в каждом сценарии")
+    parser.add_argument("--concurrency", type=int, default=16)
+    parser.add_argument("--logins", type=int, default=50)
+    parser.add_argument("--bcrypt-rounds", type=int, default=12)
+    parser.add_argument("--batch-requests", type=int, default=20)
+    parser.add_argument("--batch-size", type=int, default=100)
+    parser.add_argument("--page-size", type=int, default=100)
+    parser.add_argument("--n8n-delay", type=float, default=0.0, help="имитация времени обработки в n8n, с")
+    parser.add_argument("--fanout-timeout", type=float, default=120.0)
+    parser.add_argument("--output", help="сохранить результат в JSON-файл")
+    parser.add_argument("--baseline", help="JSON предыдущего прогона для сравнения")
+    parser.add_argument("--max-regression", type=float, default=0.2, help="допустимое ухудшение (доля)")
+    parser.add_argument("--json", action="store_true", help="вывести результат в JSON")
+    args = parser.parse_args()
+
+    results = main(args)
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            json.dump(results, f, indent=2)
+
+    if args.json:
+        print(json.dumps(results, indent=2))
+    else:
+        for name, summary in results["scenarios"].items():
+            row = format_row(name, summary) + (f" errors={summary['errors']}" if summary["errors"] else "")
+            print(row + (f" exceptions={summary['exceptions']}" if "exceptions" in summary else ""))
+        fanout = results["scenarios"]["status_update"]["fanout_seconds"]
+        print(f"status_update fan-out: {fanout:.2f}s" if fanout is not None else "status_update fan-out: timeout")
+
+    if args.baseline:
+        with open(args.baseline, encoding="utf-8") as f:
+            problems = compare(results, json.load(f), args.max_regression)
+        for problem in problems:
+            print(f"REGRESSION {problem}", file=sys.stderr)
+        sys.exit(1 if problems else 0)
@@ -0,0 +1,51 @@
+"""Общие помощники бенчмарков: перцентили и переменные окружения приложения."""
+import os
+import statistics
+
+
+def bench_env(**overrides):
+    """Минимальное окружение, чтобы импортировать app.core.config без .env"""
+    defaults = {
+        "SECRET_KEY": "bench-secret",
+        "ALGORITHM": "HS256",
+        "ACCESS_TOKEN_EXPIRE_MINUTES": "60",
+        "DATABASE_URL": "sqlite+aiosqlite:///./bench.sqlite3",
+        "APP_HOST": "127.0.0.1",
+        "APP_PORT": "8000",
+        "N8N_WEBHOOK_URL": "",
+        "LOG_LEVEL": "WARNING",
+    }
+    defaults.update(overrides)
+    for key, value in defaults.items():
+        os.environ.setdefault(key, str(value))
+
+
+def percentile(samples: list[float], p: float) -> float:
+    if not samples:
+        return 0.0
+    ordered = sorted(samples)
+    index = min(len(ordered) - 1, max(0, round(p / 100 * (len(ordered) - 1))))
+    return ordered[index]
+
+
+def summarize(samples: list[float], elapsed: float | None = None) -> dict:
+    """Сводка по задержкам в секундах -> миллисекунды"""
+    result = {
+        "count": len(samples),
+        "mean_ms": statistics.fmean(samples) * 1000 if samples else 0.0,
+        "p50_ms": percentile(samples, 50) * 1000,
+        "p95_ms": percentile(samples, 95) * 1000,
+        "p99_ms": percentile(samples, 99) * 1000,
+        "max_ms": max(samples) * 1000 if samples else 0.0,
+    }
+    if elapsed:
+        result["throughput_rps"] = len(samples) / elapsed
+    return result
+
+
+def format_row(name: str, summary: dict) -> str:
+    row = (f"{name:<28} n={summary['count']:<6} mean={summary['mean_ms']:8.2f}ms "
+           f"p50={summary['p50_ms']:8.2f}ms p95={summary['p95_ms']:8.2f}ms p99={summary['p99_ms']:8.2f}ms")
+    if "throughput_rps" in summary:
+        row += f" rps={summary['throughput_rps']:9.1f}"
+    return row
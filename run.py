@@ -1,8 +1,54 @@
-import asyncio
+import os
+import tempfile
 
-from app.app import app
 from app.core.config import settings
 
+# Минимум соединений на воркер: LISTEN событий SSE, запросы, фоновые задачи
+MIN_CONNECTIONS_PER_WORKER = 4
+
+
+def worker_count() -> int:
+    """
+    WEB_WORKERS или число ядер, доступных процессу (учитывает ограничения cgroup/taskset).
+
+    Автоматическое число ограничено бюджетом DB_MAX_CONNECTIONS, иначе на многоядерной
+    машине воркеры вместе превысят max_connections Postgres.
+    """
+    if settings.WEB_WORKERS > 0:
+        return settings.WEB_WORKERS
+    try:
+        cpus = len(os.sched_getaffinity(0))
+    except AttributeError:
+        cpus = os.cpu_count() or 1
+    if settings.DB_MAX_CONNECTIONS > 0:
+        cpus = min(cpus, max(settings.DB_MAX_CONNECTIONS // MIN_CONNECTIONS_PER_WORKER, 1))
+    return cpus
+
+
 if __name__ == "__main__":
     import uvicorn
-    uvicorn.run(app, host=settings.APP_HOST, port=settings.APP_PORT)
+
+    workers = worker_count()
+    # Воркеры делят DB_MAX_CONNECTIONS между собой (см. pool_limits)
+    os.environ["WEB_WORKERS"] = str(workers)
+    if workers > 1:
+        # Метрики Prometheus собираются из файлов всех воркеров; каталог новый на каждый запуск
+        os.environ.setdefault("PROMETHEUS_MULTIPROC_DIR", tempfile.mkdtemp(prefix="n8nback-metrics-"))
+
+    # Приложение передается строкой: каждый воркер импортирует его сам.
+    # loop/http "auto" выбирают uvloop и httptools, если они установлены.
+    uvicorn.run(
+        "app.app:app",
+        host=settings.APP_HOST,
+        port=settings.APP_PORT,
+        workers=workers,
+        loop="auto",
+        http="auto",
+        backlog=settings.WEB_BACKLOG,
+        timeout_keep_alive=settings.WEB_KEEPALIVE_TIMEOUT,
+        limit_concurrency=settings.WEB_LIMIT_CONCURRENCY,
+        timeout_graceful_shutdown=settings.WEB_GRACEFUL_SHUTDOWN_TIMEOUT,
+        proxy_headers=settings.WEB_PROXY_HEADERS,
+        forwarded_allow_ips=settings.WEB_FORWARDED_ALLOW_IPS,
+        log_level=settings.LOG_LEVEL.lower(),
+    )
@@ -0,0 +1,83 @@
+import os
+import tempfile
+
+# Settings читаются при первом импорте app, поэтому окружение задается до него
+_DB_DIR = tempfile.mkdtemp(prefix="n8nback-tests-")
+os.environ.update({
+    "SECRET_KEY": "test-secret",
+    "ALGORITHM": "HS256",
+    "ACCESS_TOKEN_EXPIRE_MINUTES": "60",
+    "DATABASE_URL": f"sqlite+aiosqlite:///{_DB_DIR}/test.sqlite3",
+    "APP_HOST": "127.0.0.1",
+    "APP_PORT": "8000",
+    "N8N_WEBHOOK_URL": "",
+    "BCRYPT_ROUNDS": "4",
+    "METRICS_ENABLED": "true",
+    "METRICS_TOKEN": "test-metrics-token",
+    "LOG_QUEUE": "false",
+    "LOOP_LAG_MONITOR": "false",
+})
+
+import httpx  # noqa: E402
+import pytest  # noqa: E402
+from prometheus_client import REGISTRY  # noqa: E402
+
+from app.app import app  # noqa: E402
+from app.core.database import Base, AsyncSessionLocal, async_engine  # noqa: E402
+from app.models import email as _email_model, outbox as _outbox_model  # noqa: E402,F401 - регистрация таблиц
+from app.models.user import User  # noqa: E402
+from app.utils.idempotency import idempotency_cache  # noqa: E402
+from app.utils.security import get_password_hash  # noqa: E402
+from app.utils.user_cache import user_cache  # noqa: E402
+
+ADMIN_USERNAME = "admin"
+ADMIN_PASSWORD = "admin-password"
+
+
+@pytest.fixture
+def anyio_backend():
+    return "asyncio"
+
+
+@pytest.fixture
+async def db():
+    """Чистая схема на каждый тест"""
+    async with async_engine.begin() as conn:
+        await conn.run_sync(Base.metadata.drop_all)
+        await conn.run_sync(Base.metadata.create_all)
+    user_cache._items.clear()
+    idempotency_cache._items.clear()
+
+    async with AsyncSessionLocal() as session:
+        session.add(User(username=ADMIN_USERNAME, hashed_password=get_password_hash(ADMIN_PASSWORD), role="admin"))
+        await session.commit()
+        yield session
+
+    # Соединения aiosqlite привязаны к event loop теста
+    await async_engine.dispose()
+
+
+@pytest.fixture
+async def client(db):
+    transport = httpx.ASGITransport(app=app)
+    # https: cookie access_token выставляется с флагом secure
+    async with httpx.AsyncClient(transport=transport, base_url="https://test") as client:
+        yield client
+
+
+@pytest.fixture
+async def admin_client(client):
+    response = await client.post("/api/auth/login", json={"username": ADMIN_USERNAME, "password": ADMIN_PASSWORD})
+    assert response.status_code == 200
+    return client
+
+
+def _db_queries(route: str) -> float:
+    return REGISTRY.get_sample_value("http_request_db_queries_sum", {"route": route}) or 0.0
+
+
+async def count_queries(route: str, request) -> tuple[int, object]:
+    """Число SQL-запросов, выполненных эндпоинтом route за время запроса, и сам ответ"""
+    before = _db_queries(route)
+    response = await request
+    return int(_db_queries(route) - before), response
@@ -0,0 +1,55 @@
+"""Вход и регистрация: хэширование паролей в пуле bcrypt"""
+import pytest
+from sqlalchemy import select
+
+from app.core.config import settings
+from app.models.user import User
+from app.utils import security
+from tests.conftest import ADMIN_PASSWORD, ADMIN_USERNAME
+
+pytestmark = pytest.mark.anyio
+
+ADMIN = {"username": ADMIN_USERNAME, "password": ADMIN_PASSWORD}
+
+
+@pytest.fixture
+def bcrypt_saturated(monkeypatch):
+    """Все потоки bcrypt заняты и очередь заполнена"""
+    monkeypatch.setattr(security, "_bcrypt_in_progress", settings.BCRYPT_MAX_WORKERS + settings.BCRYPT_MAX_QUEUE)
+
+
+async def test_login_returns_503_when_bcrypt_saturated(client, bcrypt_saturated):
+    response = await client.post("/api/auth/login", json=ADMIN)
+    assert response.status_code == 503
+    assert response.headers["retry-after"] == "1"
+
+
+async def test_register_returns_503_when_bcrypt_saturated(client, bcrypt_saturated):
+    response = await client.post("/api/auth/register", json={"username": "new-user", "password": "new-password"})
+    assert response.status_code == 503
+
+
+async def _admin_hash(db) -> str:
+    db.expire_all()
+    return await db.scalar(select(User.hashed_password).where(User.username == ADMIN_USERNAME))
+
+
+async def test_login_rehashes_password_when_rounds_change(db, client, monkeypatch):
+    assert not security.password_needs_rehash(await _admin_hash(db))
+    monkeypatch.setattr(settings, "BCRYPT_ROUNDS", settings.BCRYPT_ROUNDS + 1)
+
+    response = await client.post("/api/auth/login", json=ADMIN)
+    assert response.status_code == 200
+    hashed_password = await _admin_hash(db)
+    assert not security.password_needs_rehash(hashed_password)
+    assert security.verify_password(ADMIN_PASSWORD, hashed_password)
+
+
+async def test_login_keeps_hash_when_rehash_disabled(db, client, monkeypatch):
+    old_hash = await _admin_hash(db)
+    monkeypatch.setattr(settings, "BCRYPT_ROUNDS", settings.BCRYPT_ROUNDS + 1)
+    monkeypatch.setattr(settings, "BCRYPT_REHASH_ON_LOGIN", False)
+
+    response = await client.post("/api/auth/login", json=ADMIN)
+    assert response.status_code == 200
+    assert await _admin_hash(db) == old_hash
@@ -0,0 +1,73 @@
+"""Массовые операции над письмами: /bulk/status и /bulk/delete"""
+from datetime import datetime, timedelta, timezone
+
+import pytest
+from sqlalchemy import select
+
+from app.core.database import AsyncSessionLocal
+from app.models.email import Email
+from app.models.outbox import OutboxStatus, WebhookOutbox
+
+pytestmark = pytest.mark.anyio
+
+
+@pytest.fixture
+async def email_ids(admin_client):
+    response = await admin_client.post("/api/emails/webhook/batch", json=[
+        {"text_content": str(i), "html_content": f"<p>{i}</p>"} for i in range(4)
+    ])
+    assert response.status_code == 201
+    return response.json()["ids"]
+
+
+def _future() -> str:
+    return (datetime.now(timezone.utc) + timedelta(hours=1)).isoformat()
+
+
+async def _outbox_email_ids() -> list[int]:
+    async with AsyncSessionLocal() as db:
+        return list((await db.scalars(
+            select(WebhookOutbox.email_id)
+            .where(WebhookOutbox.status == OutboxStatus.PENDING)
+            .order_by(WebhookOutbox.email_id)
+        )).all())
+
+
+async def _stored_ids() -> list[int]:
+    async with AsyncSessionLocal() as db:
+        return list((await db.scalars(select(Email.id).order_by(Email.id))).all())
+
+
+@pytest.mark.parametrize("method, path, body", [
+    ("PATCH", "/api/emails/bulk/status", {"status": "approved"}),
+    ("POST", "/api/emails/bulk/delete", {}),
+])
+async def test_bulk_requires_filter(admin_client, email_ids, method, path, body):
+    response = await admin_client.request(method, path, json=body)
+    assert response.status_code == 422
+    assert await _stored_ids() == email_ids
+
+
+async def test_bulk_approve_enqueues_webhooks(admin_client, email_ids):
+    response = await admin_client.patch("/api/emails/bulk/status", json={"ids": email_ids[:2], "status": "approved"})
+    assert response.status_code == 200
+    assert response.json() == {"count": 2, "ids": email_ids[:2]}
+    assert await _outbox_email_ids() == email_ids[:2]
+
+    # Отклонение в outbox не попадает
+    response = await admin_client.patch("/api/emails/bulk/status", json={"ids": email_ids[2:], "status": "rejected"})
+    assert response.json()["count"] == 2
+    assert await _outbox_email_ids() == email_ids[:2]
+
+
+async def test_bulk_delete_pending_older_than(admin_client, email_ids):
+    await admin_client.patch("/api/emails/bulk/status", json={"ids": email_ids[:1], "status": "approved"})
+
+    # Фильтр по дате затрагивает только письма на модерации
+    response = await admin_client.post("/api/emails/bulk/delete", json={"pending_older_than": _future()})
+    assert response.status_code == 200
+    assert response.json() == {"count": 3, "ids": email_ids[1:]}
+    assert await _stored_ids() == email_ids[:1]
+
+    response = await admin_client.post("/api/emails/bulk/delete", json={"ids": email_ids})
+    assert response.json() == {"count": 1, "ids": email_ids[:1]}
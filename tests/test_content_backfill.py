@@ -0,0 +1,48 @@
+"""Перенос писем из старого текстового столбца html_content"""
+import pytest
+from sqlalchemy import insert, select
+
+from app.crud.email import compress_stored_emails
+from app.models.email import Email, EmailStatus
+
+pytestmark = pytest.mark.anyio
+
+
+async def _insert_legacy(db, html: str) -> int:
+    email_id = await db.scalar(
+        insert(Email)
+        .values(text_content="Привет", legacy_html_content=html, html_size=None, status=EmailStatus.ON_APPROVAL)
+        .returning(Email.id)
+    )
+    await db.commit()
+    return email_id
+
+
+async def test_legacy_email_readable_before_backfill(admin_client, db):
+    email_id = await _insert_legacy(db, "<p>старое</p>")
+
+    response = await admin_client.get(f"/api/emails/{email_id}")
+    assert response.json()["html_content"] == "<p>старое</p>"
+
+    pending = await admin_client.get("/api/emails/pending")
+    assert pending.json()[0]["html_size"] == len("<p>старое</p>".encode("utf-8"))
+
+
+async def test_backfill_moves_legacy_content(db):
+    email_id = await _insert_legacy(db, "<p>старое</p>")
+
+    assert await compress_stored_emails(db, 0, 100) == email_id
+    assert await compress_stored_emails(db, 0, 100) is None
+
+    db.expunge_all()
+    email = await db.scalar(select(Email).where(Email.id == email_id))
+    assert email.legacy_html_content is None
+    assert email.html_content == "<p>старое</p>"
+    assert email.html_size == len("<p>старое</p>".encode("utf-8"))
+
+
+async def test_new_email_written_to_packed_column(client, db):
+    response = await client.post("/api/emails/webhook", json={"text_content": "Привет", "html_content": "<p>новое</p>"})
+    email = await db.scalar(select(Email).where(Email.id == response.json()["id"]))
+    assert email.legacy_html_content is None
+    assert email.html_size == len("<p>новое</p>".encode("utf-8"))
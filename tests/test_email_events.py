@@ -0,0 +1,26 @@
+"""Рассылка событий SSE внутри процесса (без Postgres)"""
+import json
+
+import pytest
+
+from app.crud.email import create_email, insert_emails
+from app.schemas.email import EmailCreate
+from app.services.email_events import email_events
+
+pytestmark = pytest.mark.anyio
+
+
+async def test_event_sent_after_commit(db):
+    async with email_events.subscribe() as subscriber:
+        email, created = await create_email(db, EmailCreate(text_content="Привет", html_content="<p/>"))
+        assert created
+        event = json.loads(subscriber.queue.get_nowait())
+        assert event == {"event": "created", "ids": [email.id], "status": "on_approval"}
+
+
+async def test_rolled_back_write_not_published(db):
+    async with email_events.subscribe() as subscriber:
+        # insert_emails не коммитит: публикация ждет коммита вызывающего кода
+        await insert_emails(db, [EmailCreate(text_content="Привет", html_content="<p/>")])
+        await db.rollback()
+        assert subscriber.queue.empty()
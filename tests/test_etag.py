@@ -0,0 +1,45 @@
+import pytest
+
+from app.routers import email as email_router
+from app.utils.etag import etag_matches, make_etag
+
+
+def test_etag_is_weak():
+    assert make_etag(1, "/api/emails/pending", "").startswith('W/"')
+
+
+def test_etag_matches_with_and_without_weak_prefix():
+    etag = make_etag(1, "/api/emails/pending", "")
+    assert etag_matches(etag, etag)
+    assert etag_matches(etag.removeprefix("W/"), etag)
+    assert etag_matches(f'"other", {etag}', etag)
+    assert not etag_matches(make_etag(2, "/api/emails/pending", ""), etag)
+
+
+@pytest.fixture
+def emails_version(monkeypatch):
+    """Версия данных есть только на Postgres - в тестах подменяем ее счетчиком"""
+    version = {"value": 1}
+
+    async def get_emails_version(db):
+        return version["value"]
+
+    monkeypatch.setattr(email_router, "get_emails_version", get_emails_version)
+    return version
+
+
+@pytest.mark.anyio
+async def test_pending_returns_304_until_version_changes(admin_client, emails_version):
+    first = await admin_client.get("/api/emails/pending")
+    assert first.status_code == 200
+    etag = first.headers["etag"]
+
+    cached = await admin_client.get("/api/emails/pending", headers={"If-None-Match": etag})
+    assert cached.status_code == 304
+    assert cached.headers["etag"] == etag
+    assert cached.content == b""
+
+    emails_version["value"] += 1
+    changed = await admin_client.get("/api/emails/pending", headers={"If-None-Match": etag})
+    assert changed.status_code == 200
+    assert changed.headers["etag"] != etag
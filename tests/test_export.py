@@ -0,0 +1,53 @@
+"""Потоковая выгрузка архива писем: NDJSON и CSV"""
+import csv
+import io
+import json
+
+import pytest
+
+from app.utils.export import CSV_COLUMNS, EXPORT_MEDIA_TYPES
+
+pytestmark = pytest.mark.anyio
+
+EMAILS = [
+    {"text_content": "первое", "html_content": "<p>1</p>"},
+    {"text_content": "второе, с запятой", "html_content": "<p>\"2\"\n</p>"},
+    {"text_content": "третье", "html_content": "<p>3</p>"},
+]
+
+
+@pytest.fixture
+async def stored_ids(admin_client):
+    response = await admin_client.post("/api/emails/webhook/batch", json=EMAILS)
+    assert response.status_code == 201
+    return response.json()["ids"]
+
+
+async def _export(client, export_format: str):
+    async with client.stream("GET", "/api/emails/all", params={"format": export_format}) as response:
+        body = b"".join([chunk async for chunk in response.aiter_bytes()])
+    return response, body.decode("utf-8")
+
+
+async def test_ndjson_export(admin_client, stored_ids):
+    response, body = await _export(admin_client, "ndjson")
+    assert response.status_code == 200
+    assert response.headers["content-type"] == EXPORT_MEDIA_TYPES["ndjson"]
+    assert 'filename="emails.ndjson"' in response.headers["content-disposition"]
+
+    rows = [json.loads(line) for line in body.splitlines()]
+    assert [row["id"] for row in rows] == stored_ids
+    assert rows[1]["html_content"] == EMAILS[1]["html_content"]
+
+
+async def test_csv_export(admin_client, stored_ids):
+    response, body = await _export(admin_client, "csv")
+    assert response.status_code == 200
+    assert response.headers["content-type"] == EXPORT_MEDIA_TYPES["csv"]
+
+    header, *rows = list(csv.reader(io.StringIO(body)))
+    assert header == CSV_COLUMNS
+    assert len(rows) == len(EMAILS)
+    assert [int(row[0]) for row in rows] == stored_ids
+    assert rows[1][CSV_COLUMNS.index("text_content")] == EMAILS[1]["text_content"]
+    assert rows[1][CSV_COLUMNS.index("html_content")] == EMAILS[1]["html_content"]
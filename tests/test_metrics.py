@@ -0,0 +1,17 @@
+import pytest
+
+pytestmark = pytest.mark.anyio
+
+
+async def test_metrics_require_token(client):
+    response = await client.get("/metrics")
+    assert response.status_code == 401
+
+    response = await client.get("/metrics", headers={"Authorization": "Bearer test-metrics-token"})
+    assert response.status_code == 200
+    assert "http_request_db_queries" in response.text
+
+
+async def test_metrics_non_ascii_token(client):
+    response = await client.get("/metrics", headers={"Authorization": "Bearer тест".encode()})
+    assert response.status_code == 401
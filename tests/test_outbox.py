@@ -0,0 +1,180 @@
+"""Доставка outbox в n8n: повторы с backoff, dead-letter, ошибки конфигурации"""
+import asyncio
+from datetime import datetime, timedelta, timezone
+
+import pytest
+from sqlalchemy import select, update
+
+from app.core.config import settings
+from app.core.database import AsyncSessionLocal
+from app.models.outbox import OutboxStatus, WebhookOutbox
+from app.services import webhook_dispatcher as dispatcher_module
+from app.services.n8n_wh_emails import send_batch_to_n8n, send_email_to_n8n
+from app.services.webhook_dispatcher import WebhookDispatcher
+
+pytestmark = pytest.mark.anyio
+
+
+def _now() -> datetime:
+    # SQLite возвращает время без зоны, в UTC
+    return datetime.now(timezone.utc).replace(tzinfo=None)
+
+
+class FakeN8N:
+    """Подмена отправки в n8n: запоминает тела запросов и падает по флагу"""
+
+    def __init__(self):
+        self.calls: list = []
+        self.fail = False
+
+    async def send(self, body):
+        self.calls.append(body)
+        if self.fail:
+            raise RuntimeError("n8n недоступен")
+
+
+@pytest.fixture
+def n8n(monkeypatch):
+    fake = FakeN8N()
+    monkeypatch.setattr(settings, "N8N_WEBHOOK_URL", "http://n8n.test/webhook")
+    monkeypatch.setattr(settings, "N8N_BATCH_ENABLED", False)
+    monkeypatch.setattr(dispatcher_module, "send_email_to_n8n", fake.send)
+    monkeypatch.setattr(dispatcher_module, "send_batch_to_n8n", fake.send)
+    return fake
+
+
+async def _enqueue(db, count: int) -> list[int]:
+    entries = [
+        WebhookOutbox(email_id=i, payload={"id": i}, status=OutboxStatus.PENDING, attempts=0,
+                      next_attempt_at=_now() - timedelta(seconds=1))
+        for i in range(1, count + 1)
+    ]
+    db.add_all(entries)
+    await db.commit()
+    return [entry.id for entry in entries]
+
+
+async def _dispatch(dispatcher: WebhookDispatcher) -> bool:
+    """Один проход доставщика с ожиданием запущенных доставок"""
+    has_more = await dispatcher._dispatch_due()
+    await asyncio.gather(*list(dispatcher._in_flight))
+    return has_more
+
+
+async def _entries() -> list[WebhookOutbox]:
+    async with AsyncSessionLocal() as db:
+        return list((await db.scalars(select(WebhookOutbox).order_by(WebhookOutbox.id))).all())
+
+
+async def _make_due():
+    async with AsyncSessionLocal() as db:
+        await db.execute(update(WebhookOutbox).values(next_attempt_at=_now() - timedelta(seconds=1)))
+        await db.commit()
+
+
+async def test_delivered(db, n8n):
+    await _enqueue(db, 2)
+    await _dispatch(WebhookDispatcher())
+
+    assert sorted(call["id"] for call in n8n.calls) == [1, 2]
+    assert [entry.status for entry in await _entries()] == [OutboxStatus.DELIVERED] * 2
+
+
+async def test_failure_retried_with_backoff(db, n8n):
+    await _enqueue(db, 1)
+    n8n.fail = True
+    dispatcher = WebhookDispatcher()
+    await _dispatch(dispatcher)
+
+    [entry] = await _entries()
+    assert entry.status == OutboxStatus.PENDING
+    assert entry.attempts == 1
+    assert "n8n недоступен" in entry.last_error
+    assert entry.next_attempt_at > _now()
+
+    # До истечения backoff запись не забирается
+    await _dispatch(dispatcher)
+    assert len(n8n.calls) == 1
+
+    n8n.fail = False
+    await _make_due()
+    await _dispatch(dispatcher)
+    [entry] = await _entries()
+    assert entry.status == OutboxStatus.DELIVERED
+    assert entry.attempts == 2
+
+
+async def test_dead_letter_after_max_attempts(db, n8n, monkeypatch):
+    monkeypatch.setattr(settings, "OUTBOX_MAX_ATTEMPTS", 2)
+    await _enqueue(db, 1)
+    n8n.fail = True
+    dispatcher = WebhookDispatcher()
+
+    await _dispatch(dispatcher)
+    await _make_due()
+    await _dispatch(dispatcher)
+
+    [entry] = await _entries()
+    assert entry.status == OutboxStatus.DEAD
+    assert entry.attempts == 2
+
+    await _make_due()
+    await _dispatch(dispatcher)
+    assert len(n8n.calls) == 2
+
+
+async def test_without_url_entries_stay_pending(db, n8n, monkeypatch):
+    monkeypatch.setattr(settings, "N8N_WEBHOOK_URL", "")
+    await _enqueue(db, 1)
+
+    assert await _dispatch(WebhookDispatcher()) is False
+    assert n8n.calls == []
+    [entry] = await _entries()
+    assert entry.status == OutboxStatus.PENDING
+    assert entry.attempts == 0
+
+
+async def test_send_without_url_raises(monkeypatch):
+    monkeypatch.setattr(settings, "N8N_WEBHOOK_URL", "")
+    with pytest.raises(RuntimeError):
+        await send_email_to_n8n({"id": 1})
+    with pytest.raises(RuntimeError):
+        await send_batch_to_n8n([{"id": 1}])
+
+
+@pytest.fixture
+def batch_mode(n8n, monkeypatch):
+    monkeypatch.setattr(settings, "N8N_BATCH_ENABLED", True)
+    monkeypatch.setattr(settings, "N8N_BATCH_MAX_SIZE", 3)
+    monkeypatch.setattr(settings, "N8N_BATCH_MAX_WAIT_MS", 0)
+    return n8n
+
+
+async def test_batch_posts_one_array_per_claim(db, batch_mode):
+    await _enqueue(db, 5)
+    dispatcher = WebhookDispatcher()
+
+    # Полная пачка - доставщик сразу идет за следующей
+    assert await _dispatch(dispatcher) is True
+    assert await _dispatch(dispatcher) is False
+
+    assert [sorted(item["id"] for item in call) for call in batch_mode.calls] == [[1, 2, 3], [4, 5]]
+    assert [entry.status for entry in await _entries()] == [OutboxStatus.DELIVERED] * 5
+
+
+async def test_failed_batch_retries_every_row(db, batch_mode):
+    await _enqueue(db, 3)
+    batch_mode.fail = True
+    dispatcher = WebhookDispatcher()
+    await _dispatch(dispatcher)
+
+    entries = await _entries()
+    assert [entry.status for entry in entries] == [OutboxStatus.PENDING] * 3
+    assert [entry.attempts for entry in entries] == [1] * 3
+    assert all("n8n недоступен" in entry.last_error for entry in entries)
+
+    batch_mode.fail = False
+    await _make_due()
+    await _dispatch(dispatcher)
+    assert sorted(item["id"] for item in batch_mode.calls[-1]) == [1, 2, 3]
+    assert [entry.status for entry in await _entries()] == [OutboxStatus.DELIVERED] * 3
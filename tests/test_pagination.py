@@ -0,0 +1,25 @@
+"""Keyset-пагинация очереди модерации"""
+import pytest
+
+from app.utils.pagination import NEXT_CURSOR_HEADER
+
+pytestmark = pytest.mark.anyio
+
+
+async def test_pending_two_pages(admin_client):
+    # Письма создаются в пределах одной секунды: created_at совпадает, порядок задает id
+    ids = []
+    for i in range(5):
+        response = await admin_client.post("/api/emails/webhook", json={"text_content": f"письмо {i}", "html_content": "<p/>"})
+        assert response.status_code == 201
+        ids.append(response.json()["id"])
+
+    first = await admin_client.get("/api/emails/pending", params={"limit": 3})
+    assert first.status_code == 200
+    assert [email["id"] for email in first.json()] == ids[:3]
+    cursor = first.headers[NEXT_CURSOR_HEADER]
+
+    second = await admin_client.get("/api/emails/pending", params={"limit": 3, "cursor": cursor})
+    assert second.status_code == 200
+    assert [email["id"] for email in second.json()] == ids[3:]
+    assert NEXT_CURSOR_HEADER not in second.headers
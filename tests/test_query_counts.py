@@ -0,0 +1,67 @@
+"""
+Число SQL-запросов на эндпоинт (регрессии N+1 и лишних round trip).
+
+Считается тем же счетчиком, что и метрика http_request_db_queries
+(request_db_stats в MetricsMiddleware, события курсора на async_engine).
+"""
+import pytest
+
+from tests.conftest import count_queries
+
+pytestmark = pytest.mark.anyio
+
+
+async def _create_emails(client, count: int) -> list[int]:
+    ids = []
+    for i in range(count):
+        response = await client.post("/api/emails/webhook", json={"text_content": f"письмо {i}", "html_content": "<p/>"})
+        assert response.status_code == 201
+        ids.append(response.json()["id"])
+    return ids
+
+
+async def test_login(client):
+    queries, response = await count_queries("/api/auth/login", client.post(
+        "/api/auth/login", json={"username": "admin", "password": "admin-password"}
+    ))
+    assert response.status_code == 200
+    assert queries == 1
+
+
+async def test_webhook(client):
+    queries, response = await count_queries("/api/emails/webhook", client.post(
+        "/api/emails/webhook", json={"text_content": "Привет", "html_content": "<p>Привет</p>"}
+    ))
+    assert response.status_code == 201
+    # INSERT ... RETURNING
+    assert queries == 1
+
+
+async def test_pending_list(admin_client):
+    await _create_emails(admin_client, 5)
+    # Пользователь уже в кэше после логина
+    queries, response = await count_queries("/api/emails/pending", admin_client.get("/api/emails/pending"))
+    assert response.status_code == 200
+    assert len(response.json()) == 5
+    assert queries == 1
+
+
+async def test_approve(admin_client):
+    [email_id] = await _create_emails(admin_client, 1)
+    queries, response = await count_queries("/api/emails/{email_id}/status", admin_client.patch(
+        f"/api/emails/{email_id}/status", json={"status": "approved"}
+    ))
+    assert response.status_code == 200
+    # UPDATE ... RETURNING и INSERT в outbox
+    assert queries == 2
+
+
+async def test_bulk_status(admin_client):
+    ids = await _create_emails(admin_client, 20)
+    queries, response = await count_queries("/api/emails/bulk/status", admin_client.patch(
+        "/api/emails/bulk/status", json={"ids": ids, "status": "approved"}
+    ))
+    assert response.status_code == 200
+    assert response.json()["count"] == 20
+    # Число запросов не зависит от размера пачки: UPDATE ... RETURNING и один INSERT в outbox
+    assert queries == 2
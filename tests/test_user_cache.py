@@ -0,0 +1,34 @@
+"""Кэш пользователей для авторизации запросов"""
+import httpx
+import pytest
+
+from app.app import app
+from app.models.user import User
+from app.utils.security import get_password_hash
+from app.utils.user_cache import user_cache
+
+pytestmark = pytest.mark.anyio
+
+MODERATOR = {"username": "moderator", "password": "moderator-password"}
+
+
+async def test_role_change_invalidates_cache(db, admin_client):
+    moderator = User(username=MODERATOR["username"], hashed_password=get_password_hash(MODERATOR["password"]), role="admin")
+    db.add(moderator)
+    await db.commit()
+
+    transport = httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(transport=transport, base_url="https://test") as moderator_client:
+        response = await moderator_client.post("/api/auth/login", json=MODERATOR)
+        assert response.status_code == 200
+        # Логин положил пользователя в кэш - дальше роль берется из него
+        assert user_cache.get(MODERATOR["username"]).role == "admin"
+        assert (await moderator_client.get("/api/admin/db/pool")).status_code == 200
+
+        response = await admin_client.patch(f"/api/admin/{moderator.id}/role")
+        assert response.status_code == 200
+        assert user_cache.get(MODERATOR["username"]) is None
+
+        # Тот же токен, но роль перечитана из БД
+        assert (await moderator_client.get("/api/admin/db/pool")).status_code == 403
+        assert user_cache.get(MODERATOR["username"]).role == "approved"
@@ -0,0 +1,37 @@
+"""Пакетный прием писем: JSON-массив и NDJSON"""
+import pytest
+
+pytestmark = pytest.mark.anyio
+
+NDJSON = {"Content-Type": "application/x-ndjson"}
+
+
+async def test_json_batch(client):
+    response = await client.post("/api/emails/webhook/batch", json=[
+        {"text_content": "первое", "html_content": "<p>1</p>"},
+        {"text_content": "второе", "html_content": "<p>2</p>"},
+    ])
+    assert response.status_code == 201
+    assert response.json()["count"] == 2
+
+
+async def test_ndjson_batch(client):
+    body = b'{"text_content": "1", "html_content": "<p/>"}\n\n{"text_content": "2", "html_content": "<p/>"}'
+    response = await client.post("/api/emails/webhook/batch", content=body, headers=NDJSON)
+    assert response.status_code == 201
+    assert response.json()["count"] == 2
+
+
+async def test_malformed_json_batch(client):
+    response = await client.post(
+        "/api/emails/webhook/batch", content=b"[notjson", headers={"Content-Type": "application/json"}
+    )
+    assert response.status_code == 422
+    assert response.json()["detail"][0]["type"] == "json_invalid"
+
+
+async def test_malformed_ndjson_line(client):
+    body = b'{"text_content": "1", "html_content": "<p/>"}\nnotjson\n'
+    response = await client.post("/api/emails/webhook/batch", content=body, headers=NDJSON)
+    assert response.status_code == 422
+    assert response.json()["detail"]["line"] == 2
@@ -0,0 +1,73 @@
+"""Дедупликация повторных доставок вебхуков"""
+import pytest
+
+from app.core.config import settings
+from app.utils.idempotency import IDEMPOTENCY_KEY_HEADER, IDEMPOTENT_REPLAY_HEADER
+from tests.conftest import count_queries
+
+pytestmark = pytest.mark.anyio
+
+EMAIL = {"text_content": "Привет", "html_content": "<p>Привет</p>"}
+
+
+async def test_idempotency_key_replay_without_queries(client):
+    headers = {IDEMPOTENCY_KEY_HEADER: "delivery-1"}
+    first = await client.post("/api/emails/webhook", json=EMAIL, headers=headers)
+    assert first.status_code == 201
+
+    queries, replay = await count_queries("/api/emails/webhook", client.post("/api/emails/webhook", json=EMAIL, headers=headers))
+    assert replay.status_code == 200
+    assert replay.headers[IDEMPOTENT_REPLAY_HEADER] == "true"
+    assert replay.json() == first.json()
+    assert queries == 0
+
+
+@pytest.fixture
+def dedup_by_content(monkeypatch):
+    monkeypatch.setattr(settings, "WEBHOOK_DEDUP_BY_CONTENT", True)
+
+
+async def test_content_duplicate_while_pending(client, dedup_by_content):
+    first = await client.post("/api/emails/webhook", json=EMAIL)
+    second = await client.post("/api/emails/webhook", json=EMAIL)
+    assert first.status_code == 201
+    assert second.status_code == 200
+    assert second.json()["id"] == first.json()["id"]
+
+
+async def test_resend_after_approval_is_new_email(admin_client, dedup_by_content):
+    first = await admin_client.post("/api/emails/webhook", json=EMAIL)
+    email_id = first.json()["id"]
+    response = await admin_client.patch(f"/api/emails/{email_id}/status", json={"status": "approved"})
+    assert response.status_code == 200
+
+    resend = await admin_client.post("/api/emails/webhook", json=EMAIL)
+    assert resend.status_code == 201
+    assert resend.json()["id"] != email_id
+
+    batch = await admin_client.post("/api/emails/webhook/batch", json=[EMAIL, EMAIL])
+    assert batch.status_code == 201
+    assert batch.json()["ids"] == [resend.json()["id"]] * 2
+
+
+async def test_edit_recomputes_content_hash(admin_client, dedup_by_content):
+    email_id = (await admin_client.post("/api/emails/webhook", json=EMAIL)).json()["id"]
+    response = await admin_client.patch(f"/api/emails/{email_id}/edit", json={"text_content": "Пока"})
+    assert response.status_code == 200
+
+    # Исходное содержимое больше не дубликат, новое - дубликат отредактированного письма
+    original = await admin_client.post("/api/emails/webhook", json=EMAIL)
+    assert original.status_code == 201
+    edited = await admin_client.post("/api/emails/webhook", json={**EMAIL, "text_content": "Пока"})
+    assert edited.status_code == 200
+    assert edited.json()["id"] == email_id
+
+
+async def test_edit_to_pending_duplicate_succeeds(admin_client, dedup_by_content):
+    first = (await admin_client.post("/api/emails/webhook", json=EMAIL)).json()["id"]
+    second = (await admin_client.post("/api/emails/webhook", json={**EMAIL, "text_content": "Пока"})).json()["id"]
+
+    response = await admin_client.patch(f"/api/emails/{second}/edit", json={"text_content": EMAIL["text_content"]})
+    assert response.status_code == 200
+    resend = await admin_client.post("/api/emails/webhook", json=EMAIL)
+    assert resend.json()["id"] == first
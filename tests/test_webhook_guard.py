@@ -0,0 +1,81 @@
+"""Защита вебхуков: лимит размера тела и частоты запросов по источнику"""
+import httpx
+import pytest
+from starlette.responses import PlainTextResponse
+
+from app.core.config import settings
+from app.middleware.webhook_guard import WebhookGuardMiddleware
+
+pytestmark = pytest.mark.anyio
+
+
+@pytest.fixture
+def guarded_client(monkeypatch):
+    monkeypatch.setattr(settings, "WEBHOOK_RATE_LIMIT_PER_SECOND", 0.001)
+    monkeypatch.setattr(settings, "WEBHOOK_RATE_LIMIT_BURST", 1)
+    monkeypatch.setattr(settings, "WEBHOOK_SOURCE_SECRETS", "scenario-a, scenario-b")
+    app = WebhookGuardMiddleware(PlainTextResponse("ok"))
+    return httpx.AsyncClient(transport=httpx.ASGITransport(app=app), base_url="http://test")
+
+
+async def _post(client, source: str | None = None) -> int:
+    headers = {settings.WEBHOOK_SOURCE_HEADER: source} if source else {}
+    response = await client.post("/api/emails/webhook", content=b"{}", headers=headers)
+    return response.status_code
+
+
+async def test_unknown_source_header_limited_by_ip(guarded_client):
+    async with guarded_client as client:
+        assert await _post(client, "random-1") == 200
+        # Новое значение заголовка не дает нового бакета
+        assert await _post(client, "random-2") == 429
+        assert await _post(client) == 429
+
+
+async def test_known_sources_have_own_buckets(guarded_client):
+    async with guarded_client as client:
+        assert await _post(client, "scenario-a") == 200
+        assert await _post(client, "scenario-b") == 200
+        assert await _post(client, "scenario-a") == 429
+        assert await _post(client) == 200
+
+
+@pytest.fixture
+def small_body_limit(monkeypatch):
+    monkeypatch.setattr(settings, "WEBHOOK_MAX_BODY_SIZE", 100)
+    monkeypatch.setattr(settings, "WEBHOOK_BATCH_MAX_BODY_SIZE", 100)
+
+
+def _chunked(body: bytes, chunk_size: int = 32):
+    """Тело без Content-Length: httpx отправляет его как Transfer-Encoding: chunked"""
+    async def chunks():
+        for i in range(0, len(body), chunk_size):
+            yield body[i:i + chunk_size]
+    return chunks()
+
+
+LARGE_EMAIL = b'{"text_content": "' + b"x" * 200 + b'", "html_content": "<p/>"}'
+LARGE_NDJSON = LARGE_EMAIL + b"\n" + LARGE_EMAIL
+LARGE_BODIES = [
+    ("/api/emails/webhook", LARGE_EMAIL, "application/json"),
+    ("/api/emails/webhook/batch", LARGE_NDJSON, "application/x-ndjson"),
+]
+
+
+@pytest.mark.parametrize("path, body, content_type", LARGE_BODIES, ids=["single", "batch"])
+async def test_declared_body_too_large(client, small_body_limit, path, body, content_type):
+    response = await client.post(path, content=body, headers={"Content-Type": content_type})
+    assert response.status_code == 413
+
+
+@pytest.mark.parametrize("path, body, content_type", LARGE_BODIES, ids=["single", "batch"])
+async def test_chunked_body_too_large(client, small_body_limit, path, body, content_type):
+    request = client.build_request("POST", path, content=_chunked(body), headers={"Content-Type": content_type})
+    assert "content-length" not in request.headers
+    response = await client.send(request)
+    assert response.status_code == 413
+
+
+async def test_body_within_limit(client, small_body_limit):
+    response = await client.post("/api/emails/webhook", json={"text_content": "ok", "html_content": "<p/>"})
+    assert response.status_code == 201